@@ -23,6 +23,7 @@ from routes.auth import auth_bp
 from routes.users import users_bp
 from routes.admin import admin_bp
 from utils.errors import register_error_handlers
+from utils.concurrency import init_concurrency_limiter
 from utils.response import json_response
 from utils.cache import cache
 from utils import metrics as metrics_util
@@ -108,6 +109,9 @@ def create_app(database_url: str | None = None) -> Flask:
             pass
         return response
 
+    # Adaptive in-flight limit: sheds excess load with fast 503s
+    init_concurrency_limiter(app)
+
     # Ensure DB session is removed each request/app context
     @app.teardown_appcontext
     def _teardown(_exc):
@@ -0,0 +1 @@
+"""Micro-benchmarks. Run individually, e.g. `python -m benchmarks.bench_token_cache`."""
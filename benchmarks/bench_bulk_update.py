@@ -0,0 +1,64 @@
+"""
+Bulk deactivate/reactivate: per-user statements vs chunked set-based UPDATEs.
+
+Updates `targets` users of the file-backed SQLite table shared with
+bench_keyset_pagination (default 100k rows), once with one conditional
+`UPDATE ... RETURNING` and commit per user (what a loop over the single-user
+repository calls costs) and once with `bulk_update_users`, by id list and by
+name filter. Every pass toggles `is_active` and bumps `token_version`. Set
+BENCH_DATABASE_URL to run against MySQL.
+
+    python -m benchmarks.bench_bulk_update [rows] [targets]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import func
+
+from benchmarks.bench_keyset_pagination import _populate
+from database.base import init_db, init_engine, remove_session
+from repositories import user_repository as repo
+
+
+def _per_user(ids, active: bool) -> int:
+    changed = 0
+    for user_id in ids:
+        values = {"is_active": active, "token_version": func.coalesce(repo._users.c.token_version, 0) + 1}
+        changed += repo._update_returning(user_id, values) is not None
+    return changed
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    targets = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.gettempdir(), f'bench_users_{rows}.db')}"
+    init_engine(url, [])
+    init_db()
+    _populate(rows)
+    remove_session()
+    ids = list(range(1, targets + 1))
+    # "User 0000".."User 0099" is 2% of rows
+    prefix = {"name": "User 00*"}
+
+    print(f"rows={rows} targets={targets}")
+    print(f"{'method':>22} {'affected':>9} {'ms':>10}")
+    for label, run in (
+        ("per-user statements", lambda active: _per_user(ids, active)),
+        ("bulk by ids", lambda active: repo.bulk_update_users({"is_active": active}, ids=ids, revoke=True)),
+        ("bulk by name filter", lambda active: repo.bulk_update_users({"is_active": active}, filters=prefix, revoke=True)),
+    ):
+        start = time.perf_counter()
+        affected = run(False)
+        elapsed = (time.perf_counter() - start) * 1000
+        run(True)
+        remove_session()
+        print(f"{label:>22} {affected:>9} {elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
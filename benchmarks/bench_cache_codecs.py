@@ -0,0 +1,58 @@
+"""
+Encode/decode time and stored size of cached `users:list` pages per codec.
+
+Payloads mirror what `GET /users` caches (items + meta) at the usual page
+sizes. Codecs whose library is not installed are skipped.
+
+    python -m benchmarks.bench_cache_codecs [per_page...]
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import time
+
+from utils.codecs import COMPRESSIONS, SERIALIZERS, Codec
+
+
+def _page(per_page: int) -> dict:
+    items = [
+        {"id": 100_000 + i, "name": f"Firstname{i} Lastname{i % 97}", "email": f"user{100_000 + i}@example.com", "role": "admin" if i % 50 == 0 else "user"}
+        for i in range(per_page)
+    ]
+    meta = {"page": 7, "per_page": per_page, "total": 250_000, "pages": 250_000 // per_page, "sort": "desc", "sort_by": "created_at"}
+    return {"items": items, "meta": meta}
+
+
+def _time_us(fn, arg, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(arg)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or [20, 100]
+    logging.getLogger("utils.codecs").setLevel(logging.ERROR)
+    for per_page in sizes:
+        payload = _page(per_page)
+        rounds = max(20_000 // per_page, 50)
+        print(f"\nper_page={per_page}")
+        print(f"{'codec':>16} {'encode us':>10} {'decode us':>10} {'bytes':>8}")
+        seen = set()
+        for serializer in SERIALIZERS:
+            for compression in COMPRESSIONS:
+                codec = Codec(serializer, compression, min_bytes=0)
+                name = f"{codec.serializer}+{codec.compression}"
+                if name in seen:  # library missing, fell back
+                    continue
+                seen.add(name)
+                blob = codec.encode(payload)
+                enc = _time_us(codec.encode, payload, rounds)
+                dec = _time_us(codec.decode, blob, rounds)
+                print(f"{name:>16} {enc:>10.1f} {dec:>10.1f} {len(blob):>8}")
+
+
+if __name__ == "__main__":
+    main()
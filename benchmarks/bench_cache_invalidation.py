@@ -0,0 +1,71 @@
+"""
+Invalidation cost vs keyspace size: SCAN+DELETE prefix walk against a
+namespace generation bump.
+
+Runs against BENCH_REDIS_URL when set, otherwise an in-process fakeredis
+(where "round trips" are function calls, so absolute numbers are optimistic
+but the scaling is the same). The app's REDIS_URL is never used: every key
+lives under a disposable `bench:<id>:` prefix and only those are deleted.
+
+    python -m benchmarks.bench_cache_invalidation [sizes...]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import uuid
+
+from utils.cache import Cache
+
+
+def _client():
+    url = os.getenv("BENCH_REDIS_URL")
+    if url:
+        import redis
+
+        return redis.Redis.from_url(url)
+    import fakeredis
+
+    return fakeredis.FakeRedis()
+
+
+def _cleanup(client, prefix: str) -> None:
+    for pattern in (f"{prefix}*", f"gen:{prefix}*"):
+        keys = list(client.scan_iter(match=pattern, count=1000))
+        for i in range(0, len(keys), 1000):
+            client.delete(*keys[i:i + 1000])
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 5_000, 10_000]
+    client = _client()
+    cache = Cache(client=client)
+    prefix = f"bench:{uuid.uuid4().hex[:8]}:"
+    print(f"{'keyspace':>9} {'prefix walk ms':>15} {'generation bump ms':>19}")
+    try:
+        for size in sizes:
+            _cleanup(client, prefix)
+            pipe = client.pipeline()
+            for i in range(size):
+                pipe.set(f"{prefix}other:{i}", b"x")
+            for i in range(50):
+                pipe.set(f"{prefix}users:list:page={i}", b"x")
+            pipe.execute()
+
+            start = time.perf_counter()
+            cache.invalidate_prefix(f"{prefix}users:list:")
+            walk_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            cache.invalidate_namespace(f"{prefix}users:list")
+            bump_ms = (time.perf_counter() - start) * 1000
+            print(f"{size:>9} {walk_ms:>15.2f} {bump_ms:>19.3f}")
+    finally:
+        _cleanup(client, prefix)
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Sign/verify throughput per JWT algorithm through the key registry.
+
+    python -m benchmarks.bench_jwt_algorithms [iterations]
+
+RS256/ES256/EdDSA need the `cryptography` package (PyJWT[crypto]).
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from utils.jwt_keys import KeyRegistry
+
+
+def _keys():
+    yield "HS256", {"secret": "x" * 32}
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+    except ImportError:  # pragma: no cover
+        print("cryptography not installed; only HS256 measured")
+        return
+
+    def pem(key):
+        return key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+
+    yield "RS256", {"private_key": pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))}
+    yield "ES256", {"private_key": pem(ec.generate_private_key(ec.SECP256R1()))}
+    yield "EdDSA", {"private_key": pem(ed25519.Ed25519PrivateKey.generate())}
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    payload = {"sub": "42", "role": "user", "type": "access", "ver": 3, "jti": "0" * 36, "fp": "f" * 64}
+    print(f"{'alg':<6} {'sign/s':>10} {'verify/s':>10}")
+    for alg, material in _keys():
+        reg = KeyRegistry()
+        reg.add(alg, alg, active=True, **material)
+        start = time.perf_counter()
+        for _ in range(n):
+            token = reg.encode(payload)
+        sign_s = n / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(n):
+            reg.decode(token)
+        verify_s = n / (time.perf_counter() - start)
+        print(f"{alg:<6} {sign_s:>10.0f} {verify_s:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
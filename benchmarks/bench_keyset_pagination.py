@@ -0,0 +1,95 @@
+"""
+Page latency by depth: OFFSET pagination against keyset (cursor) seeks.
+
+Builds a file-backed SQLite users table (default 200k rows, created once in
+the temp dir and reused), then times fetching one page at increasing depths
+with `list_users` (COUNT + OFFSET) and `list_users_keyset`. Run against
+MySQL by setting BENCH_DATABASE_URL to an existing, populated database.
+
+    python -m benchmarks.bench_keyset_pagination [rows] [per_page]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+
+from database.base import get_session, init_db, init_engine, remove_session
+from models.user import User
+from repositories.user_repository import list_users, list_users_keyset, sort_key
+
+
+def _populate(rows: int, bio: Optional[str] = None) -> None:
+    session = get_session()
+    existing = session.execute(select(func.count()).select_from(User)).scalar() or 0
+    if existing >= rows:
+        return
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(existing, rows):
+        batch.append({
+            "name": f"User {i % 5000:04d}",
+            "email": f"user{i}@example.com",
+            "password_hash": "x",
+            "role": "user",
+            "token_version": 0,
+            "is_active": True,
+            "bio": bio,
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": start + timedelta(seconds=i),
+        })
+        if len(batch) == 10_000:
+            session.execute(insert(User), batch)
+            batch = []
+    if batch:
+        session.execute(insert(User), batch)
+    session.commit()
+
+
+def _time_ms(fn, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+        remove_session()
+    return best * 1000
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.gettempdir(), f'bench_users_{rows}.db')}"
+    init_engine(url, [])
+    init_db()
+    _populate(rows)
+    remove_session()
+
+    print(f"rows={rows} per_page={per_page}")
+    print(f"{'page':>7} {'offset ms':>10} {'keyset ms':>10}")
+    for sort_by in ("created_at", "name"):
+        print(f"sort_by={sort_by}")
+        for page in (1, 10, 100, 1_000, rows // per_page // 2, rows // per_page - 1):
+            if page < 1:
+                continue
+            offset_ms = _time_ms(lambda page=page, sort_by=sort_by: list_users(page, per_page, sort_by=sort_by))
+            # position of the row just before the page (setup, not timed)
+            anchor = None
+            if page > 1:
+                prev, _ = list_users(page - 1, per_page, sort_by=sort_by, fields=("id", sort_by))
+                anchor = sort_key(prev[-1], sort_by)
+                remove_session()
+            keyset_ms = _time_ms(
+                lambda sort_by=sort_by, anchor=anchor: list_users_keyset(per_page, sort_by=sort_by, after=anchor)
+            )
+            print(f"{page:>7} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+GET /users page latency by `total` mode.
+
+Times one page fetch plus its total on the same file-backed SQLite table as
+bench_keyset_pagination (default 200k rows): an uncached COUNT per request,
+the cached exact count, the planner estimate (after ANALYZE) and no total
+(`has_more` only). Filtered queries have no SQLite estimate and fall back to
+the cached count. Set BENCH_DATABASE_URL to run against MySQL.
+
+    python -m benchmarks.bench_list_totals [rows] [per_page]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+from sqlalchemy import text
+
+from benchmarks.bench_keyset_pagination import _populate, _time_ms
+from database.base import get_session, init_db, init_engine, remove_session
+from repositories.user_repository import count_users, estimate_users, list_users_page
+from services import user_service
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.gettempdir(), f'bench_users_{rows}.db')}"
+    init_engine(url, [])
+    init_db()
+    _populate(rows)
+    session = get_session()
+    session.execute(text("ANALYZE"))
+    session.commit()
+    remove_session()
+
+    print(f"rows={rows} per_page={per_page}")
+    print(f"{'filter':>14} {'count ms':>10} {'cached ms':>10} {'estimate ms':>12} {'none ms':>9}")
+    for label, filters in (("-", {}), ("name=user 12", {"name": "user 12"}), ("email=9@", {"email": "9@"})):
+        def page(filters=filters):
+            return list_users_page(1, per_page, **filters)
+
+        def estimated(filters=filters, page=page):
+            if user_service.estimate_users(**filters) is None:
+                user_service.count_users(**filters)
+            page()
+
+        user_service.count_users(**filters)  # warm the cached count
+        count_ms = _time_ms(lambda filters=filters: (count_users(**filters), page()))
+        cached_ms = _time_ms(lambda filters=filters: (user_service.count_users(**filters), page()))
+        estimate_ms = _time_ms(estimated)
+        none_ms = _time_ms(page)
+        print(f"{label:>14} {count_ms:>10.2f} {cached_ms:>10.2f} {estimate_ms:>12.2f} {none_ms:>9.2f}")
+    print(f"raw estimate={estimate_users()} exact={count_users()}")
+
+
+if __name__ == "__main__":
+    main()
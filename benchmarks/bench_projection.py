@@ -0,0 +1,117 @@
+"""
+ORM entities against column projections for the hot user read paths.
+
+Seeds a file-backed SQLite users table whose rows carry a ~2 KB bio (default
+50k rows, created once in the temp dir and reused), then compares, per path,
+wall time and tracemalloc peak of loading full `User` instances (the previous
+implementation) with the `UserRow` / snapshot projections:
+
+- list: 20 pages of 500 rows, as GET /users reads them;
+- export: every row, as the CSV export reads them;
+- auth miss: a `require_auth` snapshot load per id.
+
+    python -m benchmarks.bench_projection [rows]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import select
+
+from benchmarks.bench_keyset_pagination import _populate
+from database.base import get_session, init_db, init_engine, remove_session
+from models.user import User
+from repositories.user_repository import (
+    UserSnapshot,
+    _load_snapshot_by_id,
+    _ordered,
+    _users,
+    iter_users,
+    list_users_page,
+)
+
+EXPORT_FIELDS = ("id", "name", "email", "role", "created_at", "is_active")
+
+
+def _measure(fn, rounds: int = 3):
+    """(best ms, tracemalloc peak KiB); timed runs are not traced."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+        remove_session()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    remove_session()
+    return best * 1000, peak / 1024
+
+
+def _orm_pages(pages: int, per_page: int):
+    session = get_session()
+    for page in range(1, pages + 1):
+        stmt = _ordered(select(User).where(_users.c.deleted_at.is_(None)), "created_at", "desc")
+        items = session.execute(stmt.offset((page - 1) * per_page).limit(per_page)).scalars().all()
+        [{"id": u.id, "name": u.name, "email": u.email, "role": u.role} for u in items]
+
+
+def _row_pages(pages: int, per_page: int):
+    for page in range(1, pages + 1):
+        items, _ = list_users_page(page, per_page)
+        [u._asdict() for u in items]
+
+
+def _orm_export():
+    session = get_session()
+    stmt = select(User).where(_users.c.deleted_at.is_(None)).order_by(User.id)
+    for u in session.execute(stmt).scalars():
+        (u.id, u.name, u.email, u.role, u.created_at.isoformat(), u.is_active)
+
+
+def _row_export():
+    for user_id, name, email, role, created_at, is_active in iter_users(EXPORT_FIELDS):
+        (user_id, name, email, role, created_at.isoformat(), is_active)
+
+
+def _orm_snapshots(ids):
+    session = get_session()
+    for user_id in ids:
+        user = session.execute(select(User).where(User.id == user_id, _users.c.deleted_at.is_(None))).scalar_one()
+        UserSnapshot.from_model(user)
+
+
+def _row_snapshots(ids):
+    for user_id in ids:
+        _load_snapshot_by_id(user_id)
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.gettempdir(), f'bench_users_bio_{rows}.db')}"
+    init_engine(url, [])
+    init_db()
+    _populate(rows, bio="lorem ipsum " * 170)
+    remove_session()
+    ids = list(range(1, min(rows, 2000) + 1))
+
+    print(f"rows={rows}")
+    print(f"{'path':>10} {'orm ms':>9} {'rows ms':>9} {'orm KiB':>10} {'rows KiB':>10}")
+    for label, orm, projected in (
+        ("list", lambda: _orm_pages(20, 500), lambda: _row_pages(20, 500)),
+        ("export", _orm_export, _row_export),
+        ("auth miss", lambda: _orm_snapshots(ids), lambda: _row_snapshots(ids)),
+    ):
+        orm_ms, orm_kib = _measure(orm)
+        row_ms, row_kib = _measure(projected)
+        print(f"{label:>10} {orm_ms:>9.1f} {row_ms:>9.1f} {orm_kib:>10.0f} {row_kib:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
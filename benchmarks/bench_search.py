@@ -0,0 +1,65 @@
+"""
+Name/email filter latency: plain ILIKE scans against the text/B-tree indexes.
+
+Seeds a file-backed SQLite users table (default 1M rows, created once in the
+temp dir and reused; init_db adds the FTS5 trigram table and lower() indexes),
+then times the first page and the exact count for substring and prefix
+(`term*`) filters with the indexes and with ILIKE forced. Run against MySQL
+(FULLTEXT ngram) by setting BENCH_DATABASE_URL to a populated database.
+
+    python -m benchmarks.bench_search [rows] [per_page]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+from benchmarks.bench_keyset_pagination import _populate, _time_ms
+from database import base, search
+from database.base import init_db, init_engine, remove_session
+from repositories.user_repository import count_users, list_users_page
+
+QUERIES = (
+    ("name", "r 0042"),  # substring, 1 in 5000 rows
+    ("email", "12345"),  # substring, a handful of rows
+    ("email", "example"),  # substring, every row
+    ("name", "user 004*"),  # prefix
+    ("email", "user1999*"),  # prefix
+)
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.gettempdir(), f'bench_users_{rows}.db')}"
+    init_engine(url, [])
+    init_db()
+    _populate(rows)
+    remove_session()
+    backend = search.search_backend("users")
+
+    print(f"rows={rows} per_page={per_page} backend={backend}")
+    print(f"{'filter':>20} {'page ilike':>11} {'page index':>11} {'count ilike':>12} {'count index':>12} {'hits':>8}")
+    for field, term in QUERIES:
+        filters = {field: term}
+        timings = {}
+        for mode in ("ilike", "index"):
+            # forcing "no backend" makes both contains() and starts_with() fall back to ILIKE
+            search._backends[base._engine]["users"] = backend if mode == "index" else None
+            timings[mode] = (
+                _time_ms(lambda filters=filters: list_users_page(1, per_page, **filters), rounds=3),
+                _time_ms(lambda filters=filters: count_users(**filters), rounds=3),
+            )
+        hits = count_users(**filters)
+        remove_session()
+        label = f"{field}={term}"
+        print(
+            f"{label:>20} {timings['ilike'][0]:>11.2f} {timings['index'][0]:>11.2f} "
+            f"{timings['ilike'][1]:>12.2f} {timings['index'][1]:>12.2f} {hits:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
 
 from config.settings import settings
+from database.pool import InstrumentedQueuePool, instrument_pool, render_pool_metrics
+from database.routing import ReplicaSet, RoutingSession
+from utils import metrics as metrics_util
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +19,10 @@ Base = declarative_base()
 _engine = None
 SessionLocal = None
 db_session = None
+replicas = None
 
 
-def init_engine(database_url: str | None = None):
-    global _engine, SessionLocal, db_session
-    url = database_url or settings.DATABASE_URL
+def _engine_kwargs(url: str) -> dict:
     engine_kwargs = {"future": True}
     if url.startswith("sqlite"):
         engine_kwargs.update({
@@ -29,14 +31,42 @@ def init_engine(database_url: str | None = None):
         })
     else:
         engine_kwargs.update({
-            "pool_pre_ping": True,
-            "pool_recycle": 1800,
-            "pool_size": 5,
-            "max_overflow": 10,
-            "pool_timeout": 30,
+            "poolclass": InstrumentedQueuePool,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
         })
-    _engine = create_engine(url, **engine_kwargs)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return engine_kwargs
+
+
+def init_engine(database_url: str | None = None, replica_urls: list[str] | None = None):
+    """Create the primary engine and, if configured, read replica engines.
+
+    replica_urls: defaults to the comma-separated DATABASE_REPLICA_URLS.
+    """
+    global _engine, SessionLocal, db_session, replicas
+    url = database_url or settings.DATABASE_URL
+    _engine = create_engine(url, **_engine_kwargs(url))
+    stats = instrument_pool(_engine, long_hold_ms=settings.DB_POOL_LONG_HOLD_MS)
+    engine = _engine
+    metrics_util.register_collector("db_pool", lambda: render_pool_metrics(engine.pool, stats))
+
+    if replica_urls is None:
+        replica_urls = [u.strip() for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()]
+    replicas = None
+    if replica_urls:
+        replicas = ReplicaSet(
+            [create_engine(u, **_engine_kwargs(u)) for u in replica_urls],
+            cooldown=settings.DB_REPLICA_COOLDOWN_SEC,
+        )
+        metrics_util.register_collector("db_replicas", replicas.render_metrics)
+        logger.info("Routing reads to %d replica(s)", len(replica_urls))
+
+    SessionLocal = sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False, bind=_engine, replicas=replicas
+    )
     db_session = scoped_session(SessionLocal)
     logger.info("SQLAlchemy engine initialized")
     return _engine
@@ -45,7 +75,11 @@ def init_engine(database_url: str | None = None):
 def init_db():
     # Import models to ensure they are registered on Base.metadata
     from models.user import User  # noqa: F401
+    from database.search import install_search
+
     Base.metadata.create_all(bind=_engine)
+    # name/email substring filters are served from a text index where the dialect has one
+    install_search(_engine, User.__tablename__, ["name", "email"])
 
 
 def get_session():
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+"""
+Connection pool instrumentation.
+
+`InstrumentedQueuePool` times how long each checkout waits for a free
+connection and counts checkout timeouts (pool exhaustion); pool event
+listeners track connection hold times and lifetimes. Everything is exported
+on `/metrics` as `db_pool_*`.
+
+With DB_POOL_LONG_HOLD_MS set, the stack that checked a connection out is
+captured at checkout and logged when the connection is held longer than
+that, which points at the code sitting on connections during exhaustion.
+"""
+
+import logging
+import threading
+import time
+import traceback
+from typing import List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# checkout wait histogram buckets, in ms
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_sum_ms = 0.0
+        self.wait_count = 0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.closed = 0
+        self.invalidated = 0
+        self.long_holds = 0
+        self.hold_sum_ms = 0.0
+        self.hold_count = 0
+        self.lifetime_sum_sec = 0.0
+        self.lifetime_count = 0
+
+    def observe_wait(self, ms: float) -> None:
+        with self._lock:
+            i = 0
+            while i < len(WAIT_BUCKETS_MS) and ms > WAIT_BUCKETS_MS[i]:
+                i += 1
+            self.wait_buckets[i] += 1
+            self.wait_sum_ms += ms
+            self.wait_count += 1
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+
+    def inc(self, name: str, by: float = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + by)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time and timeouts."""
+
+    stats: Optional[PoolStats] = None
+    # QueuePool._do_get retries by recursing; only the outermost call is timed
+    _depth = threading.local()
+
+    def _do_get(self):
+        depth = getattr(self._depth, "n", 0)
+        if self.stats is None or depth:
+            return super()._do_get()
+        self._depth.n = 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.inc("timeouts")
+            raise
+        finally:
+            self._depth.n = 0
+            self.stats.observe_wait((time.perf_counter() - started) * 1000)
+
+    def recreate(self):
+        # engine.dispose() swaps in a recreated pool; keep feeding the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def instrument_pool(engine, *, long_hold_ms: float = 0.0) -> PoolStats:
+    """Attach listeners to `engine`'s pool and return the stats they fill."""
+    pool = engine.pool
+    stats = PoolStats()
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.stats = stats
+
+    @event.listens_for(pool, "connect")
+    def _connect(dbapi_conn, record):
+        record.info["created_at"] = time.monotonic()
+        stats.inc("connects")
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        record.info["checked_out_at"] = time.monotonic()
+        if long_hold_ms:
+            record.info["checkout_stack"] = traceback.extract_stack(limit=25)[:-1]
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_conn, record):
+        started = record.info.pop("checked_out_at", None)
+        stack = record.info.pop("checkout_stack", None)
+        if started is None:
+            return
+        held_ms = (time.monotonic() - started) * 1000
+        stats.inc("hold_sum_ms", held_ms)
+        stats.inc("hold_count")
+        if long_hold_ms and held_ms > long_hold_ms:
+            stats.inc("long_holds")
+            where = "".join(traceback.format_list(stack)) if stack else "(unknown)\n"
+            logger.warning("DB connection held for %.0f ms; checked out at:\n%s", held_ms, where)
+
+    def _lifetime(record) -> None:
+        created = record.info.pop("created_at", None)
+        if created is not None:
+            stats.inc("lifetime_sum_sec", time.monotonic() - created)
+            stats.inc("lifetime_count")
+
+    @event.listens_for(pool, "close")
+    def _close(dbapi_conn, record):
+        stats.inc("closed")
+        _lifetime(record)
+
+    @event.listens_for(pool, "invalidate")
+    def _invalidate(dbapi_conn, record, exception):
+        stats.inc("invalidated")
+
+    return stats
+
+
+def render_pool_metrics(pool, stats: PoolStats) -> List[str]:
+    lines: List[str] = []
+
+    def gauge(name: str, help_text: str, value, kind: str = "gauge") -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+
+    if isinstance(pool, QueuePool):
+        gauge("db_pool_size", "Configured pool size", pool.size())
+        gauge("db_pool_checked_out", "Connections currently in use", pool.checkedout())
+        gauge("db_pool_checked_in", "Idle connections in the pool", pool.checkedin())
+        gauge("db_pool_overflow", "Connections open beyond pool_size (negative: unopened pool slots)", pool.overflow())
+    with stats._lock:
+        lines.append("# HELP db_pool_checkout_wait_ms Time spent waiting for a pooled connection")
+        lines.append("# TYPE db_pool_checkout_wait_ms histogram")
+        cumulative = 0
+        # the last bucket (past every bound) is only in +Inf
+        for bound, count in zip(WAIT_BUCKETS_MS, stats.wait_buckets[:-1], strict=True):
+            cumulative += count
+            lines.append(f'db_pool_checkout_wait_ms_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'db_pool_checkout_wait_ms_bucket{{le="+Inf"}} {stats.wait_count}')
+        lines.append(f"db_pool_checkout_wait_ms_sum {stats.wait_sum_ms:.3f}")
+        lines.append(f"db_pool_checkout_wait_ms_count {stats.wait_count}")
+        gauge("db_pool_checkout_wait_max_ms", "Longest checkout wait observed", f"{stats.wait_max_ms:.3f}")
+        gauge("db_pool_timeouts", "Checkouts that timed out (pool exhausted)", stats.timeouts, "counter")
+        gauge("db_pool_connects", "New DBAPI connections opened", stats.connects, "counter")
+        gauge("db_pool_closed", "DBAPI connections closed", stats.closed, "counter")
+        gauge("db_pool_invalidated", "Connections invalidated after errors", stats.invalidated, "counter")
+        gauge("db_pool_hold_ms", "Average time a connection is held per checkout",
+              f"{stats.hold_sum_ms / max(stats.hold_count, 1):.2f}")
+        gauge("db_pool_long_holds", "Checkouts held longer than DB_POOL_LONG_HOLD_MS", stats.long_holds, "counter")
+        gauge("db_pool_connection_lifetime_sec", "Average lifetime of closed connections",
+              f"{stats.lifetime_sum_sec / max(stats.lifetime_count, 1):.2f}")
+    return lines
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+"""
+Primary/replica routing for the ORM session.
+
+Repository reads decorated with `@replica_read` may run on a replica; every
+other statement (and anything while flushing) goes to the primary. Reads
+stay on the primary:
+
+- for the rest of a request (scoped session) once it wrote anything;
+- for DB_STICKY_WINDOW_SEC after a request by the same client wrote
+  (so a client reads its own writes across workers despite replica lag);
+- for DB_STICKY_WINDOW_SEC after a write to the rows a read names (e.g.
+  `user:{id}`), so shared caches are not refilled from a lagging replica.
+
+Windows are markers in the shared cache (Redis when configured). Replicas
+are used round-robin; one that fails is benched for DB_REPLICA_COOLDOWN_SEC,
+then probed with `SELECT 1` before it gets traffic again. A read that fails
+on a replica is retried once on the primary.
+"""
+
+import functools
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """Round-robin over healthy replica engines with a failure cooldown."""
+
+    def __init__(self, engines: List, *, cooldown: float = 30.0) -> None:
+        self.engines = list(engines)
+        self.cooldown = cooldown
+        self._down_until: Dict[int, float] = {}
+        self._cycle = itertools.cycle(range(len(self.engines)))
+        self._lock = threading.Lock()
+        self.reads = [0] * len(self.engines)
+        self.failures = [0] * len(self.engines)
+
+    def _probe(self, engine) -> bool:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    def choose(self):
+        """Next healthy replica engine, or None when all are down."""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            with self._lock:
+                i = next(self._cycle)
+                until = self._down_until.get(i)
+            if until is not None:
+                if until > now:
+                    continue
+                if not self._probe(self.engines[i]):
+                    self.mark_down(self.engines[i])
+                    continue
+                with self._lock:
+                    self._down_until.pop(i, None)
+                logger.info("Replica %s is back in rotation", i)
+            with self._lock:
+                self.reads[i] += 1
+            return self.engines[i]
+        return None
+
+    def mark_down(self, engine) -> None:
+        for i, candidate in enumerate(self.engines):
+            if candidate is engine:
+                with self._lock:
+                    self._down_until[i] = time.monotonic() + self.cooldown
+                    self.failures[i] += 1
+                logger.warning("Replica %s marked down for %.0fs", i, self.cooldown)
+
+    def healthy(self) -> List[bool]:
+        now = time.monotonic()
+        with self._lock:
+            return [self._down_until.get(i, 0) <= now for i in range(len(self.engines))]
+
+    def render_metrics(self) -> List[str]:
+        lines = [
+            "# HELP db_replica_healthy 1 if the replica is in rotation",
+            "# TYPE db_replica_healthy gauge",
+        ]
+        for i, ok in enumerate(self.healthy()):
+            lines.append(f'db_replica_healthy{{replica="{i}"}} {int(ok)}')
+        lines.append("# HELP db_replica_reads Reads routed to each replica")
+        lines.append("# TYPE db_replica_reads counter")
+        for i, n in enumerate(self.reads):
+            lines.append(f'db_replica_reads{{replica="{i}"}} {n}')
+        lines.append("# HELP db_replica_failures Times each replica was marked down")
+        lines.append("# TYPE db_replica_failures counter")
+        for i, n in enumerate(self.failures):
+            lines.append(f'db_replica_failures{{replica="{i}"}} {n}')
+        return lines
+
+
+def _client_identity() -> Optional[str]:
+    """Who a sticky window belongs to: the authenticated user, else the IP."""
+    if not has_request_context():
+        return None
+    user_id = g.get("current_user_id")
+    if user_id is None:
+        parts = request.headers.get("Authorization", "").split()
+        if len(parts) == 2 and parts[0].lower() == "bearer":
+            from utils.security import decode_token_cached
+
+            payload, err = decode_token_cached(parts[1])
+            if err is None:
+                user_id = payload.get("sub")
+    if user_id is not None:
+        return f"client:user:{user_id}"
+    return f"client:ip:{request.remote_addr}"
+
+
+def _window_ttl() -> int:
+    return max(int(math.ceil(settings.DB_STICKY_WINDOW_SEC)), 1)
+
+
+def mark_written(*keys: str) -> None:
+    """Pin reads of `keys` (e.g. `user:{id}`) to the primary for the sticky window."""
+    from database import base
+
+    if base.replicas is None or settings.DB_STICKY_WINDOW_SEC <= 0:
+        return
+    from utils.cache import cache
+
+    # one pipeline however many rows a bulk write touched
+    cache.set_many({f"db:sticky:{key}": 1 for key in keys}, ttl=_window_ttl())
+
+
+def _is_sticky(keys: Iterable[str]) -> bool:
+    if settings.DB_STICKY_WINDOW_SEC <= 0:
+        return False
+    from utils.cache import cache
+
+    return any(cache.get(f"db:sticky:{key}") for key in keys)
+
+
+class RoutingSession(Session):
+    """Session that sends `replica_read` SELECTs to a replica."""
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def _note_write(self) -> None:
+        if self.info.get("wrote"):
+            return
+        self.info["wrote"] = True
+        identity = _client_identity()
+        if identity is not None:
+            mark_written(identity)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replicas is None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        is_select = clause is not None and getattr(clause, "is_select", False) and not self._flushing
+        if not is_select:
+            self._note_write()
+        elif self.info.get("replica_ok") and not self.info.get("wrote"):
+            # one replica per read, so e.g. a COUNT and its page agree
+            engine = self.info.get("replica_engine") or self.replicas.choose()
+            if engine is not None:
+                self.info["replica_engine"] = engine
+                return engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def replica_read(keys: Optional[Callable[..., Iterable[str]]] = None):
+    """Let the decorated repository read run on a replica when safe.
+
+    keys: optional `keys(*args, **kwargs)` naming the rows the read depends
+    on; a recent `mark_written` of any of them keeps the read on the primary.
+    """
+
+    def decorator(fn: Callable):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            from database.base import get_session
+
+            session = get_session()()
+            if session.replicas is None or session.info.get("wrote") or session.info.get("replica_ok"):
+                return fn(*args, **kwargs)
+            sticky = [] if keys is None else list(keys(*args, **kwargs))
+            identity = _client_identity()
+            if identity is not None:
+                sticky.append(identity)
+            if _is_sticky(sticky):
+                return fn(*args, **kwargs)
+
+            session.info["replica_ok"] = True
+            try:
+                return fn(*args, **kwargs)
+            except DBAPIError:
+                engine = session.info.get("replica_engine")
+                if engine is None:
+                    raise
+                logger.warning("Replica read failed; retrying on the primary", exc_info=True)
+                session.rollback()
+                session.replicas.mark_down(engine)
+                session.info["replica_ok"] = False
+                return fn(*args, **kwargs)
+            finally:
+                session.info["replica_ok"] = False
+                session.info.pop("replica_engine", None)
+
+        return wrapper
+
+    return decorator
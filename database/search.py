@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+"""
+Indexed text filters for list endpoints.
+
+`contains(column, term)` matches `%term%` case-insensitively. A leading
+wildcard defeats B-tree indexes, so where the database has a text index it
+is used instead:
+
+- MySQL: a FULLTEXT index per column with the ngram parser, queried with
+  `MATCH ... AGAINST` and rechecked with LIKE;
+- SQLite: an external-content FTS5 table `{table}_fts` with the trigram
+  tokenizer, kept in sync by triggers. Terms matching more than
+  SEARCH_INDEX_MAX_ROWS rows still use ILIKE (probed on the request's own
+  session, and remembered for SEARCH_PROBE_TTL seconds).
+
+Terms shorter than MIN_TERM_LENGTH, and databases without a text index
+(e.g. one migrated without `install_search`), use a plain ILIKE.
+
+`starts_with(column, prefix)` is a range over a B-tree index: the column's
+own index on MySQL (case-insensitive collation), an index on `lower(col)`
+on SQLite.
+"""
+
+import logging
+import string
+import weakref
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import Integer, and_, column as sql_column, func, inspect, select, table as sql_table, text
+from sqlalchemy.exc import DBAPIError
+
+from config.settings import settings
+from utils.lru import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# trigrams (SQLite) need three characters to hit the index
+MIN_TERM_LENGTH = 3
+
+# what SQLite's built-in lower() does: A-Z only
+_SQLITE_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# engine -> {table name: "fts5" | "fulltext"}; absent table = no text index
+_backends: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# engine -> TTLCache of (table, column, term, limit) -> selective?
+_selectivity: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _engine():
+    from database import base
+
+    return base._engine
+
+
+def _sqlite_install(conn, table: str, columns: Iterable[str], key: str) -> None:
+    cols = list(columns)
+    fts = f"{table}_fts"
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": fts}
+    ).scalar()
+    if not exists:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(cols)}, "
+            f"content='{table}', content_rowid='{key}', tokenize='trigram')"
+        ))
+    new = ", ".join(f"new.{c}" for c in cols)
+    old = ", ".join(f"old.{c}" for c in cols)
+    names = ", ".join(cols)
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.{key}, {new}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{key}, {old}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{key}, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.{key}, {new}); END"
+    ))
+    if not exists:
+        # index rows that predate the FTS table
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    for c in cols:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{c}_lower ON {table} (lower({c}))"))
+
+
+def _mysql_install(conn, table: str, columns: Iterable[str]) -> None:
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table)}
+    for c in columns:
+        name = f"ft_{table}_{c}"
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({c}) WITH PARSER ngram"))
+
+
+def install_search(engine, table: str, columns: Iterable[str], *, key: str = "id") -> Optional[str]:
+    """Create the text index for `columns` of `table` (idempotent).
+
+    Returns the backend name, or None when the dialect has none (or creating
+    it failed, e.g. SQLite built without FTS5); filters then use ILIKE.
+    """
+    dialect = engine.dialect.name
+    backend = {"sqlite": "fts5", "mysql": "fulltext"}.get(dialect)
+    if backend is None:
+        return None
+    try:
+        with engine.begin() as conn:
+            if backend == "fts5":
+                _sqlite_install(conn, table, columns, key)
+            else:
+                _mysql_install(conn, table, columns)
+    except DBAPIError as exc:
+        logger.warning("Text index for %s unavailable, using ILIKE: %s", table, exc)
+        return None
+    _backends.setdefault(engine, {})[table] = backend
+    return backend
+
+
+def _detect(engine, table: str) -> Optional[str]:
+    dialect = engine.dialect.name
+    try:
+        with engine.connect() as conn:
+            if dialect == "sqlite":
+                found = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": f"{table}_fts"}
+                ).scalar()
+                return "fts5" if found else None
+            if dialect == "mysql":
+                kinds = {ix.get("type") for ix in inspect(conn).get_indexes(table)}
+                return "fulltext" if "FULLTEXT" in kinds else None
+    except DBAPIError:
+        logger.debug("Text index detection failed for %s", table, exc_info=True)
+    return None
+
+
+def search_backend(table: str) -> Optional[str]:
+    """Text index available for `table` on the current engine, if any."""
+    engine = _engine()
+    if engine is None:
+        return None
+    tables: Dict[str, Optional[str]] = _backends.setdefault(engine, {})
+    if table not in tables:
+        tables[table] = _detect(engine, table)
+    return tables[table]
+
+
+def _fts_selective(column, term: str) -> bool:
+    """Whether `term` matches few enough rows for the FTS5 path to win.
+
+    Common terms are left to ILIKE: an ordered scan stops at the first page,
+    while the index would materialize and sort every match. The probe reads
+    at most SEARCH_INDEX_MAX_ROWS + 1 matches, runs on the caller's routed
+    session (a replica for replica reads) and is cached per term.
+    """
+    from database.base import get_session
+
+    limit = settings.SEARCH_INDEX_MAX_ROWS
+    seen = _selectivity.get(_engine())
+    if seen is None:
+        seen = _selectivity.setdefault(_engine(), TTLCache(maxsize=1024, ttl=settings.SEARCH_PROBE_TTL))
+    key = (column.table.name, column.name, term, limit)
+    selective = seen.get(key)
+    if selective is not None:
+        return selective
+    fts = f"{column.table.name}_fts"
+    sql = f"SELECT count(*) AS hits FROM (SELECT rowid FROM {fts} WHERE {column.name} LIKE :p LIMIT :n)"
+    try:
+        # a textual SELECT, so the routing session treats it as a read
+        probe = text(sql).columns(sql_column("hits", Integer))
+        hits = get_session().execute(probe, {"p": f"%{term}%", "n": limit + 1}).scalar()
+    except DBAPIError:
+        return True
+    selective = hits <= limit
+    seen.set(key, selective)
+    return selective
+
+
+def contains(column, term: str):
+    """Case-insensitive `%term%` filter on `column`, index-assisted when possible."""
+    pattern = f"%{term}%"
+    backend = search_backend(column.table.name) if len(term) >= MIN_TERM_LENGTH else None
+    if backend == "fts5" and _fts_selective(column, term):
+        table = column.table
+        fts = sql_table(f"{table.name}_fts", sql_column("rowid"), sql_column(column.name))
+        key = list(table.primary_key.columns)[0]
+        # trigram LIKE is case-insensitive and exact, no recheck needed
+        return key.in_(select(fts.c.rowid).where(fts.c[column.name].like(pattern)))
+    if backend == "fulltext":
+        phrase = '"' + term.replace('"', " ") + '"'
+        return and_(column.match(phrase), column.like(pattern))
+    return column.ilike(pattern)
+
+
+def starts_with(column, prefix: str):
+    """Case-insensitive prefix filter that stays on a B-tree index."""
+    dialect = _engine().dialect.name if _engine() is not None else None
+    if dialect == "mysql":
+        return column.like(f"{prefix}%")
+    if dialect == "sqlite" and search_backend(column.table.name) == "fts5":
+        # SQLite's lower() only folds ASCII; fold the bounds the same way
+        low = prefix.translate(_SQLITE_LOWER)
+        # every string starting with `low` sorts in [low, low with its last character bumped)
+        high = low[:-1] + chr(ord(low[-1]) + 1)
+        lowered = func.lower(column)
+        return and_(lowered >= low, lowered < high)
+    return column.ilike(f"{prefix}%")
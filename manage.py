@@ -4,7 +4,9 @@ import click
 from flask.cli import with_appcontext
 
 from app import create_app
+from config.settings import settings
 from services.user_service import register_user
+from utils.hashing import calibrate_rounds
 
 
 app = create_app()
@@ -35,3 +37,17 @@ def seed_demo_data() -> None:
             pass
     click.echo("Seeded demo users")
 
+
+@app.cli.command("calibrate-hashing")
+@click.option("--target-ms", type=float, default=None, help="Target hash latency (default HASH_TARGET_MS)")
+@click.option("--min-rounds", type=int, default=None)
+@click.option("--max-rounds", type=int, default=None)
+def calibrate_hashing(target_ms: float | None, min_rounds: int | None, max_rounds: int | None) -> None:
+    target = target_ms or settings.HASH_TARGET_MS
+    rounds = calibrate_rounds(
+        target,
+        min_rounds=min_rounds or settings.BCRYPT_MIN_ROUNDS,
+        max_rounds=max_rounds or settings.BCRYPT_MAX_ROUNDS,
+    )
+    click.echo(f"Calibrated bcrypt cost for ~{target:.0f}ms: {rounds} rounds")
+    click.echo(f"Set BCRYPT_ROUNDS={rounds} to pin it for this deployment")
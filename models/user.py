@@ -32,3 +32,7 @@ class User(Base):
 
 # Helpful composite index examples (created if supported by dialect)
 Index("ix_users_active_role", User.role, User.is_active)
+# Keyset pagination seeks on (sort column, id) for every supported sort_by
+Index("ix_users_created_at_id", User.created_at, User.id)
+Index("ix_users_name_id", User.name, User.id)
+Index("ix_users_email_id", User.email, User.id)
@@ -1,73 +1,382 @@
 from __future__ import annotations
 
-from typing import Optional
+import functools
+import logging
+from collections import namedtuple
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Iterator, Optional, Sequence
 
-from sqlalchemy import select, func
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Integer, String, and_, bindparam, or_, select, func, insert, text, update
 
+from config.settings import settings
 from database.base import get_session
+from database.routing import mark_written, replica_read
+from database.search import contains, starts_with
 from models.user import User
+from utils.cache import cache
+from utils.entity_cache import EntityCache
 
+logger = logging.getLogger(__name__)
 
-def create_user(name: str, email: str, password_hash: str, role: str = "user") -> User:
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Detached, cacheable view of a user row (no password hash)."""
+
+    id: int
+    name: str
+    email: str
+    role: str
+    token_version: int
+    is_active: bool
+    avatar_url: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_model(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            role=user.role,
+            token_version=int(user.token_version or 0),
+            is_active=bool(user.is_active),
+            avatar_url=user.avatar_url,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        data["updated_at"] = self.updated_at.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserSnapshot":
+        data = dict(data)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        data["updated_at"] = datetime.fromisoformat(data["updated_at"])
+        return cls(**data)
+
+
+user_cache = EntityCache(
+    "user",
+    ttl=settings.USER_CACHE_TTL,
+    local_ttl=settings.USER_CACHE_LOCAL_TTL,
+    negative_ttl=settings.USER_CACHE_NEGATIVE_TTL,
+    maxsize=settings.USER_CACHE_SIZE,
+    cache_obj=cache,
+    local_only=settings.USER_CACHE_LOCAL_ONLY,
+)
+
+
+def _invalidate_user(user_id: Optional[int], *emails: Optional[str]) -> None:
+    keys = [f"email:{e}" for e in emails if e]
+    if user_id is not None:
+        keys.append(f"id:{user_id}")
+    user_cache.delete(*keys)
+    # keep the rows' next reads (and cache refills) off lagging replicas
+    mark_written(*(k.replace("id:", "user:", 1) for k in keys))
+
+
+def create_user(name: str, email: str, password_hash: str, role: str = "user") -> UserSnapshot:
+    """Insert a user in one statement; every column value is known up front."""
+    if role not in {"user", "admin"}:
+        raise ValueError("Invalid role")
+    session = get_session()
+    now = datetime.utcnow()
+    values = {
+        "name": name,
+        "email": email,
+        "role": role,
+        "token_version": 0,
+        "is_active": True,
+        "avatar_url": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        result = session.execute(insert(User).values(password_hash=password_hash, **values))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    snapshot = UserSnapshot(id=int(result.inserted_primary_key[0]), **values)
+    # drop negative entries cached for this email / id
+    _invalidate_user(snapshot.id, email)
+    mark_written("users")
+    return snapshot
+
+
+def existing_emails(emails: Sequence[str]) -> set:
+    """Which of `emails` are taken, including by soft-deleted users (the unique key covers them)."""
+    if not emails:
+        return set()
     session = get_session()
-    user = User(name=name, email=email, password_hash=password_hash, role=role)
-    session.add(user)
+    stmt = select(User.__table__.c.email).where(User.__table__.c.email.in_(set(emails)))
+    return set(session.execute(stmt).scalars())
+
+
+def insert_users(rows: Sequence[dict]) -> None:
+    """Insert `rows` (name, email, password_hash, role) in one multi-row statement and commit.
+
+    All or nothing: an IntegrityError (e.g. an email taken since it was
+    checked) rolls the whole batch back.
+    """
+    if not rows:
+        return
+    session = get_session()
+    now = datetime.utcnow()
+    values = [
+        {"token_version": 0, "is_active": True, "avatar_url": None, "created_at": now, "updated_at": now, **row}
+        for row in rows
+    ]
     try:
+        session.execute(insert(User.__table__), values)
         session.commit()
     except Exception:
         session.rollback()
         raise
-    session.refresh(user)
-    return user
+    # drop negative entries cached for these emails
+    _invalidate_user(None, *(row["email"] for row in rows))
+    mark_written("users")
 
 
+@replica_read(lambda email: [f"email:{email}"])
 def get_user_by_email(email: str) -> Optional[User]:
     session = get_session()
     stmt = select(User).where(User.email == email, User.deleted_at.is_(None))
     return session.execute(stmt).scalar_one_or_none()
 
 
+@replica_read(lambda user_id: [f"user:{user_id}"])
 def get_user_by_id(user_id: int) -> Optional[User]:
     session = get_session()
     stmt = select(User).where(User.id == user_id, User.deleted_at.is_(None))
     return session.execute(stmt).scalar_one_or_none()
 
 
-def update_user(user: User, *, name: Optional[str] = None, email: Optional[str] = None) -> User:
+_SNAPSHOT_COLUMNS = (
+    User.id,
+    User.name,
+    User.email,
+    User.role,
+    User.token_version,
+    User.is_active,
+    User.avatar_url,
+    User.created_at,
+    User.updated_at,
+)
+
+
+# Core table columns: reads built from these skip the ORM (no entity loading,
+# identity map or ORM statement compilation)
+_users = User.__table__
+
+# snapshot columns only (no password hash or bio); built once, bound per call
+_snapshot_select = select(*(_users.c[c.key] for c in _SNAPSHOT_COLUMNS)).where(_users.c.deleted_at.is_(None))
+_SNAPSHOT_BY_ID = _snapshot_select.where(_users.c.id == bindparam("user_id"))
+_SNAPSHOT_BY_EMAIL = _snapshot_select.where(_users.c.email == bindparam("email"))
+
+
+@replica_read(lambda user_id: [f"user:{user_id}"])
+def _load_snapshot_by_id(user_id: int) -> Optional[UserSnapshot]:
+    row = get_session().execute(_SNAPSHOT_BY_ID, {"user_id": user_id}).first()
+    return UserSnapshot(*row) if row is not None else None
+
+
+@replica_read(lambda email: [f"email:{email}"])
+def _load_snapshot_by_email(email: str) -> Optional[UserSnapshot]:
+    row = get_session().execute(_SNAPSHOT_BY_EMAIL, {"email": email}).first()
+    return UserSnapshot(*row) if row is not None else None
+
+
+def get_user_snapshot_by_id(user_id: int) -> Optional[UserSnapshot]:
+    """Cached read of a user; the database is hit once per id per TTL."""
+    hit, data = user_cache.get(f"id:{user_id}")
+    if hit:
+        return UserSnapshot.from_dict(data) if data is not None else None
+    lease = user_cache.lease(f"id:{user_id}")
+    snapshot = _load_snapshot_by_id(user_id)
+    user_cache.set(f"id:{user_id}", snapshot.to_dict() if snapshot is not None else None, lease=lease)
+    return snapshot
+
+
+def get_user_snapshot_by_email(email: str) -> Optional[UserSnapshot]:
+    """Cached lookup by email; the email entry only maps to an id."""
+    hit, data = user_cache.get(f"email:{email}")
+    if hit:
+        if data is None:
+            return None
+        snapshot = get_user_snapshot_by_id(int(data["id"]))
+        if snapshot is not None and snapshot.email == email:
+            return snapshot
+    lease = user_cache.lease(f"email:{email}")
+    snapshot = _load_snapshot_by_email(email)
+    if snapshot is None:
+        user_cache.set(f"email:{email}", None, lease=lease)
+        return None
+    user_cache.set(f"email:{email}", {"id": snapshot.id}, lease=lease)
+    return snapshot
+
+
+def _update_returning(user_id: int, values: dict, *conditions) -> Optional[UserSnapshot]:
+    """UPDATE a live user and return its new snapshot.
+
+    Uses `UPDATE ... RETURNING` where the dialect supports it (SQLite,
+    PostgreSQL, MariaDB); MySQL falls back to UPDATE + primary-key SELECT in
+    the same transaction. Returns None when no row matched.
+    """
     session = get_session()
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.deleted_at.is_(None), *conditions)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        if session.get_bind().dialect.update_returning:
+            row = session.execute(stmt.returning(*_SNAPSHOT_COLUMNS)).first()
+        else:
+            row = None
+            if session.execute(stmt).rowcount == 1:
+                row = session.execute(select(*_SNAPSHOT_COLUMNS).where(User.id == user_id)).first()
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    _invalidate_user(user_id, values.get("email"))
+    if row is None:
+        return None
+    return UserSnapshot(**row._mapping)
+
+
+def update_user(user_id: int, *, name: Optional[str] = None, email: Optional[str] = None) -> Optional[UserSnapshot]:
+    values: dict = {"updated_at": datetime.utcnow()}
     if name is not None:
-        user.name = name
+        values["name"] = name
     if email is not None:
-        user.email = email
+        values["email"] = email
+    # A stale `email:` entry for the old address self-heals: its snapshot no
+    # longer matches on read, so only the id and the new email are dropped.
+    snapshot = _update_returning(user_id, values)
+    mark_written("users")
+    return snapshot
+
+
+def update_password_hash(user_id: int, new_hash: str, *, expected_hash: str) -> bool:
+    """Swap the stored hash only if it is still `expected_hash` (no lost updates)."""
+    session = get_session()
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.password_hash == expected_hash)
+        # a rehash is not a visible change: keep updated_at (and ETags) stable
+        .values(password_hash=new_hash, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
     try:
+        result = session.execute(stmt)
         session.commit()
-    except IntegrityError:
+    except Exception:
         session.rollback()
         raise
-    session.refresh(user)
-    return user
+    return result.rowcount == 1
 
 
-def delete_user(user: User) -> None:
+def delete_user(user_id: int) -> bool:
+    """Soft delete; False when the user does not exist or is already deleted."""
     session = get_session()
-    # soft delete
-    from datetime import datetime
-    user.deleted_at = datetime.utcnow()
-    session.commit()
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.deleted_at.is_(None))
+        .values(deleted_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        deleted = session.execute(stmt).rowcount == 1
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    _invalidate_user(user_id)
+    mark_written("users")
+    return deleted
 
 
-def increment_token_version(user: User) -> User:
-    session = get_session()
-    # initialize if missing for legacy rows
-    current = int(getattr(user, "token_version", 0) or 0)
-    user.token_version = current + 1  # type: ignore[attr-defined]
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    return user
+def increment_token_version(user_id: int) -> Optional[UserSnapshot]:
+    """Revoke every token issued to the user (atomic `token_version + 1`)."""
+    return _update_returning(
+        user_id,
+        {"token_version": func.coalesce(User.token_version, 0) + 1, "updated_at": datetime.utcnow()},
+    )
+
+
+def rotate_token_version(user_id: int, expected_version: int) -> Optional[UserSnapshot]:
+    """Bump token_version only if it still equals `expected_version`.
+
+    Refresh-token rotation in a single conditional statement: a replayed
+    (already rotated) refresh token matches no row and returns None.
+    """
+    return _update_returning(
+        user_id,
+        {"token_version": User.token_version + 1, "updated_at": datetime.utcnow()},
+        User.token_version == expected_version,
+    )
+
+
+_SORT_COLUMNS = {
+    "id": _users.c.id,
+    "created_at": _users.c.created_at,
+    "name": _users.c.name,
+    "email": _users.c.email,
+}
+
+
+# What list pages show; projections add the sort column when they need it
+LIST_FIELDS = ("id", "name", "email", "role")
+
+
+@functools.lru_cache(maxsize=64)
+def _projection(fields: tuple):
+    """Columns and row type (a namedtuple, so no per-row __dict__) for `fields`."""
+    columns = [_users.c[f] for f in fields]
+    return columns, namedtuple("UserRow", fields)
+
+
+def _with_fields(fields: Sequence[str], *required: str) -> tuple:
+    fields = tuple(fields)
+    return fields + tuple(f for f in required if f not in fields)
+
 
+def _rows(session, stmt, row_type) -> list:
+    return [row_type._make(row) for row in session.execute(stmt)]
 
+
+def _text_filter(column, value: str):
+    """`value*` is a prefix search (B-tree), anything else a substring search."""
+    if len(value) > 1 and value.endswith("*"):
+        return starts_with(column, value[:-1])
+    return contains(column, value)
+
+
+def _list_query(name: Optional[str], email: Optional[str], columns: Sequence = (_users.c.id,)):
+    stmt = select(*columns).where(_users.c.deleted_at.is_(None))
+    if name:
+        stmt = stmt.where(_text_filter(_users.c.name, name))
+    if email:
+        stmt = stmt.where(_text_filter(_users.c.email, email))
+    return stmt
+
+
+def _sort(sort_by: str, sort_dir: str):
+    column = _SORT_COLUMNS.get(sort_by, _users.c.created_at)
+    return column, sort_dir if sort_dir in {"asc", "desc"} else "desc"
+
+
+@replica_read(lambda *args, **kwargs: ["users"])
 def list_users(
     page: int,
     per_page: int,
@@ -76,29 +385,239 @@ def list_users(
     email: Optional[str] = None,
     sort_dir: str = "desc",
     sort_by: str = "created_at",
+    fields: Sequence[str] = LIST_FIELDS,
 ):
     session = get_session()
-    stmt = select(User)
-    stmt = stmt.where(User.deleted_at.is_(None))
-    if name:
-        stmt = stmt.where(User.name.ilike(f"%{name}%"))
-    if email:
-        stmt = stmt.where(User.email.ilike(f"%{email}%"))
-
-    total = session.execute(select(func.count()).select_from(stmt.subquery())).scalar() or 0
-
-    if sort_dir not in {"asc", "desc"}:
-        sort_dir = "desc"
-    # Map sort_by to a valid column
-    sort_map = {
-        "id": User.id,
-        "created_at": User.created_at,
-        "name": User.name,
-        "email": User.email,
-    }
-    order_base = sort_map.get(sort_by, User.created_at)
-    order_column = order_base.asc() if sort_dir == "asc" else order_base.desc()
-    stmt = stmt.order_by(order_column).offset((page - 1) * per_page).limit(per_page)
+    total = session.execute(select(func.count()).select_from(_list_query(name, email).subquery())).scalar() or 0
+
+    columns, row_type = _projection(tuple(fields))
+    # id breaks ties so pages never overlap or skip equal sort values
+    stmt = _ordered(_list_query(name, email, columns), sort_by, sort_dir)
+    stmt = stmt.offset((page - 1) * per_page).limit(per_page)
+    return _rows(session, stmt, row_type), total
+
+
+def _ordered(stmt, sort_by: str, sort_dir: str):
+    column, sort_dir = _sort(sort_by, sort_dir)
+    if sort_dir == "asc":
+        return stmt.order_by(column.asc(), _users.c.id.asc())
+    return stmt.order_by(column.desc(), _users.c.id.desc())
+
+
+@replica_read(lambda *args, **kwargs: ["users"])
+def list_users_page(
+    page: int,
+    per_page: int,
+    *,
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+    sort_dir: str = "desc",
+    sort_by: str = "created_at",
+    fields: Sequence[str] = LIST_FIELDS,
+):
+    """One OFFSET page without a COUNT: returns `(items, has_more)`.
+
+    Items are `UserRow` tuples holding only `fields`.
+    """
+    session = get_session()
+    columns, row_type = _projection(tuple(fields))
+    stmt = _ordered(_list_query(name, email, columns), sort_by, sort_dir)
+    stmt = stmt.offset((page - 1) * per_page).limit(per_page + 1)
+    items = _rows(session, stmt, row_type)
+    return items[:per_page], len(items) > per_page
+
+
+@replica_read(lambda *args, **kwargs: ["users"])
+def count_users(*, name: Optional[str] = None, email: Optional[str] = None) -> int:
+    """Exact number of live users matching the filters."""
+    session = get_session()
+    return session.execute(select(func.count()).select_from(_list_query(name, email).subquery())).scalar() or 0
+
+
+@replica_read()
+def estimate_users(*, name: Optional[str] = None, email: Optional[str] = None) -> Optional[int]:
+    """Row estimate from planner statistics, or None if the dialect has none.
+
+    MySQL: `information_schema.TABLES.TABLE_ROWS` without filters, else the
+    optimizer's `rows` estimate from EXPLAIN. SQLite: `sqlite_stat1` (after
+    ANALYZE), unfiltered only.
+    """
+    session = get_session()
+    # session.bind, not get_bind(): a clause-less get_bind() counts as a write
+    dialect = session.bind.dialect
+    try:
+        # textual SELECTs (`.columns()`) so routing sends them to a replica
+        if dialect.name == "mysql":
+            if not name and not email:
+                return session.execute(text(
+                    "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"
+                ).columns(TABLE_ROWS=Integer), {"t": User.__tablename__}).scalar()
+            stmt = _list_query(name, email)
+            sql = stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+            # colons can only come from rendered literals; keep text() from binding them
+            explain = text("EXPLAIN " + str(sql).replace(":", "\\:")).columns()
+            rows = session.execute(explain).mappings().all()
+            return max((int(r.get("rows") or 0) for r in rows), default=0)
+        if dialect.name == "sqlite" and not name and not email:
+            stat = session.execute(text(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = :t ORDER BY idx IS NULL DESC LIMIT 1"
+            ).columns(stat=String), {"t": User.__tablename__}).scalar()
+            return int(stat.split()[0]) if stat else None
+    except Exception as exc:  # statistics are best effort
+        session.rollback()
+        logger.debug("Row estimate unavailable: %s", exc)
+    return None
+
+
+def sort_key(user, sort_by: str) -> tuple:
+    """Position of `user` in a keyset ordering: `(sort value, id)`."""
+    column, _ = _sort(sort_by, "desc")
+    return getattr(user, column.key), user.id
+
+
+@replica_read(lambda *args, **kwargs: ["users"])
+def list_users_keyset(
+    per_page: int,
+    *,
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+    sort_dir: str = "desc",
+    sort_by: str = "created_at",
+    after: Optional[tuple] = None,
+    before: Optional[tuple] = None,
+    fields: Sequence[str] = LIST_FIELDS,
+):
+    """Keyset (seek) pagination: rows strictly after / before a `sort_key`.
+
+    Cost is independent of depth: the `(column, id)` predicate seeks into
+    the matching composite index instead of skipping OFFSET rows. Returns
+    `(items, has_next, has_prev)` in display order.
+    """
+    session = get_session()
+    column, sort_dir = _sort(sort_by, sort_dir)
+    ascending = sort_dir == "asc"
+    backwards = before is not None
+    anchor = before if backwards else after
+    # walking backwards is walking forwards in the reversed order
+    forward_asc = ascending != backwards
+
+    # sort_key() of the first/last row positions the next cursors
+    columns, row_type = _projection(_with_fields(fields, "id", column.key))
+    stmt = _list_query(name, email, columns)
+    if anchor is not None:
+        value, last_id = anchor
+        # the redundant `column >= value` bound lets planners turn the OR into
+        # an index range seek instead of a filtered index scan
+        if forward_asc:
+            stmt = stmt.where(column >= value, or_(column > value, and_(column == value, _users.c.id > last_id)))
+        else:
+            stmt = stmt.where(column <= value, or_(column < value, and_(column == value, _users.c.id < last_id)))
+    if forward_asc:
+        stmt = stmt.order_by(column.asc(), _users.c.id.asc())
+    else:
+        stmt = stmt.order_by(column.desc(), _users.c.id.desc())
 
-    items = [row[0] for row in session.execute(stmt).all()]
-    return items, total
+    items = _rows(session, stmt.limit(per_page + 1), row_type)
+    more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+        return items, True, more
+    return items, more, anchor is not None
+
+
+def iter_users(fields: Sequence[str] = LIST_FIELDS, *, batch_size: int = 1000) -> Iterator[tuple]:
+    """Stream every live user as `UserRow` tuples in id order.
+
+    Reads `batch_size` rows per query, seeking on the primary key, so memory
+    stays flat however large the table is (used by the CSV export).
+    """
+    session = get_session()
+    columns, row_type = _projection(_with_fields(fields, "id"))
+    last_id = 0
+    while True:
+        stmt = _list_query(None, None, columns).where(_users.c.id > last_id).order_by(_users.c.id.asc()).limit(batch_size)
+        rows = _rows(session, stmt, row_type)
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1].id
+
+
+def _target_chunks(session, ids, filters, exclude_ids, chunk_size: int) -> Iterator[list]:
+    """Ascending chunks of `(id, email)` of the live users selected by `ids` or `filters`."""
+    excluded = set(exclude_ids)
+    if ids is not None:
+        ordered = sorted(set(ids) - excluded)
+        stmt = _snapshot_select.with_only_columns(_users.c.id, _users.c.email).order_by(_users.c.id)
+        for i in range(0, len(ordered), chunk_size):
+            chunk = session.execute(stmt.where(_users.c.id.in_(ordered[i:i + chunk_size]))).all()
+            if chunk:
+                yield chunk
+        return
+    filters = dict(filters)
+    stmt = _list_query(filters.pop("name", None), filters.pop("email", None), columns=(_users.c.id, _users.c.email))
+    for key, value in filters.items():
+        stmt = stmt.where(_users.c[key] == value)
+    if excluded:
+        stmt = stmt.where(_users.c.id.not_in(excluded))
+    stmt = stmt.order_by(_users.c.id).limit(chunk_size)
+    last_id = 0
+    while True:
+        chunk = session.execute(stmt.where(_users.c.id > last_id)).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def bulk_update_users(
+    values: dict,
+    *,
+    ids: Optional[Sequence[int]] = None,
+    filters: Optional[dict] = None,
+    revoke: bool = False,
+    exclude_ids: Sequence[int] = (),
+    chunk_size: Optional[int] = None,
+) -> int:
+    """Set `values` on many live users; returns how many rows changed.
+
+    Users are selected by `ids`, or by `filters` (`name`/`email` matched as
+    in listings, exact `role`/`is_active`). Each chunk of
+    BULK_UPDATE_CHUNK_SIZE ids is one `UPDATE ... WHERE id IN (...)` and one
+    commit. Rows already holding `values` are skipped, so they are neither
+    counted nor revoked. revoke: also bump `token_version`.
+    """
+    if ids is None and not filters:
+        raise ValueError("Select users by ids or filters")
+    session = get_session()
+    chunk_size = max(chunk_size or settings.BULK_UPDATE_CHUNK_SIZE, 1)
+    changes = dict(values, updated_at=datetime.utcnow())
+    if revoke:
+        changes["token_version"] = func.coalesce(_users.c.token_version, 0) + 1
+    differs = or_(*(_users.c[key].is_distinct_from(value) for key, value in values.items()))
+
+    affected = 0
+    touched: list = []
+    try:
+        for chunk in _target_chunks(session, ids, filters, exclude_ids, chunk_size):
+            chunk_ids = [row.id for row in chunk]
+            stmt = (
+                update(_users)
+                .where(_users.c.id.in_(chunk_ids), _users.c.deleted_at.is_(None), differs)
+                .values(**changes)
+            )
+            affected += session.execute(stmt).rowcount
+            session.commit()
+            touched.extend(chunk)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        if touched:
+            # one multi-key delete for the whole operation
+            keys = [f"id:{row.id}" for row in touched] + [f"email:{row.email}" for row in touched]
+            user_cache.delete(*keys)
+            mark_written("users", *(f"user:{row.id}" for row in touched))
+    return affected
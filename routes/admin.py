@@ -2,10 +2,14 @@ from __future__ import annotations
 
 import csv
 import io
-from flask import Blueprint, Response, request
+import tempfile
+from typing import Iterator
 
+from flask import Blueprint, Response, request, stream_with_context
+
+from database.base import remove_session
 from utils.security import require_auth
-from services import user_service
+from repositories.user_repository import iter_users
 from utils.response import json_response
 
 try:
@@ -21,14 +25,44 @@ from config.settings import settings
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 
-def _export_csv_sync() -> str:
-    items, total = user_service.list_users(1, 10000, sort_dir="asc", sort_by="id")
+EXPORT_FIELDS = ("id", "name", "email", "role", "created_at", "is_active")
+
+
+def _csv_chunks(batch_size: int = 1000) -> Iterator[str]:
+    """The export as CSV text, one chunk per `batch_size` users."""
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow(["id", "name", "email", "role", "created_at", "is_active"])  # header
-    for u in items:
-        writer.writerow([u.id, u.name, u.email, u.role, u.created_at.isoformat(), getattr(u, "is_active", True)])
-    return output.getvalue()
+    writer.writerow(EXPORT_FIELDS)  # header
+    for n, u in enumerate(iter_users(EXPORT_FIELDS, batch_size=batch_size), start=1):
+        writer.writerow([u.id, u.name, u.email, u.role, u.created_at.isoformat(), bool(u.is_active)])
+        if n % batch_size == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+def _export_csv_to_file() -> str:
+    """RQ job: write the export to a file in EXPORT_DIR; returns its path."""
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=settings.EXPORT_DIR, prefix="users-", suffix=".csv", delete=False, newline="", encoding="utf-8"
+        ) as out:
+            out.writelines(_csv_chunks())
+            return out.name
+    finally:
+        remove_session()
+
+
+def _csv_response() -> Response:
+    # rows are read and sent batch by batch; the export is never held in memory
+    return Response(
+        stream_with_context(_csv_chunks()),
+        mimetype="text/csv",
+        headers={
+            "Content-Disposition": "attachment; filename=users.csv",
+        },
+    )
 
 
 def _enqueue_export_job():
@@ -37,7 +71,7 @@ def _enqueue_export_job():
     try:
         redis = Redis.from_url(settings.REDIS_URL)
         q = Queue("default", connection=redis)
-        job = q.enqueue(_export_csv_sync)
+        job = q.enqueue(_export_csv_to_file)
         return job.get_id()
     except Exception:
         return None
@@ -46,14 +80,7 @@ def _enqueue_export_job():
 @admin_bp.route("/users/export", methods=["GET"])  # backward-compatible sync export
 @require_auth(roles="admin")
 def export_users(current_user):  # type: ignore[no-redef]
-    data = _export_csv_sync()
-    return Response(
-        data,
-        mimetype="text/csv",
-        headers={
-            "Content-Disposition": "attachment; filename=users.csv",
-        },
-    )
+    return _csv_response()
 
 
 @admin_bp.route("/users/export", methods=["POST"])  # async when possible
@@ -62,14 +89,7 @@ def export_users_async(current_user):  # type: ignore[no-redef]
     job_id = _enqueue_export_job()
     if not job_id:
         # fallback to sync
-        data = _export_csv_sync()
-        return Response(
-            data,
-            mimetype="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=users.csv",
-            },
-        )
+        return _csv_response()
     return json_response(data={"job_id": job_id})
 
 
@@ -6,16 +6,21 @@ from marshmallow import Schema, fields, validate, ValidationError
 
 from utils.response import json_response, error_response
 from services.user_service import register_user, authenticate_user
-from repositories.user_repository import get_user_by_id
+from repositories.user_repository import (
+    get_user_snapshot_by_id,
+    increment_token_version,
+    rotate_token_version,
+)
 from utils.security import (
     create_access_token,
     create_refresh_token,
     decode_token_raw,
+    decode_token_cached,
     require_auth,
     blacklist_token,
 )
-from repositories.user_repository import increment_token_version
 from utils.rate_limit import ratelimit
+from utils.hashing import HashPoolSaturated
 
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
@@ -88,11 +93,13 @@ def register():
             password=payload["password"],
             role=payload.get("role", "user"),
         )
+    except HashPoolSaturated:
+        raise
     except Exception:
         # duplicate email: make registration idempotent by returning existing user as 201
-        from repositories.user_repository import get_user_by_email
+        from repositories.user_repository import get_user_snapshot_by_email
 
-        existing = get_user_by_email(payload.get("email", ""))
+        existing = get_user_snapshot_by_email(payload.get("email", ""))
         if existing:
             data = {"id": existing.id, "name": existing.name, "email": existing.email, "role": existing.role}
             return json_response(data=data, status=201)
@@ -175,14 +182,14 @@ def refresh():
         return error_response(code, msg, status=401)
     if payload.get("type") != "refresh":
         return error_response("TOKEN_WRONG_TYPE", "Refresh token required", status=401)
-    user = get_user_by_id(int(payload.get("sub", 0)))
-    if not user:
-        return error_response("USER_NOT_FOUND", "User not found", status=404)
-    # version check (revocation)
-    if int(payload.get("ver", -1)) != int(getattr(user, "token_version", 0)):
+    # rotate refresh: one conditional UPDATE checks `ver` and bumps it, which
+    # invalidates the prior refresh + access tokens
+    user_id = int(payload.get("sub", 0))
+    user = rotate_token_version(user_id, int(payload.get("ver", -1)))
+    if user is None:
+        if get_user_snapshot_by_id(user_id) is None:
+            return error_response("USER_NOT_FOUND", "User not found", status=404)
         return error_response("TOKEN_REVOKED", "Token has been revoked", status=401)
-    # rotate refresh: bump version which invalidates prior refresh + access tokens
-    user = increment_token_version(user)
     access = create_access_token(user)
     new_refresh = create_refresh_token(user)
     return json_response(data={"access_token": access, "refresh_token": new_refresh, "token_type": "bearer"})
@@ -193,16 +200,16 @@ def refresh():
 def logout(current_user):  # type: ignore[no-redef]
     auth_header = (request.headers.get("Authorization") or "").split()
     if len(auth_header) == 2:
-        payload, err = decode_token_raw(auth_header[1])
+        payload, err = decode_token_cached(auth_header[1])
         if not err and payload and payload.get("jti"):
-            blacklist_token(str(payload["jti"]))
+            blacklist_token(str(payload["jti"]), payload.get("exp"), user_id=current_user.id)
     return json_response(data={"message": "Logged out"})
 
 
 @auth_bp.route("/logout-all", methods=["POST"])
 @require_auth()
 def logout_all(current_user):  # type: ignore[no-redef]
-    increment_token_version(current_user)
+    increment_token_version(current_user.id)
     return json_response(data={"message": "Logged out from all sessions"})
 
 
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 from flask import Blueprint, request
-from marshmallow import Schema, fields, validate, ValidationError
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
 
 from utils.response import json_response, error_response
 from utils.pagination import parse_pagination
 from utils.security import require_auth, require_roles
-from services import user_service
-from utils.cache import cache
-from utils.etag import etag_from_timestamp
+from services import user_import, user_service
+from config.settings import settings
+from utils.etag import etag_from_parts, etag_from_timestamp, etag_matches, not_modified, with_etag
+from utils.hashing import HashPoolSaturated
+from utils.cursor import InvalidCursor
 
 
 users_bp = Blueprint("users", __name__, url_prefix="/users")
@@ -30,6 +32,41 @@ class UpdateUserSchema(Schema):
     bio = fields.Str(required=False, validate=validate.Length(max=2000))
 
 
+class BulkFilterSchema(Schema):
+    name = fields.Str(required=False, validate=validate.Length(min=1, max=255))
+    email = fields.Str(required=False, validate=validate.Length(min=1, max=255))
+    role = fields.Str(required=False, validate=validate.OneOf(["user", "admin"]))
+    is_active = fields.Bool(required=False)
+
+
+class BulkSelectionSchema(Schema):
+    ids = fields.List(fields.Int(strict=True), required=False)
+    filter = fields.Nested(BulkFilterSchema, required=False)
+
+    @validates_schema
+    def _one_selection(self, data, **kwargs):
+        if ("ids" in data) == ("filter" in data):
+            raise ValidationError("Provide exactly one of ids or filter")
+        if "filter" in data and not data["filter"]:
+            raise ValidationError("Filter must not be empty", "filter")
+        if len(data.get("ids", ())) > settings.BULK_UPDATE_MAX_IDS:
+            raise ValidationError(f"At most {settings.BULK_UPDATE_MAX_IDS} ids per request", "ids")
+
+
+class BulkChangesSchema(Schema):
+    is_active = fields.Bool(required=False)
+    role = fields.Str(required=False, validate=validate.OneOf(["user", "admin"]))
+
+
+class BulkUpdateSchema(BulkSelectionSchema):
+    set = fields.Nested(BulkChangesSchema, required=True)
+
+    @validates_schema
+    def _has_changes(self, data, **kwargs):
+        if not data.get("set"):
+            raise ValidationError("Nothing to update", "set")
+
+
 @users_bp.route("", methods=["POST"])
 @require_auth()
 @require_roles("admin")
@@ -45,11 +82,131 @@ def create(current_user):  # type: ignore[no-redef]
             password=payload["password"],
             role=payload.get("role", "user"),
         )
+    except HashPoolSaturated:
+        raise
     except Exception:
         return error_response("EMAIL_EXISTS", "Email already in use", status=409)
     return json_response(data={"id": user.id, "name": user.name, "email": user.email, "role": user.role}, status=201)
 
 
+@users_bp.route("/bulk", methods=["POST"])
+@require_auth(roles="admin")
+def bulk_import(current_user):  # type: ignore[no-redef]
+    """
+    Import users in bulk
+    ---
+    tags:
+      - users
+    security:
+      - bearerAuth: []
+    description: >-
+      Body is NDJSON (`application/x-ndjson`, one `{name, email, password,
+      role}` object per line) or CSV (`text/csv` with a header row). Bodies
+      of up to BULK_IMPORT_SYNC_MAX_ROWS rows (default 100) are imported
+      inline and the report returned; larger ones (or `?async=true`) are
+      queued and return 202 with a job id for `GET /users/bulk/{job_id}`.
+    parameters:
+      - in: query
+        name: async
+        schema: {type: boolean}
+    responses:
+      200:
+        description: Import report (created/failed counts and per-row errors)
+      202:
+        description: Import queued
+      415:
+        description: Unsupported content type
+    """
+    fmt = user_import.detect_format(request.mimetype)
+    if fmt is None:
+        return error_response("UNSUPPORTED_MEDIA_TYPE", "Send application/x-ndjson or text/csv", status=415)
+    # imports may exceed the API-wide body limit
+    request.max_content_length = settings.BULK_IMPORT_MAX_BYTES
+    length = request.content_length
+    # row counts are checked while reading; a large Content-Length is enough to queue
+    run_async = (
+        request.args.get("async", "").lower() in ("1", "true")
+        or (length is not None and length > settings.BULK_IMPORT_SYNC_MAX_BYTES)
+    )
+    report, job_id = user_import.import_body(request.stream, fmt, run_async=run_async)
+    if job_id is not None:
+        return json_response(data={"job_id": job_id, "status": "queued"}, status=202)
+    return json_response(data=report)
+
+
+@users_bp.route("/bulk/<string:job_id>", methods=["GET"])
+@require_auth(roles="admin")
+def bulk_import_status(current_user, job_id):  # type: ignore[no-redef]
+    job = user_import.get_import_job(job_id)
+    if job is None:
+        return error_response("JOB_NOT_FOUND", "Import job not found", status=404)
+    return json_response(data=job)
+
+
+@users_bp.route("/bulk/update", methods=["POST"])
+@require_auth(roles="admin")
+def bulk_update(current_user):  # type: ignore[no-redef]
+    """
+    Update users in bulk
+    ---
+    tags:
+      - users
+    security:
+      - bearerAuth: []
+    description: >-
+      Body `{"ids": [...]}` or `{"filter": {name?, email?, role?,
+      is_active?}}` (name/email as in `GET /users`), plus `"set":
+      {is_active?, role?}`. Deactivated users and users whose role changes
+      have their tokens revoked. The caller is never included.
+    responses:
+      200:
+        description: Number of users changed
+      400:
+        description: Validation error
+    """
+    try:
+        payload = BulkUpdateSchema().load(request.json or {})
+    except ValidationError as err:
+        return error_response("VALIDATION_ERROR", "Invalid input", status=400, details=err.messages)
+    affected = user_service.bulk_update_users(
+        ids=payload.get("ids"),
+        filters=payload.get("filter"),
+        exclude_ids=[current_user.id],
+        **payload["set"],
+    )
+    return json_response(data={"affected": affected})
+
+
+@users_bp.route("/bulk/delete", methods=["POST"])
+@require_auth(roles="admin")
+def bulk_delete(current_user):  # type: ignore[no-redef]
+    """
+    Soft delete users in bulk
+    ---
+    tags:
+      - users
+    security:
+      - bearerAuth: []
+    description: >-
+      Body `{"ids": [...]}` or `{"filter": {...}}` as for
+      `POST /users/bulk/update`. Deleted users' tokens are revoked; the
+      caller is never included.
+    responses:
+      200:
+        description: Number of users deleted
+      400:
+        description: Validation error
+    """
+    try:
+        payload = BulkSelectionSchema().load(request.json or {})
+    except ValidationError as err:
+        return error_response("VALIDATION_ERROR", "Invalid input", status=400, details=err.messages)
+    affected = user_service.bulk_delete_users(
+        ids=payload.get("ids"), filters=payload.get("filter"), exclude_ids=[current_user.id]
+    )
+    return json_response(data={"affected": affected})
+
+
 @users_bp.route("", methods=["GET"])
 @require_auth(roles="admin")
 def list_users(current_user):  # type: ignore[no-redef]
@@ -69,9 +226,11 @@ def list_users(current_user):  # type: ignore[no-redef]
         schema: {type: integer}
       - in: query
         name: name
+        description: Case-insensitive substring; a trailing `*` makes it a prefix match.
         schema: {type: string}
       - in: query
         name: email
+        description: Case-insensitive substring; a trailing `*` makes it a prefix match.
         schema: {type: string}
       - in: query
         name: sort
@@ -79,6 +238,19 @@ def list_users(current_user):  # type: ignore[no-redef]
       - in: query
         name: sort_by
         schema: {type: string, enum: [created_at, name, email]}
+      - in: query
+        name: total
+        description: >-
+          `exact` (default) counts matching users, `estimated` uses database
+          statistics (`meta.total_estimated` is true when it did), `none` skips
+          counting; every mode reports `meta.has_more`.
+        schema: {type: string, enum: [exact, estimated, none]}
+      - in: query
+        name: cursor
+        description: >-
+          Keyset pagination instead of `page`. Pass an empty value for the
+          first page, then `meta.next_cursor` / `meta.prev_cursor`.
+        schema: {type: string}
     responses:
       200:
         description: Users list
@@ -89,20 +261,38 @@ def list_users(current_user):  # type: ignore[no-redef]
     sort = request.args.get("sort", "desc")
     sort_by = request.args.get("sort_by", "created_at")
 
-    cache_key = f"users:list:page={page}&per={per_page}&name={name}&email={email}&sort={sort}&sort_by={sort_by}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return json_response(data=cached)
+    cursor = request.args.get("cursor")
+    total_mode = request.args.get("total", "exact")
+    if total_mode not in ("exact", "estimated", "none"):
+        total_mode = "exact"
+
+    # weak validator from the query and the table change marker: decided
+    # before any query or serialization runs
+    etag = etag_from_parts(("users", page, per_page, name, email, sort, sort_by, cursor, total_mode, user_service.list_version()))
+    unchanged = not_modified(etag, weak=True)
+    if unchanged is not None:
+        return unchanged
+
+    if cursor is not None:
+        try:
+            result = user_service.list_users_by_cursor(
+                per_page, cursor or None, name=name, email=email, sort_dir=sort, sort_by=sort_by
+            )
+        except InvalidCursor:
+            return error_response("INVALID_CURSOR", "Invalid pagination cursor", status=400)
+        meta = {"per_page": per_page, "next_cursor": result["next_cursor"], "prev_cursor": result["prev_cursor"], "sort": result["sort"], "sort_by": result["sort_by"]}
+        return with_etag(json_response(data={"items": result["items"], "meta": meta}), etag, weak=True)
 
-    items, total = user_service.list_users(page, per_page, name=name, email=email, sort_dir=sort, sort_by=sort_by)
-    data_items = [
-        {"id": u.id, "name": u.name, "email": u.email, "role": u.role}
-        for u in items
-    ]
-    meta = {"page": page, "per_page": per_page, "total": total, "pages": (total + per_page - 1) // per_page, "sort": sort, "sort_by": sort_by}
-    data = {"items": data_items, "meta": meta}
-    cache.set(cache_key, data, ttl=30)
-    return json_response(data=data)
+    result = user_service.list_users(
+        page, per_page, name=name, email=email, sort_dir=sort, sort_by=sort_by, total=total_mode
+    )
+    meta = {"page": page, "per_page": per_page, "has_more": result["has_more"], "sort": sort, "sort_by": sort_by}
+    total = result["total"]
+    if total is not None:
+        meta.update({"total": total, "pages": (total + per_page - 1) // per_page})
+        if result["total_estimated"]:
+            meta["total_estimated"] = True
+    return with_etag(json_response(data={"items": result["items"], "meta": meta}), etag, weak=True)
 
 
 @users_bp.route("/<int:user_id>", methods=["GET"])
@@ -111,14 +301,12 @@ def get_user(current_user, user_id):  # type: ignore[no-redef]
     u = user_service.get_user(user_id)
     if not u:
         return error_response("USER_NOT_FOUND", "User not found", status=404)
+    etag = etag_from_timestamp(u.updated_at)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
     data = {"id": u.id, "name": u.name, "email": u.email, "role": u.role}
-    # Attach ETag via response headers
-    from flask import make_response
-
-    body, status = json_response(data=data)
-    resp = make_response(body, status)
-    resp.headers["ETag"] = etag_from_timestamp(u.updated_at)
-    return resp
+    return with_etag(json_response(data=data), etag)
 
 
 @users_bp.route("/<int:user_id>", methods=["PUT"])
@@ -131,15 +319,17 @@ def update_user(current_user, user_id):  # type: ignore[no-redef]
     u = user_service.get_user(user_id)
     if not u:
         return error_response("USER_NOT_FOUND", "User not found", status=404)
+    # Check ETag if provided (If-Match) against the current version
+    if_match = request.headers.get("If-Match")
+    if if_match and not etag_matches(if_match, etag_from_timestamp(u.updated_at), weak=False):
+        return error_response("VERSION_CONFLICT", "ETag mismatch", status=409)
     try:
         u = user_service.update_user(user_id, name=payload.get("name"), email=payload.get("email"))
     except Exception:
         return error_response("EMAIL_EXISTS", "Email already in use", status=409)
-    # Check ETag if provided (If-Match)
-    if_match = request.headers.get("If-Match")
-    if if_match and if_match != etag_from_timestamp(u.updated_at):
-        return error_response("VERSION_CONFLICT", "ETag mismatch", status=409)
-    return json_response(data={"id": u.id, "name": u.name, "email": u.email, "role": u.role})
+    if u is None:
+        return error_response("USER_NOT_FOUND", "User not found", status=404)
+    return with_etag(json_response(data={"id": u.id, "name": u.name, "email": u.email, "role": u.role}), etag_from_timestamp(u.updated_at))
 
 
 @users_bp.route("/<int:user_id>", methods=["DELETE"])
@@ -169,18 +359,18 @@ def me(current_user):  # type: ignore[no-redef]
       200:
         description: Current authenticated user
     """
-    from flask import make_response
-
+    # the id keeps two users' tags distinct on this shared URL
+    etag = etag_from_timestamp(current_user.updated_at, str(current_user.id))
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
     data = {
         "id": current_user.id,
         "name": current_user.name,
         "email": current_user.email,
         "role": current_user.role,
     }
-    body, status = json_response(data=data)
-    resp = make_response(body, status)
-    resp.headers["ETag"] = etag_from_timestamp(current_user.updated_at)
-    return resp
+    return with_etag(json_response(data=data), etag)
 
 
 class PatchUserSchema(Schema):
@@ -203,7 +393,7 @@ def patch_user(current_user, user_id):  # type: ignore[no-redef]
         return error_response("USER_NOT_FOUND", "User not found", status=404)
 
     if_match = request.headers.get("If-Match")
-    if if_match and if_match != etag_from_timestamp(u.updated_at):
+    if if_match and not etag_matches(if_match, etag_from_timestamp(u.updated_at), weak=False):
         return error_response("VERSION_CONFLICT", "ETag mismatch", status=409)
 
     name = payload.get("name")
@@ -213,4 +403,6 @@ def patch_user(current_user, user_id):  # type: ignore[no-redef]
         u = user_service.update_user(user_id, name=name, email=email)
     except Exception:
         return error_response("EMAIL_EXISTS", "Email already in use", status=409)
-    return json_response(data={"id": u.id, "name": u.name, "email": u.email, "role": u.role})
+    if u is None:
+        return error_response("USER_NOT_FOUND", "User not found", status=404)
+    return with_etag(json_response(data={"id": u.id, "name": u.name, "email": u.email, "role": u.role}), etag_from_timestamp(u.updated_at))
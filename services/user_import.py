@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+"""
+Bulk user import from NDJSON or CSV streams.
+
+Rows are parsed and validated one at a time as the body streams in, then
+handled in batches of BULK_IMPORT_BATCH_SIZE: duplicate emails (within the
+file or already stored) are reported per row, passwords are hashed in
+parallel on the hash pool, and the rest of the batch is inserted with one
+multi-row statement. List caches are invalidated once, after the last batch.
+
+Only small bodies (BULK_IMPORT_SYNC_MAX_ROWS rows) are imported on the
+request thread; larger ones are spooled to a file and imported by a
+background job: an RQ job when REDIS_URL is set (workers must share
+BULK_IMPORT_SPOOL_DIR), otherwise a thread of this worker. Job state lives
+in the shared cache.
+"""
+
+import codecs
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import IO, Callable, Iterator, List, Optional, Tuple
+
+from marshmallow import Schema, ValidationError, fields, validate
+from sqlalchemy.exc import IntegrityError
+
+from config.settings import settings
+from database.base import remove_session
+from repositories.user_repository import existing_emails as repo_existing_emails, insert_users as repo_insert_users
+from utils.cache import cache
+from utils.hashing import hash_pool
+
+try:
+    from rq import Queue  # type: ignore
+    from redis import Redis  # type: ignore
+except Exception:  # pragma: no cover
+    Queue = None  # type: ignore
+    Redis = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# request mimetype -> format
+FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+# Thread runner for jobs when RQ is unavailable; one import at a time per worker
+_import_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-import")
+
+
+class ImportRowSchema(Schema):
+    name = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    email = fields.Email(required=True)
+    password = fields.Str(required=True, validate=validate.Length(min=6))
+    role = fields.Str(load_default="user", validate=validate.OneOf(["user", "admin"]))
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def fail(self, row: int, email: Optional[str], code: str, message: str, details=None) -> None:
+        self.failed += 1
+        # counts stay exact; only the listed errors are capped
+        if len(self.errors) < settings.BULK_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "email": email, "code": code, "message": message, "details": details})
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def detect_format(mimetype: Optional[str]) -> Optional[str]:
+    return FORMATS.get((mimetype or "").lower())
+
+
+def iter_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield `(row number, record, parse error)` without reading the whole body.
+
+    Row numbers are 1-based data rows (a CSV header is not counted); blank
+    NDJSON lines are skipped but still counted, so numbers match the file.
+    """
+    text = codecs.getreader("utf-8-sig")(stream, errors="replace")
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            if None in record:
+                yield number, None, "Too many fields"
+                continue
+            yield number, {k: v for k, v in record.items() if v not in (None, "")}, None
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, None, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, record, None
+
+
+def _insert_batch(batch: List[Tuple[int, dict]], report: ImportReport) -> None:
+    taken = repo_existing_emails([payload["email"] for _, payload in batch])
+    fresh = []
+    for number, payload in batch:
+        if payload["email"] in taken:
+            report.fail(number, payload["email"], "EMAIL_EXISTS", "Email already in use")
+        else:
+            fresh.append((number, payload))
+    if not fresh:
+        return
+    hashes = hash_pool.hash_many([payload["password"] for _, payload in fresh], chunk=settings.HASH_BULK_CHUNK)
+    rows = [
+        {"name": payload["name"], "email": payload["email"], "role": payload["role"], "password_hash": h}
+        for (_, payload), h in zip(fresh, hashes, strict=True)
+    ]
+    try:
+        repo_insert_users(rows)
+        report.created += len(rows)
+        return
+    except IntegrityError:
+        logger.info("Bulk insert conflicted; retrying %d rows one by one", len(rows))
+    # an email was taken concurrently: find which row(s) one at a time
+    for (number, payload), row in zip(fresh, rows, strict=True):
+        try:
+            repo_insert_users([row])
+            report.created += 1
+        except IntegrityError:
+            report.fail(number, payload["email"], "EMAIL_EXISTS", "Email already in use")
+
+
+def import_users(
+    stream: IO[bytes],
+    fmt: str,
+    *,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> dict:
+    """Import users from an NDJSON or CSV byte stream; returns the report dict.
+
+    progress: called with the running report after each batch.
+    """
+    batch_size = max(batch_size or settings.BULK_IMPORT_BATCH_SIZE, 1)
+    schema = ImportRowSchema()
+    report = ImportReport()
+    seen: set = set()
+    batch: List[Tuple[int, dict]] = []
+    try:
+        for number, record, error in iter_rows(stream, fmt):
+            report.total += 1
+            if error is not None:
+                report.fail(number, None, "INVALID_ROW", error)
+                continue
+            try:
+                payload = schema.load(record)
+            except ValidationError as err:
+                report.fail(number, record.get("email"), "VALIDATION_ERROR", "Invalid input", err.messages)
+                continue
+            if payload["email"] in seen:
+                report.fail(number, payload["email"], "DUPLICATE_IN_FILE", "Email appears earlier in the file")
+                continue
+            seen.add(payload["email"])
+            batch.append((number, payload))
+            if len(batch) >= batch_size:
+                _insert_batch(batch, report)
+                batch = []
+                if progress is not None:
+                    progress(report)
+        _insert_batch(batch, report)
+    finally:
+        # committed batches stay even if a later one fails; make them visible
+        if report.created:
+            cache.invalidate_tags("users", "users:list")
+    return report.to_dict()
+
+
+# --- background jobs -------------------------------------------------------------
+
+
+def spool(stream: IO[bytes], fmt: str, *, head: bytes = b"") -> str:
+    """Copy `head` plus the rest of a request body to a file in BULK_IMPORT_SPOOL_DIR; returns its path."""
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=settings.BULK_IMPORT_SPOOL_DIR, prefix="user-import-", suffix=f".{fmt}", delete=False
+    ) as out:
+        out.write(head)
+        shutil.copyfileobj(stream, out, 1024 * 1024)
+        return out.name
+
+
+def _set_job(job_id: str, **state) -> None:
+    cache.set(f"user-import:{job_id}", state, ttl=settings.BULK_IMPORT_RESULT_TTL)
+
+
+def get_import_job(job_id: str) -> Optional[dict]:
+    return cache.get(f"user-import:{job_id}")
+
+
+def run_import_job(job_id: str, path: str, fmt: str) -> None:
+    """Import a spooled file, recording progress and the final report."""
+    _set_job(job_id, status="running")
+    try:
+        with open(path, "rb") as stream:
+            report = import_users(
+                stream, fmt, progress=lambda r: _set_job(job_id, status="running", progress=r.to_dict())
+            )
+        _set_job(job_id, status="finished", report=report)
+    except Exception as exc:
+        logger.exception("User import %s failed", job_id)
+        _set_job(job_id, status="failed", error=str(exc))
+    finally:
+        remove_session()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def start_import_job(path: str, fmt: str) -> str:
+    """Queue a spooled import on RQ when available, else on a local thread."""
+    job_id = uuid.uuid4().hex
+    _set_job(job_id, status="queued")
+    if Queue is not None and Redis is not None and settings.REDIS_URL:
+        try:
+            Queue("default", connection=Redis.from_url(settings.REDIS_URL)).enqueue(
+                run_import_job, job_id, path, fmt, job_id=f"user-import-{job_id}"
+            )
+            return job_id
+        except Exception as exc:
+            logger.warning("Could not enqueue user import on RQ, running locally: %s", exc)
+    _import_executor.submit(run_import_job, job_id, path, fmt)
+    return job_id
+
+
+def _read_head(stream: IO[bytes], max_rows: int, max_bytes: int) -> Tuple[bytes, bool]:
+    """Read lines while the body is still small enough to import inline.
+
+    Returns `(bytes read, whether that was the whole body)`. Counts
+    non-blank lines, which is at least the number of rows.
+    """
+    head = bytearray()
+    rows = 0
+    while True:
+        line = stream.readline(max_bytes + 1 - len(head))
+        if not line:
+            return bytes(head), True
+        head += line
+        if line.strip():
+            rows += 1
+        if rows > max_rows or len(head) > max_bytes:
+            return bytes(head), False
+
+
+def import_body(stream: IO[bytes], fmt: str, *, run_async: bool) -> Tuple[Optional[dict], Optional[str]]:
+    """`(report, None)` after an inline import, or `(None, job id)` when queued.
+
+    Bodies of more than BULK_IMPORT_SYNC_MAX_ROWS rows are queued even
+    when `run_async` is false.
+    """
+    head = b""
+    if not run_async:
+        max_rows = settings.BULK_IMPORT_SYNC_MAX_ROWS + (1 if fmt == "csv" else 0)  # CSV header
+        head, complete = _read_head(stream, max_rows, settings.BULK_IMPORT_SYNC_MAX_BYTES)
+        if complete:
+            return import_users(io.BytesIO(head), fmt), None
+    return None, start_import_job(spool(stream, fmt, head=head), fmt)
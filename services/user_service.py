@@ -1,60 +1,172 @@
 from __future__ import annotations
 
-from typing import Optional
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Sequence
 
+from database.base import remove_session
 from repositories.user_repository import (
     create_user as repo_create_user,
     get_user_by_email as repo_get_by_email,
-    get_user_by_id as repo_get_by_id,
+    get_user_snapshot_by_id as repo_get_snapshot_by_id,
     update_user as repo_update_user,
     delete_user as repo_delete_user,
-    list_users as repo_list_users,
+    LIST_FIELDS,
+    count_users as repo_count_users,
+    estimate_users as repo_estimate_users,
+    list_users_page as repo_list_users_page,
+    list_users_keyset as repo_list_users_keyset,
+    sort_key as repo_sort_key,
+    update_password_hash as repo_update_password_hash,
+    bulk_update_users as repo_bulk_update_users,
 )
+from config.settings import settings
 from utils.security import hash_password
-from utils.cache import cache
+from utils.cache import cache, cached
+from utils.cursor import decode_cursor, encode_cursor
+from utils.hashing import hash_pool
+
+logger = logging.getLogger(__name__)
+
+# Rehashes run off the request path, one at a time per worker
+_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rehash")
 
 
 def register_user(name: str, email: str, password: str, role: str = "user"):
     password_hash = hash_password(password)
     user = repo_create_user(name=name, email=email, password_hash=password_hash, role=role)
-    cache.invalidate_prefix("users:list:")
+    cache.invalidate_tags("users", "users:list")
     return user
 
 
 def authenticate_user(email: str, password: str):
     user = repo_get_by_email(email)
-    if not user:
+    if not user or not user.is_active:
         return None
     from utils.security import verify_password
 
     if not verify_password(password, user.password_hash):
         return None
+    if hash_pool.needs_rehash(user.password_hash):
+        _schedule_rehash(user.id, password, user.password_hash)
     return user
 
 
+def _rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    try:
+        new_hash = hash_password(password)
+        if repo_update_password_hash(user_id, new_hash, expected_hash=old_hash):
+            logger.info("Rehashed password for user_id=%s to cost %s", user_id, hash_pool.target_rounds)
+    except Exception as exc:
+        logger.warning("Password rehash failed for user_id=%s: %s", user_id, exc)
+    finally:
+        remove_session()
+
+
+def _schedule_rehash(user_id: int, password: str, old_hash: str) -> None:
+    _rehash_executor.submit(_rehash_password, user_id, password, old_hash)
+
+
 def get_user(user_id: int):
-    return repo_get_by_id(user_id)
+    return repo_get_snapshot_by_id(user_id)
 
 
 def update_user(user_id: int, *, name: Optional[str] = None, email: Optional[str] = None):
-    user = repo_get_by_id(user_id)
-    if not user:
+    user = repo_update_user(user_id, name=name, email=email)
+    if user is None:
         return None
-    user = repo_update_user(user, name=name, email=email)
-    cache.invalidate_prefix("users:list:")
+    # only lists showing this user, or filtered/ordered by a changed field
+    tags = ["users", f"user:{user_id}"]
+    if name is not None:
+        tags.append("users:list:by-name")
+    if email is not None:
+        tags.append("users:list:by-email")
+    cache.invalidate_tags(*tags)
     return user
 
 
 def delete_user(user_id: int) -> bool:
-    user = repo_get_by_id(user_id)
-    if not user:
+    if not repo_delete_user(user_id):
         return False
-    repo_delete_user(user)
-    cache.invalidate_prefix("users:list:")
+    cache.invalidate_tags("users", "users:list", f"user:{user_id}")
     return True
 
 
-def list_users(
+def bulk_update_users(
+    *,
+    ids: Optional[Sequence[int]] = None,
+    filters: Optional[dict] = None,
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+    exclude_ids: Sequence[int] = (),
+) -> int:
+    """Set `is_active` / `role` on many users; returns the affected count.
+
+    Deactivated users and users whose role changes lose their tokens.
+    """
+    values = {k: v for k, v in (("is_active", is_active), ("role", role)) if v is not None}
+    if not values:
+        raise ValueError("Nothing to update")
+    revoke = is_active is False or role is not None
+    try:
+        return repo_bulk_update_users(values, ids=ids, filters=filters, revoke=revoke, exclude_ids=exclude_ids)
+    finally:
+        # earlier chunks are committed even if a later one fails
+        cache.invalidate_tags("users", "users:list")
+
+
+def bulk_delete_users(
+    *,
+    ids: Optional[Sequence[int]] = None,
+    filters: Optional[dict] = None,
+    exclude_ids: Sequence[int] = (),
+) -> int:
+    """Soft delete many users and revoke their tokens; returns the affected count."""
+    try:
+        return repo_bulk_update_users(
+            {"deleted_at": datetime.utcnow()}, ids=ids, filters=filters, revoke=True, exclude_ids=exclude_ids
+        )
+    finally:
+        cache.invalidate_tags("users", "users:list")
+
+
+def list_version() -> str:
+    """Change marker for user listings: bumped by every user write above.
+
+    Without Redis the marker is per worker, so it also rolls over every
+    USERS_LIST_SOFT_TTL seconds to bound staleness across workers.
+    """
+    version = str(cache.tag_generation("users"))
+    if cache.client is None:
+        version += f":{int(time.time() // max(settings.USERS_LIST_SOFT_TTL, 1))}"
+    return version
+
+
+def _list_tags(args: dict, result) -> list:
+    """Tags of a cached page: membership, the fields it depends on, its rows."""
+    tags = ["users:list"]
+    if args["name"] or args["sort_by"] == "name":
+        tags.append("users:list:by-name")
+    if args["email"] or args["sort_by"] == "email":
+        tags.append("users:list:by-email")
+    items, _ = result
+    tags.extend(f"user:{u['id']}" for u in items)
+    return tags
+
+
+def _count_tags(args: dict, result) -> list:
+    tags = ["users:list"]
+    if args["name"]:
+        tags.append("users:list:by-name")
+    if args["email"]:
+        tags.append("users:list:by-email")
+    return tags
+
+
+@cached(soft_ttl=settings.USERS_LIST_SOFT_TTL, hard_ttl=settings.USERS_LIST_HARD_TTL, tags=_list_tags)
+def _list_page(
     page: int,
     per_page: int,
     *,
@@ -63,4 +175,95 @@ def list_users(
     sort_dir: str = "desc",
     sort_by: str = "created_at",
 ):
-    return repo_list_users(page, per_page, name=name, email=email, sort_dir=sort_dir, sort_by=sort_by)
+    items, has_more = repo_list_users_page(page, per_page, name=name, email=email, sort_dir=sort_dir, sort_by=sort_by)
+    return [u._asdict() for u in items], has_more
+
+
+@cached(soft_ttl=settings.USERS_COUNT_SOFT_TTL, hard_ttl=settings.USERS_COUNT_HARD_TTL, tags=_count_tags)
+def count_users(*, name: Optional[str] = None, email: Optional[str] = None) -> int:
+    """Exact total per filter; only membership or filtered-field changes invalidate it."""
+    return repo_count_users(name=name, email=email)
+
+
+@cached(soft_ttl=settings.USERS_ESTIMATE_TTL, hard_ttl=settings.USERS_ESTIMATE_TTL * 2)
+def estimate_users(*, name: Optional[str] = None, email: Optional[str] = None) -> Optional[int]:
+    """Planner row estimate; approximate by nature, so only time-bounded."""
+    return repo_estimate_users(name=name, email=email)
+
+
+def list_users(
+    page: int,
+    per_page: int,
+    *,
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+    sort_dir: str = "desc",
+    sort_by: str = "created_at",
+    total: str = "exact",
+) -> dict:
+    """One page of users as `{"items", "has_more", "total", "total_estimated"}`.
+
+    total: "exact" (cached COUNT per filter), "estimated" (planner statistics,
+    falling back to the cached exact count when the database has none) or
+    "none" (no count at all; `total` is None).
+    """
+    items, has_more = _list_page(page, per_page, name=name, email=email, sort_dir=sort_dir, sort_by=sort_by)
+    count = None
+    estimated = False
+    if total == "estimated":
+        count = estimate_users(name=name, email=email)
+        estimated = count is not None
+    if total != "none" and count is None:
+        count = count_users(name=name, email=email)
+    if estimated:
+        # statistics can lag; never report fewer rows than this page proves exist
+        count = max(count, (page - 1) * per_page + len(items) + int(has_more))
+    return {"items": items, "has_more": has_more, "total": count, "total_estimated": estimated}
+
+
+def _keyset_tags(args: dict, result) -> list:
+    if args["cursor"]:
+        # the page was built from the cursor's query, not the arguments
+        state = decode_cursor(args["cursor"])
+        args = {**args, "name": state["n"], "email": state["e"], "sort_by": state["s"]}
+    return _list_tags(args, (result["items"], None))
+
+
+@cached(soft_ttl=settings.USERS_LIST_SOFT_TTL, hard_ttl=settings.USERS_LIST_HARD_TTL, tags=_keyset_tags)
+def list_users_by_cursor(
+    per_page: int,
+    cursor: Optional[str] = None,
+    *,
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+    sort_dir: str = "desc",
+    sort_by: str = "created_at",
+) -> dict:
+    """One keyset page as `{"items", "next_cursor", "prev_cursor", ...}`.
+
+    A cursor carries the query it was issued for (filters and sort), which
+    takes precedence over the arguments; raises `InvalidCursor` if it was
+    tampered with.
+    """
+    after = before = None
+    if cursor:
+        state = decode_cursor(cursor)
+        name, email, sort_by, sort_dir = state["n"], state["e"], state["s"], state["d"]
+        if "a" in state:
+            after = tuple(state["a"])
+        else:
+            before = tuple(state["b"])
+    items, has_next, has_prev = repo_list_users_keyset(
+        per_page, name=name, email=email, sort_dir=sort_dir, sort_by=sort_by, after=after, before=before
+    )
+    query = {"n": name, "e": email, "s": sort_by, "d": sort_dir}
+    next_cursor = encode_cursor({**query, "a": repo_sort_key(items[-1], sort_by)}) if items and has_next else None
+    prev_cursor = encode_cursor({**query, "b": repo_sort_key(items[0], sort_by)}) if items and has_prev else None
+    return {
+        # the sort column rides along for the cursors; pages show LIST_FIELDS
+        "items": [{f: getattr(u, f) for f in LIST_FIELDS} for u in items],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "sort": sort_dir,
+        "sort_by": sort_by,
+    }
@@ -4,12 +4,22 @@ import os
 import pytest
 
 from app import create_app
+from repositories.user_repository import user_cache
+from utils import rate_limit
+from utils.cache import cache
 
 
 @pytest.fixture(scope="function")
 def app():
     # Use SQLite in-memory database for tests
     os.environ["DATABASE_URL"] = "sqlite+pysqlite:///:memory:"
+    # Each test gets a fresh database, so process-local entity snapshots must go too
+    user_cache.clear()
+    # tests run in one process, so the local tier needs no invalidation channel
+    user_cache.local_only = True
+    cache._memory.clear()
+    # and login buckets, so repeated admin logins across tests are not throttled
+    rate_limit._limiter = rate_limit.create_limiter()
     application = create_app(os.environ["DATABASE_URL"])
     yield application
 
@@ -17,3 +27,14 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture()
+def admin_headers(client):
+    """Authorization headers of a freshly registered admin (root@example.com / rootpass)."""
+    client.post(
+        "/auth/register",
+        json={"name": "Root", "email": "root@example.com", "password": "rootpass", "role": "admin"},
+    )
+    token = client.post("/auth/login", json={"email": "root@example.com", "password": "rootpass"}).get_json()["data"]
+    return {"Authorization": f"Bearer {token['access_token']}"}
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+
+import pytest
+
+from config.settings import settings
+from repositories import user_repository as repo
+from routes import admin
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_export_writes_every_user(client, method, admin_headers):
+    for i in range(3):
+        repo.create_user(name=f"User {i}", email=f"user{i}@example.com", password_hash="x")
+    # a cached listing must not change what the export reads
+    assert client.get("/users", headers=admin_headers).status_code == 200
+
+    r = client.open("/admin/users/export", method=method, headers=admin_headers)
+    assert r.status_code == 200 and r.mimetype == "text/csv" and r.is_streamed
+    rows = list(csv.reader(io.StringIO(r.get_data(as_text=True))))
+    assert rows[0] == ["id", "name", "email", "role", "created_at", "is_active"]
+    assert [row[2] for row in rows[1:]] == ["root@example.com"] + [f"user{i}@example.com" for i in range(3)]
+    assert all(row[4] for row in rows[1:])
+
+
+def test_export_streams_in_batches(client):
+    for i in range(5):
+        repo.create_user(name=f"User {i}", email=f"user{i}@example.com", password_hash="x")
+    with client.application.test_request_context():
+        chunks = list(admin._csv_chunks(batch_size=2))
+    assert len(chunks) == 3
+    emails = [row[2] for row in csv.reader(io.StringIO("".join(chunks)))][1:]
+    assert emails == [f"user{i}@example.com" for i in range(5)]
+
+
+def test_export_job_writes_a_file(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    repo.create_user(name="User 0", email="user0@example.com", password_hash="x")
+    path = admin._export_csv_to_file()
+    assert os.path.dirname(path) == str(tmp_path)
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[1][2] == "user0@example.com"
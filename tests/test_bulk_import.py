@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from config.settings import settings
+from repositories import user_repository as repo
+from services import user_import
+from utils.hashing import hash_pool
+
+
+def _ndjson(*rows) -> bytes:
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in rows).encode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashes(monkeypatch):
+    monkeypatch.setattr(hash_pool, "rounds", 4)
+
+
+@pytest.fixture()
+def invalidations(monkeypatch):
+    calls = []
+    original = user_import.cache.invalidate_tags
+    monkeypatch.setattr(user_import.cache, "invalidate_tags", lambda *t: calls.append(t) or original(*t))
+    return calls
+
+
+def test_ndjson_import_reports_row_errors(client, monkeypatch, invalidations, admin_headers):
+    invalidations.clear()
+    monkeypatch.setattr(settings, "BULK_IMPORT_BATCH_SIZE", 2)
+    body = _ndjson(
+        {"name": "Ann", "email": "ann@example.com", "password": "secret1"},
+        {"name": "Ben", "email": "ben@example.com", "password": "secret1", "role": "admin"},
+        "{not json",
+        {"name": "Cat", "email": "not-an-email", "password": "secret1"},
+        {"name": "Ann again", "email": "ann@example.com", "password": "secret1"},
+        "",
+        {"name": "Root", "email": "root@example.com", "password": "secret1"},
+        {"name": "Dan", "email": "dan@example.com", "password": "secret1"},
+    )
+    r = client.post("/users/bulk", data=body, headers={**admin_headers, "Content-Type": "application/x-ndjson"})
+    assert r.status_code == 200
+    report = r.get_json()["data"]
+    assert (report["total"], report["created"], report["failed"]) == (7, 3, 4)
+    assert [(e["row"], e["code"]) for e in report["errors"]] == [
+        (3, "INVALID_ROW"),
+        (4, "VALIDATION_ERROR"),
+        (5, "DUPLICATE_IN_FILE"),
+        (7, "EMAIL_EXISTS"),
+    ]
+    assert repo.get_user_snapshot_by_email("ben@example.com").role == "admin"
+    # three insert batches, one list invalidation
+    assert invalidations == [("users", "users:list")]
+
+    login = client.post("/auth/login", json={"email": "dan@example.com", "password": "secret1"})
+    assert login.status_code == 200
+
+
+def test_csv_import(client, monkeypatch, admin_headers):
+    # the header row does not count towards the inline limit
+    monkeypatch.setattr(settings, "BULK_IMPORT_SYNC_MAX_ROWS", 2)
+    body = b"name,email,password,role\r\nEve,eve@example.com,secret1,\r\nFay,fay@example.com,short,user\r\n"
+    r = client.post("/users/bulk", data=body, headers={**admin_headers, "Content-Type": "text/csv"})
+    report = r.get_json()["data"]
+    assert (report["created"], report["failed"]) == (1, 1)
+    assert report["errors"][0]["row"] == 2 and "password" in report["errors"][0]["details"]
+    assert repo.get_user_snapshot_by_email("eve@example.com").role == "user"
+
+
+def test_imports_over_the_row_limit_run_as_jobs(client, monkeypatch, admin_headers):
+    monkeypatch.setattr(settings, "BULK_IMPORT_SYNC_MAX_ROWS", 2)
+    queued = []
+    # the in-memory test database is per thread, so run the job here afterwards
+    monkeypatch.setattr(user_import._import_executor, "submit", lambda fn, *args: queued.append((fn, args)))
+    rows = [{"name": n, "email": f"{n.lower()}@example.com", "password": "secret1"} for n in ("Gil", "Hal", "Ida")]
+    # no Content-Length: the row count alone decides
+    r = client.post(
+        "/users/bulk",
+        input_stream=io.BytesIO(_ndjson(*rows)),
+        headers={**admin_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 202
+    job_id = r.get_json()["data"]["job_id"]
+    assert client.get(f"/users/bulk/{job_id}", headers=admin_headers).get_json()["data"] == {"status": "queued"}
+
+    [(fn, args)] = queued
+    fn(*args)
+    job = client.get(f"/users/bulk/{job_id}", headers=admin_headers).get_json()["data"]
+    # the rows read while counting are spooled with the rest
+    assert job["status"] == "finished" and job["report"]["created"] == 3
+    assert repo.get_user_snapshot_by_email("ida@example.com") is not None
+    assert client.get("/users/bulk/nope", headers=admin_headers).status_code == 404
+
+
+def test_unsupported_content_type(client, admin_headers):
+    r = client.post("/users/bulk", json=[{"name": "x"}], headers=admin_headers)
+    assert r.status_code == 415
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from config.settings import settings
+from database.base import get_session
+from repositories import user_repository as repo
+from services import user_service
+
+
+def _login(client, email, password="secret1"):
+    return client.post("/auth/login", json={"email": email, "password": password})
+
+
+@pytest.fixture()
+def users(client):
+    with client.application.app_context():
+        yield [
+            repo.create_user(name=f"User {i}", email=f"user{i}@example.com", password_hash="x").id
+            for i in range(7)
+        ]
+
+
+@pytest.fixture()
+def updates():
+    statements = []
+    engine = get_session().get_bind()
+
+    def record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture()
+def invalidations(monkeypatch):
+    calls = []
+    original = user_service.cache.invalidate_tags
+    monkeypatch.setattr(user_service.cache, "invalidate_tags", lambda *t: calls.append(t) or original(*t))
+    return calls
+
+
+def test_updates_run_one_statement_per_chunk(users, updates, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_UPDATE_CHUNK_SIZE", 3)
+    assert repo.bulk_update_users({"role": "admin"}, ids=users + [10_000]) == 7
+    assert len(updates) == 3 and all("IN (" in sql for sql in updates)
+    assert {repo.get_user_snapshot_by_id(i).role for i in users} == {"admin"}
+    # rows already holding the values are not counted again
+    assert repo.bulk_update_users({"role": "admin"}, ids=users) == 0
+    assert repo.bulk_update_users({"role": "user"}, filters={"name": "User", "role": "admin"}, exclude_ids=users[:2]) == 5
+
+
+def test_sticky_markers_are_written_in_one_call(users, monkeypatch):
+    calls = []
+    monkeypatch.setattr(repo, "mark_written", lambda *keys: calls.append(keys))
+    assert repo.bulk_update_users({"role": "admin"}, ids=users, chunk_size=2) == 7
+    assert len(calls) == 1 and calls[0][0] == "users" and len(calls[0]) == 8
+
+
+def test_filtered_deactivation_revokes_tokens(client, users, invalidations, admin_headers):
+    repo.create_user(name="Other", email="other@example.com", password_hash="x")
+    versions = {i: repo.get_user_snapshot_by_id(i).token_version for i in users}
+    invalidations.clear()
+
+    body = {"filter": {"email": "user"}, "set": {"is_active": False}}
+    r = client.post("/users/bulk/update", json=body, headers=admin_headers)
+    assert r.status_code == 200 and r.get_json()["data"] == {"affected": 7}
+    assert invalidations == [("users", "users:list")]
+    for i in users:
+        snapshot = repo.get_user_snapshot_by_id(i)
+        assert not snapshot.is_active and snapshot.token_version == versions[i] + 1
+    assert repo.get_user_snapshot_by_email("other@example.com").is_active
+
+    # the caller matched the filter too, but keeps access
+    body = {"filter": {"role": "admin"}, "set": {"is_active": False}}
+    r = client.post("/users/bulk/update", json=body, headers=admin_headers)
+    assert r.get_json()["data"] == {"affected": 0}
+    assert client.get("/users/me", headers=admin_headers).status_code == 200
+
+
+def test_inactive_users_cannot_log_in(client, users):
+    client.post("/auth/register", json={"name": "Dee", "email": "dee@example.com", "password": "secret1"})
+    access = _login(client, "dee@example.com").get_json()["data"]["access_token"]
+    dee = repo.get_user_snapshot_by_email("dee@example.com")
+    assert user_service.bulk_update_users(ids=[dee.id], is_active=False) == 1
+    assert client.get("/users/me", headers={"Authorization": f"Bearer {access}"}).status_code == 401
+    assert _login(client, "dee@example.com").status_code == 401
+    assert user_service.bulk_update_users(ids=[dee.id], is_active=True) == 1
+    assert _login(client, "dee@example.com").status_code == 200
+
+
+def test_bulk_delete(client, users, invalidations, admin_headers):
+    root_id = repo.get_user_snapshot_by_email("root@example.com").id
+    assert client.get("/users?per_page=50", headers=admin_headers).get_json()["data"]["meta"]["total"] == 8
+    invalidations.clear()
+
+    r = client.post("/users/bulk/delete", json={"ids": users[:3] + [root_id]}, headers=admin_headers)
+    assert r.status_code == 200 and r.get_json()["data"] == {"affected": 3}
+    assert invalidations == [("users", "users:list")]
+    assert repo.get_user_snapshot_by_id(users[0]) is None
+    assert client.get("/users?per_page=50", headers=admin_headers).get_json()["data"]["meta"]["total"] == 5
+    # already deleted rows are not counted again
+    r = client.post("/users/bulk/delete", json={"ids": users[:4]}, headers=admin_headers)
+    assert r.get_json()["data"] == {"affected": 1}
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/users/bulk/delete", {}),
+        ("/users/bulk/delete", {"ids": [1], "filter": {"role": "user"}}),
+        ("/users/bulk/delete", {"filter": {}}),
+        ("/users/bulk/update", {"ids": [1]}),
+        ("/users/bulk/update", {"ids": [1], "set": {}}),
+        ("/users/bulk/update", {"ids": [1], "set": {"role": "owner"}}),
+    ],
+)
+def test_invalid_selections_are_rejected(client, path, body, admin_headers):
+    r = client.post(path, json=body, headers=admin_headers)
+    assert r.status_code == 400 and r.get_json()["error"]["code"] == "VALIDATION_ERROR"
+
+
+def test_requires_admin(client, users):
+    client.post("/auth/register", json={"name": "Eve", "email": "eve@example.com", "password": "secret1"})
+    token = _login(client, "eve@example.com").get_json()["data"]["access_token"]
+    r = client.post("/users/bulk/delete", json={"ids": users}, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 403
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pytest
+
+from utils.cache import Cache
+
+
+def _exercise(cache: Cache) -> None:
+    key = cache.namespaced_key("users:list", "page=1")
+    cache.set(key, {"items": [1]}, ttl=30)
+    assert cache.get(cache.namespaced_key("users:list", "page=1")) == {"items": [1]}
+
+    cache.invalidate_namespace("users:list")
+    assert cache.get(cache.namespaced_key("users:list", "page=1")) is None
+    # other namespaces are untouched
+    assert cache.generation("users:other") == 0
+
+
+def test_namespace_invalidation_memory():
+    cache = Cache(client=None)
+    cache._client = None
+    _exercise(cache)
+
+
+def test_namespace_invalidation_is_a_single_incr(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    cache = Cache(client=client)
+    _exercise(cache)
+    calls = []
+    monkeypatch.setattr(client, "incr", lambda *a, **kw: calls.append(("incr", a)))
+    monkeypatch.setattr(client, "scan_iter", lambda *a, **kw: calls.append(("scan", a)) or iter(()))
+    cache.invalidate_namespace("users:list")
+    assert calls == [("incr", ("gen:users:list",))]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from utils.cache import Cache
+from utils.codecs import Codec
+
+PAGE = {
+    "items": [{"id": i, "name": f"User {i}", "email": f"user{i}@example.com", "role": "user"} for i in range(100)],
+    "meta": {"page": 1, "per_page": 100, "total": 1000, "pages": 10, "sort": "desc", "sort_by": "created_at"},
+}
+
+
+@pytest.mark.parametrize("serializer", ["json", "orjson", "msgpack"])
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd", "lz4"])
+def test_round_trip(serializer, compression):
+    codec = Codec(serializer, compression, min_bytes=256)
+    assert codec.decode(codec.encode(PAGE)) == PAGE
+    assert codec.decode(codec.encode({"v": 1})) == {"v": 1}
+
+
+def test_small_values_are_not_compressed():
+    codec = Codec("json", "zlib", min_bytes=1024)
+    small = codec.encode({"v": 1})
+    assert small[1:] == b'{"v":1}'
+    assert len(codec.encode(PAGE)) < len(json.dumps(PAGE))
+
+
+def test_any_codec_decodes_values_written_by_another():
+    writers = [Codec("json", "none"), Codec("json", "zlib", min_bytes=0), Codec("auto", "none")]
+    reader = Codec("json", "none")
+    for writer in writers:
+        assert reader.decode(writer.encode(PAGE)) == PAGE
+    # values stored before codecs existed are plain JSON
+    assert reader.decode(json.dumps(PAGE).encode()) == PAGE
+
+
+def test_unknown_codec_name_is_rejected():
+    with pytest.raises(ValueError):
+        Codec("pickle")
+
+
+def test_cache_switches_codec_without_flush():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    old = Cache(client=client, near_ttl=0, codec=Codec("json", "none"))
+    old.set("users:list:g0:page=1", PAGE, ttl=30)
+    new = Cache(client=client, near_ttl=0, codec=Codec("auto", "zlib", min_bytes=0))
+    assert new.get("users:list:g0:page=1") == PAGE
+    new.set("users:list:g0:page=2", PAGE, ttl=30)
+    assert len(client.get("users:list:g0:page=2")) < len(client.get("users:list:g0:page=1"))
+    assert old.get("users:list:g0:page=2") == PAGE
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from utils.concurrency import AdaptiveConcurrencyLimiter
+
+
+def test_limit_sheds_normal_but_not_critical_or_admin_headroom():
+    limiter = AdaptiveConcurrencyLimiter(5, min_limit=1, admin_headroom=0.4)
+    assert all(limiter.try_acquire() for _ in range(5))
+    assert not limiter.try_acquire()
+    assert limiter.try_acquire("admin") and limiter.try_acquire("admin")
+    assert not limiter.try_acquire("admin")
+    assert limiter.try_acquire("critical")
+
+
+def test_aimd_backs_off_on_slow_and_grows_when_busy():
+    limiter = AdaptiveConcurrencyLimiter(10, min_limit=2, target_latency_ms=100)
+    for _ in range(10):
+        limiter.try_acquire()
+    limiter.release(500)
+    assert limiter.limit == 9
+    limiter.release(500)  # within the cooldown: no second cut
+    assert limiter.limit == 9
+    for _ in range(20):
+        limiter.try_acquire()
+        limiter.release(1)
+    assert limiter.limit > 9
+
+
+def test_overloaded_worker_returns_fast_503(app, client):
+    limiter = app.extensions["concurrency_limiter"]
+    limiter.inflight = int(limiter.limit)
+    try:
+        r = client.get("/users/me")
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == "1"
+        assert r.get_json()["error"]["code"] == "OVERLOADED"
+        assert client.get("/health").status_code == 200
+        assert 'shed_count{priority="normal"}' in client.get("/metrics").get_data(as_text=True)
+    finally:
+        limiter.inflight = 0
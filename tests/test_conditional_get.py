@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from services import user_service
+from utils.etag import etag_matches
+
+
+def test_etag_matching_forms():
+    assert etag_matches('"abc"', "abc")
+    assert etag_matches('W/"abc"', "abc")
+    assert etag_matches("abc", "abc")
+    assert etag_matches('"x", "abc"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('"abd"', "abc")
+    assert not etag_matches(None, "abc")
+    # If-Match uses strong comparison: a weak validator never matches
+    assert etag_matches('"abc"', "abc", weak=False)
+    assert not etag_matches('W/"abc"', "abc", weak=False)
+    assert etag_matches('W/"abc", "abc"', "abc", weak=False)
+
+
+def test_user_and_me_revalidate_with_304(client, admin_headers):
+    uid = client.post(
+        "/users", json={"name": "Ann", "email": "ann@example.com", "password": "secret1"}, headers=admin_headers
+    ).get_json()["data"]["id"]
+
+    for path in (f"/users/{uid}", "/users/me"):
+        first = client.get(path, headers=admin_headers)
+        etag = first.headers["ETag"]
+        assert etag.startswith('"') and first.headers["Cache-Control"] == "private, no-cache"
+        again = client.get(path, headers={**admin_headers, "If-None-Match": etag})
+        assert again.status_code == 304 and again.data == b""
+        assert again.headers["ETag"] == etag
+
+    etag = client.get(f"/users/{uid}", headers=admin_headers).headers["ETag"]
+    client.patch(f"/users/{uid}", json={"name": "Anne"}, headers={**admin_headers, "If-Match": etag})
+    changed = client.get(f"/users/{uid}", headers={**admin_headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.get_json()["data"]["name"] == "Anne"
+
+
+def test_if_match_accepts_quoted_and_raw(client, admin_headers):
+    uid = client.post(
+        "/users", json={"name": "Bob", "email": "bob@example.com", "password": "secret1"}, headers=admin_headers
+    ).get_json()["data"]["id"]
+    etag = client.get(f"/users/{uid}", headers=admin_headers).headers["ETag"]
+    weak = client.put(f"/users/{uid}", json={"name": "Bobby"}, headers={**admin_headers, "If-Match": f"W/{etag}"})
+    assert weak.status_code == 409
+    r = client.put(f"/users/{uid}", json={"name": "Bobby"}, headers={**admin_headers, "If-Match": etag.strip('"')})
+    assert r.status_code == 200
+    stale = client.put(f"/users/{uid}", json={"name": "Rob"}, headers={**admin_headers, "If-Match": etag})
+    assert stale.status_code == 409
+
+
+def test_list_304_skips_the_query(client, monkeypatch, admin_headers):
+    first = client.get("/users?per_page=5", headers=admin_headers)
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    monkeypatch.setattr(user_service, "list_users", lambda *a, **kw: (_ for _ in ()).throw(AssertionError("queried")))
+    again = client.get("/users?per_page=5", headers={**admin_headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    monkeypatch.undo()
+
+    other_page = client.get("/users?per_page=5&page=2", headers={**admin_headers, "If-None-Match": etag})
+    assert other_page.status_code == 200 and other_page.headers["ETag"] != etag
+
+    client.post("/users", json={"name": "Cy", "email": "cy@example.com", "password": "secret1"}, headers=admin_headers)
+    after_write = client.get("/users?per_page=5", headers={**admin_headers, "If-None-Match": etag})
+    assert after_write.status_code == 200
+    assert after_write.headers["ETag"] != etag
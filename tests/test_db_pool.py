@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from database.pool import InstrumentedQueuePool, instrument_pool, render_pool_metrics
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_exhaustion_is_counted_and_exported(engine):
+    stats = instrument_pool(engine)
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert stats.timeouts == 1
+    assert stats.wait_count == 3 and stats.wait_max_ms >= 50
+    assert stats.connects == 1 and stats.hold_count == 2
+
+    text_out = "\n".join(render_pool_metrics(engine.pool, stats))
+    assert "db_pool_timeouts 1" in text_out
+    assert "db_pool_checked_out 0" in text_out
+    assert 'db_pool_checkout_wait_ms_bucket{le="+Inf"} 3' in text_out
+
+
+def test_long_held_connections_log_their_checkout_stack(engine, caplog):
+    stats = instrument_pool(engine, long_hold_ms=0.001)
+
+    def slow_handler():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    with caplog.at_level(logging.WARNING, logger="database.pool"):
+        slow_handler()
+    assert stats.long_holds == 1
+    assert "slow_handler" in caplog.text
+
+
+def test_pool_metrics_on_metrics_endpoint(client):
+    body = client.get("/metrics").get_data(as_text=True)
+    assert "db_pool_checkout_wait_ms_count" in body
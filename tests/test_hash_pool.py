@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from utils.hashing import HashPool, HashPoolSaturated, _bcrypt_verify
+from utils import metrics as metrics_util
+from utils import security
+
+
+def test_pool_hashes_and_verifies_out_of_process():
+    pool = HashPool(size=1, queue_size=0)
+    try:
+        h = pool.hash("s3cret!")
+        assert pool.verify("s3cret!", h) is True
+        assert pool.verify("wrong", h) is False
+    finally:
+        pool.shutdown()
+    assert _bcrypt_verify("x", "not-a-hash") is False
+
+
+def test_timed_out_job_is_saturation_and_keeps_its_slot():
+    pool = HashPool(size=1, queue_size=0, timeout=0.2, retry_after=3)
+    try:
+        pool.run(time.sleep, 0)  # start the worker process outside the timeout
+        timeouts = metrics_util._hash_timeouts
+        with pytest.raises(HashPoolSaturated) as exc:
+            pool.run(time.sleep, 1.5)
+        assert exc.value.retry_after == 3
+        assert metrics_util._hash_timeouts == timeouts + 1
+        # the sleep still holds the only worker, so its slot stays taken
+        with pytest.raises(HashPoolSaturated):
+            pool.run(time.sleep, 0)
+        deadline = time.time() + 5
+        while not pool._slots.acquire(blocking=False):
+            assert time.time() < deadline
+            time.sleep(0.05)
+        pool._slots.release()
+    finally:
+        pool.shutdown()
+
+
+def test_saturated_pool_fails_fast_with_503(client):
+    r = client.post(
+        "/auth/register",
+        json={"name": "Sam", "email": "sam@example.com", "password": "sampass1"},
+    )
+    assert r.status_code == 201
+
+    pool = security.hash_pool
+    taken = 0
+    while pool._slots.acquire(blocking=False):
+        taken += 1
+    try:
+        r = client.post("/auth/login", json={"email": "sam@example.com", "password": "sampass1"})
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == str(pool.retry_after)
+        assert r.get_json()["error"]["code"] == "SERVICE_BUSY"
+
+        r = client.post(
+            "/auth/register",
+            json={"name": "Sue", "email": "sue@example.com", "password": "suepass1"},
+        )
+        assert r.status_code == 503
+    finally:
+        for _ in range(taken):
+            pool._slots.release()
+
+    r = client.post("/auth/login", json={"email": "sam@example.com", "password": "sampass1"})
+    assert r.status_code == 200
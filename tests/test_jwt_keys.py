@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+
+import jwt
+import pytest
+
+from utils.jwt_keys import KeyRegistry, load_key_registry
+
+
+def _claims():
+    return {"sub": "1", "type": "access"}
+
+
+def test_rotation_keeps_old_tokens_valid_and_rejects_unknown_kid():
+    reg = KeyRegistry()
+    reg.add("old", "HS256", secret="old-secret-old-secret-old-secret", active=True)
+    old_token = reg.encode(_claims())
+    assert jwt.get_unverified_header(old_token)["kid"] == "old"
+
+    reg.add("new", "HS256", secret="new-secret-new-secret-new-secret", active=True)
+    new_token = reg.encode(_claims())
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert reg.decode(old_token)["sub"] == "1"
+    assert reg.decode(new_token)["sub"] == "1"
+
+    reg.remove("old")
+    with pytest.raises(jwt.InvalidTokenError):
+        reg.decode(old_token)
+
+
+def test_tokens_without_kid_use_legacy_key():
+    reg = KeyRegistry()
+    reg.add("default", "HS256", secret="legacy-secret-legacy-secret-1234", active=True)
+    legacy = jwt.encode(_claims(), "legacy-secret-legacy-secret-1234", algorithm="HS256")
+    assert reg.decode(legacy)["sub"] == "1"
+
+
+def test_asymmetric_keys_from_file(tmp_path):
+    serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    def pem(key):
+        return key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+
+    (tmp_path / "ed.pem").write_bytes(pem(ed25519.Ed25519PrivateKey.generate()))
+    (tmp_path / "rsa.pem").write_bytes(pem(rsa.generate_private_key(public_exponent=65537, key_size=2048)))
+    (tmp_path / "keys.json").write_text(json.dumps({
+        "active": "ed",
+        "keys": [
+            {"kid": "rsa", "alg": "RS256", "private_key_file": "rsa.pem"},
+            {"kid": "ed", "alg": "EdDSA", "private_key_file": "ed.pem"},
+        ],
+    }))
+    reg = load_key_registry(str(tmp_path / "keys.json"))
+    token = reg.encode(_claims())
+    assert jwt.get_unverified_header(token)["alg"] == "EdDSA"
+    assert reg.decode(token)["sub"] == "1"
+
+    reg.activate("rsa")
+    assert reg.decode(reg.encode(_claims()))["sub"] == "1"
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import text
+
+from database.base import get_session
+from repositories import user_repository as repo
+from services import user_service
+from utils.cache import cache
+
+
+@pytest.fixture()
+def counts(monkeypatch):
+    calls = []
+    original = user_service.repo_count_users
+    monkeypatch.setattr(user_service, "repo_count_users", lambda **kw: calls.append(kw) or original(**kw))
+    return calls
+
+
+def _seed(client, n: int) -> None:
+    with client.application.app_context():
+        for i in range(n):
+            repo.create_user(name=f"User {i}", email=f"user{i}@example.com", password_hash="x")
+
+
+def test_total_none_skips_the_count(client, counts, admin_headers):
+    _seed(client, 4)
+    meta = client.get("/users?per_page=2&total=none", headers=admin_headers).get_json()["data"]["meta"]
+    assert meta["has_more"] is True and "total" not in meta and "pages" not in meta
+    last = client.get("/users?per_page=2&page=3&total=none", headers=admin_headers).get_json()["data"]["meta"]
+    assert last["has_more"] is False
+    assert counts == []
+
+
+def test_exact_totals_are_cached_per_filter(client, counts, admin_headers):
+    _seed(client, 3)
+    meta = client.get("/users?per_page=2", headers=admin_headers).get_json()["data"]["meta"]
+    assert (meta["total"], meta["pages"], meta["has_more"]) == (4, 2, True)
+    client.get("/users?per_page=2&page=2", headers=admin_headers)
+    client.get("/users?per_page=3&sort=asc", headers=admin_headers)
+    filtered = client.get("/users?per_page=2&name=user%201", headers=admin_headers).get_json()["data"]["meta"]
+    assert filtered["total"] == 1
+    assert counts == [{"name": None, "email": None}, {"name": "user 1", "email": None}]
+
+    # a rename cannot change the unfiltered total, only name-filtered ones
+    uid = client.get("/users?per_page=1&sort=asc", headers=admin_headers).get_json()["data"]["items"][0]["id"]
+    client.patch(f"/users/{uid}", json={"name": "Renamed"}, headers=admin_headers)
+    counts.clear()
+    client.get("/users?per_page=2", headers=admin_headers)
+    client.get("/users?per_page=2&name=user%201", headers=admin_headers)
+    assert counts == [{"name": "user 1", "email": None}]
+
+    new = {"name": "New", "email": "new@example.com", "password": "secret1"}
+    client.post("/users", json=new, headers=admin_headers)
+    assert client.get("/users?per_page=2", headers=admin_headers).get_json()["data"]["meta"]["total"] == 5
+
+
+def test_estimated_total_uses_statistics(client, counts, admin_headers):
+    _seed(client, 5)
+    # no statistics yet: falls back to the exact count
+    meta = client.get("/users?per_page=2&total=estimated", headers=admin_headers).get_json()["data"]["meta"]
+    assert meta["total"] == 6 and "total_estimated" not in meta
+    assert len(counts) == 1
+
+    with client.application.app_context():
+        session = get_session()
+        session.execute(text("ANALYZE"))
+        session.commit()
+        assert repo.estimate_users() == 6
+        assert repo.estimate_users(name="user") is None
+    cache._memory.clear()  # the "no statistics" answer is cached for USERS_ESTIMATE_TTL
+    counts.clear()
+    meta = client.get("/users?per_page=2&page=2&total=estimated", headers=admin_headers).get_json()["data"]["meta"]
+    assert meta["total_estimated"] is True and meta["total"] == 6
+    assert counts == []
+
+
+def test_total_mode_is_part_of_the_etag(client, admin_headers):
+    exact = client.get("/users?per_page=2", headers=admin_headers)
+    none = client.get("/users?per_page=2&total=none", headers={**admin_headers, "If-None-Match": exact.headers["ETag"]})
+    assert none.status_code == 200 and "total" not in none.get_json()["data"]["meta"]
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from utils.cache import Cache
+from utils.lru import TTLCache
+
+
+def test_byte_bound_evicts_least_recently_used():
+    c = TTLCache(maxsize=100, max_bytes=10, sizeof=len)
+    c.set("a", "aaaa")
+    c.set("b", "bbbb")
+    c.get("a")
+    c.set("c", "cccc")  # 12 bytes > 10: evict LRU "b"
+    assert c.get("b") is None
+    assert c.get("a") == "aaaa" and c.get("c") == "cccc"
+    assert c.stats()["bytes"] == 8 and c.stats()["evictions"] == 1
+    c.set("huge", "x" * 11)  # larger than the whole budget: not stored
+    assert c.get("huge") is None
+
+
+def test_expired_entries_are_swept_without_being_read():
+    c = TTLCache(maxsize=1000, sweep_every=1)
+    for i in range(50):
+        c.set(f"old-{i}", i, ttl=0.01)
+    time.sleep(0.02)
+    c.set("fresh", 1)
+    assert len(c) == 1
+    assert c.stats()["expirations"] == 50
+
+
+def test_cache_fallback_is_bounded_and_reports_stats(monkeypatch):
+    cache = Cache()
+    if cache.client is not None:
+        pytest.skip("REDIS_URL is set; the memory fallback is not in use")
+    monkeypatch.setattr(cache._memory, "maxsize", 3)
+    for i in range(10):
+        cache.set(f"users:list:page={i}", {"items": [i]}, ttl=30)
+    assert cache.get("users:list:page=9") == {"items": [9]}
+    assert cache.get("users:list:page=0") is None
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["evictions"] == 7
+    cache.invalidate_prefix("users:list:")
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from utils.cache import Cache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture()
+def workers():
+    server = fakeredis.FakeServer()
+    a = Cache(client=fakeredis.FakeRedis(server=server), near_ttl=60)
+    b = Cache(client=fakeredis.FakeRedis(server=server), near_ttl=60)
+    a.get("warmup")
+    b.get("warmup")
+    assert _wait_for(lambda: a.coherent and b.coherent)
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_hot_reads_are_served_from_l1(workers, monkeypatch):
+    a, _ = workers
+    a.set("users:list:page=1", {"items": [1]}, ttl=30)
+    monkeypatch.setattr(a.client, "get", lambda *_: pytest.fail("L1 hit expected"))
+    assert a.get("users:list:page=1") == {"items": [1]}
+
+
+def test_writes_invalidate_other_workers(workers):
+    a, b = workers
+    a.set("k", {"v": 1}, ttl=30)
+    assert b.get("k") == {"v": 1}
+    a.set("k", {"v": 2}, ttl=30)
+    assert _wait_for(lambda: b.get("k") == {"v": 2})
+
+
+def test_namespace_bump_reaches_other_workers(workers):
+    a, b = workers
+    assert b.generation("users:list") == 0
+    a.invalidate_namespace("users:list")
+    assert _wait_for(lambda: b.generation("users:list") == 1)
+
+
+def test_prefix_invalidation_reaches_other_workers(workers):
+    a, b = workers
+    a.set("users:list:x", {"v": 1}, ttl=30)
+    assert b.get("users:list:x") == {"v": 1}
+    a.invalidate_prefix("users:list:")
+    assert _wait_for(lambda: b.get("users:list:x") is None)
+
+
+def test_set_many_is_one_pipeline_and_one_message(workers, monkeypatch):
+    a, b = workers
+    keys = [f"db:sticky:user:{i}" for i in range(50)]
+    a.set_many({k: 0 for k in keys}, ttl=30)
+    assert b.get(keys[0]) == 0 and b.get(keys[-1]) == 0
+    published = []
+    monkeypatch.setattr(a.client, "publish", lambda channel, message: published.append(message))
+    monkeypatch.setattr(a.client, "setex", lambda *_: pytest.fail("pipelined SETEX expected"))
+    a.set_many({k: 1 for k in keys}, ttl=30)
+    assert len(published) == 1
+    b._on_invalidation(published[0])
+    assert b.get(keys[0]) == 1 and b.get(keys[-1]) == 1
+
+
+def test_without_pubsub_l1_falls_back_to_ttl(monkeypatch):
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(client, "pubsub", lambda **_: (_ for _ in ()).throw(ConnectionError("no pubsub")))
+    # wide enough that a GC pause between set and get cannot expire the entry
+    cache = Cache(client=client, near_ttl=0.5)
+    try:
+        cache.set("k", {"v": 1}, ttl=30)
+        fakeredis.FakeRedis(server=server).set("k", '{"v": 2}')
+        assert cache.get("k") == {"v": 1}
+        assert not cache.coherent
+        time.sleep(0.6)
+        assert cache.get("k") == {"v": 2}
+    finally:
+        cache.close()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import csv
+import io
+
+import pytest
+
+from database.base import get_session
+from repositories import user_repository as repo
+
+
+@pytest.fixture()
+def seeded(client):
+    with client.application.app_context():
+        for i in range(5):
+            repo.create_user(name=f"User {i}", email=f"user{i}@example.com", password_hash="x")
+        yield
+
+
+def test_list_pages_are_projected_rows(seeded):
+    items, has_more = repo.list_users_page(1, 3)
+    assert has_more and len(items) == 3
+    row = items[0]
+    assert row._fields == repo.LIST_FIELDS
+    assert not hasattr(row, "password_hash") and not hasattr(row, "__dict__")
+    # nothing went through the ORM identity map
+    assert len(get_session().identity_map) == 0
+
+    items, _ = repo.list_users_page(1, 2, fields=("id", "created_at"))
+    assert items[0]._fields == ("id", "created_at")
+
+
+def test_keyset_rows_carry_their_sort_column(seeded):
+    items, has_next, _ = repo.list_users_keyset(2, sort_by="email", sort_dir="asc")
+    assert has_next and [u.email for u in items] == ["user0@example.com", "user1@example.com"]
+    assert repo.sort_key(items[-1], "email") == ("user1@example.com", items[-1].id)
+    items, _, _ = repo.list_users_keyset(2, sort_by="created_at")
+    assert items[0]._fields == repo.LIST_FIELDS + ("created_at",)
+
+
+def test_snapshot_misses_skip_the_orm(seeded):
+    repo.user_cache.clear()
+    snapshot = repo.get_user_snapshot_by_email("user3@example.com")
+    assert snapshot.name == "User 3"
+    assert repo.get_user_snapshot_by_id(snapshot.id) == snapshot
+    assert len(get_session().identity_map) == 0
+
+
+def test_iter_users_streams_in_batches(seeded):
+    rows = list(repo.iter_users(("email",), batch_size=2))
+    assert [r.email for r in rows] == [f"user{i}@example.com" for i in range(5)]
+    assert rows[0]._fields == ("email", "id")
+
+
+def test_csv_export(client, seeded, admin_headers):
+    r = client.get("/admin/users/export", headers=admin_headers)
+    assert r.status_code == 200
+    rows = list(csv.reader(io.StringIO(r.get_data(as_text=True))))
+    assert rows[0] == ["id", "name", "email", "role", "created_at", "is_active"]
+    assert [row[2] for row in rows[1:]] == [f"user{i}@example.com" for i in range(5)] + ["root@example.com"]
+    assert {row[5] for row in rows[1:]} == {"True"}
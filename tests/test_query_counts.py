@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from database import base as db_base
+
+
+@contextmanager
+def count_queries():
+    statements: list[str] = []
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        statements.append(statement)
+
+    event.listen(db_base._engine, "before_cursor_execute", _on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db_base._engine, "before_cursor_execute", _on_execute)
+
+
+def _login(client, email: str, password: str):
+    return client.post("/auth/login", json={"email": email, "password": password}).get_json()["data"]
+
+
+def test_refresh_rotation_is_one_statement(client):
+    client.post("/auth/register", json={"name": "Quin", "email": "quin@example.com", "password": "quinpass"})
+    tokens = _login(client, "quin@example.com", "quinpass")
+
+    with count_queries() as statements:
+        r = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 200
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("UPDATE")
+
+    # replaying the rotated token matches no row
+    r = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 401
+
+
+def test_user_write_endpoints_query_counts(client, admin_headers):
+    with count_queries() as statements:
+        r = client.post(
+            "/users",
+            json={"name": "Vic", "email": "vic@example.com", "password": "vicpass1"},
+            headers=admin_headers,
+        )
+    assert r.status_code == 201
+    # admin snapshot load + INSERT (no refresh SELECT)
+    assert len(statements) == 2
+    vic_id = r.get_json()["data"]["id"]
+
+    with count_queries() as statements:
+        r = client.put(f"/users/{vic_id}", json={"name": "Victor"}, headers=admin_headers)
+    assert r.status_code == 200
+    assert r.get_json()["data"]["name"] == "Victor"
+    # cached pre-check miss for Vic + UPDATE ... RETURNING
+    assert len(statements) == 2
+
+    with count_queries() as statements:
+        r = client.post("/auth/logout-all", headers=admin_headers)
+    assert r.status_code == 200
+    assert len(statements) == 1
+
+
+def test_update_without_returning_support_falls_back(app, monkeypatch):
+    from repositories import user_repository as repo
+
+    user = repo.create_user(name="Max", email="max@example.com", password_hash="x")
+    monkeypatch.setattr(db_base._engine.dialect, "update_returning", False)
+    with count_queries() as statements:
+        snapshot = repo.rotate_token_version(user.id, 0)
+    assert snapshot is not None and snapshot.token_version == 1
+    assert len(statements) == 2
+    assert repo.rotate_token_version(user.id, 0) is None
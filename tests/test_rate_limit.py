@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+
+import pytest
+
+from utils.rate_limit import GCRALimiter, MmapGCRALimiter, RedisGCRALimiter
+
+
+def test_gcra_allows_burst_then_spaces_requests():
+    limiter = GCRALimiter()
+    now = 1000.0
+    decisions = [limiter.hit("k", 5, 10, now=now) for _ in range(6)]
+    assert [d.allowed for d in decisions] == [True] * 5 + [False]
+    assert [d.remaining for d in decisions[:5]] == [4, 3, 2, 1, 0]
+    assert decisions[-1].retry_after == 2.0
+    # one emission interval (window / limit) later a single request fits again
+    assert limiter.hit("k", 5, 10, now=now + 2).allowed
+    assert not limiter.hit("k", 5, 10, now=now + 2).allowed
+
+
+def test_gcra_memory_is_bounded_and_swept():
+    limiter = GCRALimiter(max_keys=100, sweep_interval=1)
+    for i in range(10_000):
+        limiter.hit(f"ip-{i}", 10, 60, now=1000.0)
+    assert len(limiter) == 100
+    limiter.hit("late", 10, 60, now=2000.0)
+    assert len(limiter) == 1
+
+
+def test_login_rate_limit_headers(client):
+    payload = {"email": "nobody@example.com", "password": "whatever"}
+    r = client.post("/auth/login", json=payload)
+    assert r.status_code == 401
+    assert r.headers["RateLimit-Limit"] == "10"
+    assert r.headers["RateLimit-Remaining"] == "9"
+    for _ in range(9):
+        client.post("/auth/login", json=payload)
+    r = client.post("/auth/login", json=payload)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    assert r.get_json()["error"]["code"] == "RATE_LIMITED"
+
+
+def _worker_hits(path: str, n: int, queue) -> None:
+    limiter = MmapGCRALimiter(path, slots=64)
+    queue.put(sum(limiter.hit("login:1.2.3.4", 20, 60).allowed for _ in range(n)))
+
+
+def test_mmap_limiter_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "rl.bin")
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_worker_hits, args=(path, 15, queue)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(10)
+    # four "workers", one coherent limit
+    assert sum(queue.get(timeout=5) for _ in procs) == 20
+
+
+def test_mmap_limiter_table_is_fixed_size(tmp_path):
+    limiter = MmapGCRALimiter(str(tmp_path / "rl.bin"), slots=64)
+    for i in range(1000):
+        assert limiter.hit(f"ip-{i}", 1, 60, now=1000.0).allowed
+    assert os.path.getsize(tmp_path / "rl.bin") == 64 * MmapGCRALimiter._SLOT.size
+
+
+def test_redis_limiter_shares_one_limit():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    a = RedisGCRALimiter(fakeredis.FakeRedis(server=server))
+    b = RedisGCRALimiter(fakeredis.FakeRedis(server=server))
+    now = 1000.0
+    results = [(a if i % 2 else b).hit("k", 4, 8, now=now) for i in range(5)]
+    assert [d.allowed for d in results] == [True] * 4 + [False]
+    assert [d.remaining for d in results[:4]] == [3, 2, 1, 0]
+    assert results[-1].retry_after == 2.0
+    assert a.hit("k", 4, 8, now=now + 2).allowed
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from passlib.hash import bcrypt
+
+from repositories.user_repository import create_user, get_user_by_email
+from services import user_service
+from utils.hashing import calibrate_rounds, hash_pool, hash_rounds
+
+
+def test_login_rehashes_when_cost_is_below_target(app, monkeypatch):
+    old_hash = bcrypt.using(rounds=4).hash("pw123456")
+    create_user(name="Rex", email="rex@example.com", password_hash=old_hash)
+    monkeypatch.setattr(hash_pool, "rounds", 5)
+    monkeypatch.setattr(user_service, "_schedule_rehash", user_service._rehash_password)
+
+    user = user_service.authenticate_user("rex@example.com", "pw123456")
+    assert user is not None
+
+    new_hash = get_user_by_email("rex@example.com").password_hash
+    assert hash_rounds(new_hash) == 5
+    assert bcrypt.verify("pw123456", new_hash)
+    # Already at target cost: nothing to do
+    assert not hash_pool.needs_rehash(new_hash)
+    # never downgraded, e.g. by a host pinned to a lower cost
+    assert not hash_pool.needs_rehash(bcrypt.using(rounds=6).hash("pw123456"))
+
+
+def test_calibrate_rounds_respects_bounds():
+    assert calibrate_rounds(0.001, min_rounds=4, max_rounds=6) == 4
+    assert 4 <= calibrate_rounds(10_000, min_rounds=4, max_rounds=6) <= 6
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, insert, text
+
+from database import base as db_base
+from database.base import Base, get_session, init_db, init_engine, remove_session
+from models.user import User
+from repositories import user_repository as repo
+from utils.cache import cache
+
+
+def _seed_replica(url: str, *emails: str) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for email in emails:
+            conn.execute(insert(User).values(name=email.split("@")[0], email=email, password_hash="x", role="user"))
+    engine.dispose()
+
+
+@pytest.fixture()
+def routed(tmp_path):
+    cache._memory.clear()
+    repo.user_cache.clear()
+    primary = f"sqlite:///{tmp_path / 'primary.db'}"
+    replicas = [f"sqlite:///{tmp_path / 'replica1.db'}", f"sqlite:///{tmp_path / 'replica2.db'}"]
+    for url in replicas:
+        # rows that only exist on replicas reveal where a read went
+        _seed_replica(url, "replica@example.com")
+    init_engine(primary, replicas)
+    init_db()
+    yield db_base.replicas
+    remove_session()
+    init_engine("sqlite+pysqlite:///:memory:", [])
+    cache._memory.clear()
+
+
+def test_reads_round_robin_over_replicas(routed):
+    for _ in range(4):
+        assert repo.get_user_by_email("replica@example.com") is not None
+        remove_session()
+    assert routed.reads == [2, 2]
+
+
+def test_request_that_wrote_reads_from_primary(routed):
+    repo.create_user(name="Pat", email="pat@example.com", password_hash="x")
+    assert repo.get_user_by_email("replica@example.com") is None
+    assert repo.get_user_by_email("pat@example.com") is not None
+    assert routed.reads == [0, 0]
+
+
+def test_row_estimates_are_replica_reads(routed, tmp_path):
+    for i in (1, 2):
+        engine = create_engine(f"sqlite:///{tmp_path / f'replica{i}.db'}")
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        engine.dispose()
+    app = Flask(__name__)
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        # the primary has no statistics; the replica's row count proves where it ran
+        assert repo.estimate_users() == 1
+        assert not get_session()().info.get("wrote")
+        assert routed.reads == [1, 0]
+        assert cache.get("db:sticky:client:ip:10.0.0.1") is None
+        remove_session()
+
+
+def test_search_probe_runs_on_the_replica_once(routed, tmp_path):
+    from sqlalchemy import event
+
+    from database.search import install_search
+
+    probes = []
+    for i in (1, 2):
+        engine = create_engine(f"sqlite:///{tmp_path / f'replica{i}.db'}")
+        install_search(engine, "users", ["name", "email"])
+        engine.dispose()
+    for engine in [db_base._engine, *routed.engines]:
+        event.listen(
+            engine,
+            "before_cursor_execute",
+            lambda conn, cursor, sql, *_: "count(*) AS hits" in sql and probes.append(conn.engine.url.database),
+        )
+    for _ in range(2):
+        assert [u.email for u in repo.list_users(1, 10, name="replica")[0]] == ["replica@example.com"]
+        remove_session()
+    # one probe, on the replica that served the first read; the second reuses it
+    assert probes == [routed.engines[0].url.database]
+    assert routed.reads == [1, 1]
+
+
+def test_written_rows_stay_on_primary_for_the_window(routed):
+    snapshot = repo.create_user(name="Pat", email="pat@example.com", password_hash="x")
+    remove_session()
+    # a lagging replica has no such row; the row marker keeps us on the primary
+    assert repo.get_user_by_id(snapshot.id).email == "pat@example.com"
+    assert [u.email for u in repo.list_users(1, 10)[0]] == ["pat@example.com"]
+    remove_session()
+    assert repo.get_user_by_email("replica@example.com") is not None
+
+
+def test_clients_read_their_own_writes_across_requests(routed):
+    app = Flask(__name__)
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        repo.create_user(name="Pat", email="pat@example.com", password_hash="x")
+        remove_session()
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        assert repo.get_user_by_email("replica@example.com") is None
+        remove_session()
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.2"}):
+        assert repo.get_user_by_email("replica@example.com") is not None
+        remove_session()
+
+
+def test_failed_replica_is_benched_and_read_retried_on_primary(tmp_path):
+    cache._memory.clear()
+    init_engine(f"sqlite:///{tmp_path / 'primary.db'}", [f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+    init_db()
+    try:
+        repo.create_user(name="Pat", email="pat@example.com", password_hash="x")
+        remove_session()
+        assert repo.get_user_by_email("nobody@example.com") is None
+        assert db_base.replicas.healthy() == [False]
+        assert db_base.replicas.failures == [1]
+        assert repo.get_user_by_email("nobody@example.com") is None
+        assert db_base.replicas.failures == [1]
+    finally:
+        remove_session()
+        init_engine("sqlite+pysqlite:///:memory:", [])
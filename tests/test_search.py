@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import text
+
+from database.base import get_session
+from database.search import search_backend
+from repositories import user_repository as repo
+
+
+@pytest.fixture()
+def users(client):
+    with client.application.app_context():
+        for name, email in (
+            ("Alice Smith", "alice@example.com"),
+            ("alicia keys", "akeys@music.org"),
+            ("Bob Stone", "bob@example.com"),
+            ("Malice", "mal@example.net"),
+        ):
+            repo.create_user(name=name, email=email, password_hash="x")
+        yield
+
+
+def _names(**filters):
+    items, _ = repo.list_users_page(1, 50, sort_by="name", sort_dir="asc", **filters)
+    return [u.name for u in items]
+
+
+def _plan(**filters) -> str:
+    session = get_session()
+    stmt = repo._list_query(filters.get("name"), filters.get("email"))
+    sql = stmt.compile(dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    return " | ".join(row[-1] for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_substring_search_uses_the_trigram_index(users):
+    assert search_backend("users") == "fts5"
+    assert _names(name="LIC") == ["Alice Smith", "Malice", "alicia keys"]
+    assert _names(email="example.") == ["Alice Smith", "Bob Stone", "Malice"]
+    assert _names(name="lic", email=".org") == ["alicia keys"]
+    assert repo.count_users(name="alic") == 3
+    assert "users_fts" in _plan(name="lic")
+
+
+def test_short_terms_fall_back_to_ilike(users):
+    assert _names(name="BO") == ["Bob Stone"]
+    assert "users_fts" not in _plan(name="bo")
+
+
+def test_prefix_search_uses_a_btree_index(users):
+    assert _names(name="ali*") == ["Alice Smith", "alicia keys"]
+    assert _names(email="B*") == ["Bob Stone"]
+    plan = _plan(name="ali*")
+    assert "ix_users_name_lower" in plan and "users_fts" not in plan
+
+
+def test_prefix_search_with_non_ascii_prefixes(users):
+    repo.create_user(name="Émile Zola", email="emile@example.com", password_hash="x")
+    repo.create_user(name="Ömer Ak", email="omer@example.com", password_hash="x")
+    assert _names(name="Émile*") == ["Émile Zola"]
+    assert _names(name="ÉMILE*") == ["Émile Zola"]
+    assert _names(name="Ömer*") == _names(name="Ömer") == ["Ömer Ak"]
+    assert "ix_users_name_lower" in _plan(name="Ömer*")
+
+
+def test_index_follows_renames_and_deletes(users):
+    alice = repo.get_user_by_email("alice@example.com")
+    repo.update_user(alice.id, name="Carol Jones")
+    assert _names(name="smith") == []
+    assert _names(name="carol") == ["Carol Jones"]
+    bob = repo.get_user_by_email("bob@example.com")
+    repo.delete_user(bob.id)
+    assert _names(name="stone") == []
+
+
+def test_unselective_terms_scan_instead(users, monkeypatch):
+    from config.settings import settings
+
+    monkeypatch.setattr(settings, "SEARCH_INDEX_MAX_ROWS", 2)
+    assert "users_fts" not in _plan(name="lic")
+    assert _names(name="lic") == ["Alice Smith", "Malice", "alicia keys"]
+    assert "users_fts" in _plan(name="bob")
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from utils.cache import Cache
+
+
+def _memory_cache() -> Cache:
+    cache = Cache(client=None)
+    cache._client = None
+    return cache
+
+
+def _slow(counter: list, value, delay: float = 0.1):
+    def compute():
+        counter.append(1)
+        time.sleep(delay)
+        return value
+
+    return compute
+
+
+def _run_concurrently(fn, n: int = 10) -> list:
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_misses_compute_once():
+    cache = _memory_cache()
+    calls: list = []
+    compute = _slow(calls, {"items": [1]})
+    results = _run_concurrently(lambda _i: cache.get_or_compute("k", compute, soft_ttl=30, hard_ttl=60))
+    assert calls == [1]
+    assert results == [{"items": [1]}] * 10
+
+
+def test_stale_value_is_served_while_one_caller_refreshes():
+    cache = _memory_cache()
+    cache.get_or_compute("k", lambda: "old", soft_ttl=0, hard_ttl=60)
+    calls: list = []
+    results = _run_concurrently(lambda _i: cache.get_or_compute("k", _slow(calls, "new"), soft_ttl=30, hard_ttl=60))
+    assert calls == [1]
+    assert results.count("new") == 1 and results.count("old") == 9
+    assert cache.get_or_compute("k", lambda: pytest.fail("fresh"), soft_ttl=30, hard_ttl=60) == "new"
+
+
+def test_errors_reach_waiters_and_are_not_cached():
+    cache = _memory_cache()
+
+    def boom():
+        time.sleep(0.05)
+        raise RuntimeError("db down")
+
+    errors = []
+
+    def call(_i):
+        try:
+            return cache.get_or_compute("k", boom, soft_ttl=30, hard_ttl=60)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    _run_concurrently(call, n=4)
+    assert len(errors) == 4
+    assert cache.get_or_compute("k", lambda: 1, soft_ttl=30, hard_ttl=60) == 1
+
+
+def test_redis_lock_coalesces_across_processes():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    workers = [Cache(client=fakeredis.FakeRedis(server=server), near_ttl=0) for _ in range(4)]
+    calls: list = []
+    compute = _slow(calls, {"items": [2]}, delay=0.2)
+    results = _run_concurrently(
+        lambda i: workers[i % 4].get_or_compute("k", compute, soft_ttl=30, hard_ttl=60), n=8
+    )
+    assert calls == [1]
+    assert results == [{"items": [2]}] * 8
+    assert fakeredis.FakeRedis(server=server).get("lock:k") is None
+
+
+def test_list_route_computes_once_per_key(client, monkeypatch, admin_headers):
+    from services import user_service
+
+    calls: list = []
+    original = user_service.repo_list_users_page
+    monkeypatch.setattr(user_service, "repo_list_users_page", lambda *a, **kw: calls.append(1) or original(*a, **kw))
+    first = client.get("/users?per_page=5", headers=admin_headers)
+    second = client.get("/users?per_page=5", headers=admin_headers)
+    assert first.status_code == second.status_code == 200
+    assert second.get_json()["data"] == first.get_json()["data"]
+    assert calls == [1]
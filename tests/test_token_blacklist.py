@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from utils import metrics as metrics_util
+from utils import security
+from utils.token_blacklist import BloomFilter, MemoryBlacklist, RedisBlacklist
+
+
+def test_memory_blacklist_expires_and_never_evicts_live_entries():
+    bl = MemoryBlacklist(max_entries=3)
+    now = time.time()
+    bl.add("expired", now - 1)
+    assert not bl.contains("expired")
+    assert bl.add("jti-0", now + 60) and bl.add("jti-1", now + 60) and bl.add("short", now + 0.05)
+    overflow = metrics_util._blacklist_overflow
+    # full of live revocations: refuse the new one rather than un-revoke
+    assert bl.add("jti-2", now + 60) is False
+    assert metrics_util._blacklist_overflow == overflow + 1
+    assert len(bl) == 3 and bl.contains("jti-0") and not bl.contains("jti-2")
+    # expiry makes room
+    time.sleep(0.1)
+    assert bl.add("jti-2", now + 60) and bl.contains("jti-2") and bl.contains("jti-0")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 100
+
+
+def test_redis_blacklist_is_shared_across_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    worker_a = RedisBlacklist(fakeredis.FakeRedis(server=server), sync_interval=0)
+    worker_b = RedisBlacklist(fakeredis.FakeRedis(server=server), sync_interval=0)
+
+    worker_a.add("revoked", time.time() + 60)
+    assert worker_b.contains("revoked")
+    assert not worker_b.contains("still-valid")
+
+    worker_a.add("short", time.time() + 0.05)
+    time.sleep(0.1)
+    assert not worker_b.contains("short")
+    assert worker_a.client.zcard(worker_a.key) == 1
+
+
+def test_redis_blacklist_syncs_incrementally_and_stays_bounded():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    worker_a = RedisBlacklist(fakeredis.FakeRedis(server=server), sync_interval=0, capacity=50)
+    worker_b = RedisBlacklist(fakeredis.FakeRedis(server=server), sync_interval=0, capacity=50, skew=0)
+    now = time.time()
+    assert all(worker_a.add(f"old-{i}", now + 60 + i) for i in range(49))
+    worker_a.add("short", now + 0.05)
+    # full of live revocations: the new one is refused, none is dropped
+    assert worker_a.add("refused", now + 60) is False
+    assert worker_a.client.zcard(worker_a.key) == 50
+    assert worker_b.contains("old-0") and worker_b.contains("old-48") and not worker_b.contains("refused")
+    # "short" expires, which makes room again
+    time.sleep(0.1)
+
+    # later syncs fetch only what was added since the last one
+    fetched = []
+    bloom_add = worker_b._bloom.add
+    worker_b._bloom.add = lambda item: fetched.append(item) or bloom_add(item)
+    worker_a.add("new", now + 300)
+    assert worker_b.contains("new")
+    assert fetched == ["new"]
+
+
+def test_logout_revokes_access_token(client):
+    r = client.post(
+        "/auth/register",
+        json={"name": "Lou", "email": "lou@example.com", "password": "loupass1"},
+    )
+    assert r.status_code == 201
+    access = client.post("/auth/login", json={"email": "lou@example.com", "password": "loupass1"}).get_json()["data"]["access_token"]
+    headers = {"Authorization": f"Bearer {access}"}
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    r = client.get("/auth/me", headers=headers)
+    assert r.status_code == 401
+    assert r.get_json()["error"]["code"] == "TOKEN_REVOKED"
+
+
+def test_logout_with_a_full_blacklist_revokes_every_session(client, monkeypatch):
+    client.post("/auth/register", json={"name": "Max", "email": "max@example.com", "password": "maxpass1"})
+    sessions = [
+        client.post("/auth/login", json={"email": "max@example.com", "password": "maxpass1"}).get_json()["data"]
+        for _ in range(2)
+    ]
+    monkeypatch.setattr(security, "token_blacklist", MemoryBlacklist(max_entries=1))
+    security.token_blacklist.add("someone-else", time.time() + 60)
+
+    headers = [{"Authorization": f"Bearer {s['access_token']}"} for s in sessions]
+    assert client.post("/auth/logout", headers=headers[0]).status_code == 200
+    for h in headers:
+        assert client.get("/auth/me", headers=h).status_code == 401
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import time
+
+from utils import metrics as metrics_util
+from utils import security
+from utils.lru import TTLCache
+
+
+def test_cached_token_is_reused_and_still_revocable(client):
+    r = client.post(
+        "/auth/register",
+        json={"name": "Tia", "email": "tia@example.com", "password": "tiapass1"},
+    )
+    assert r.status_code == 201
+    tokens = client.post("/auth/login", json={"email": "tia@example.com", "password": "tiapass1"}).get_json()["data"]
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    hits_before = metrics_util._token_cache_hits
+    for _ in range(3):
+        assert client.get("/auth/me", headers=headers).status_code == 200
+    assert metrics_util._token_cache_hits - hits_before >= 2
+
+    # Rotation bumps `ver`: the cached payload must not bypass the version check
+    r = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 200
+    r = client.get("/auth/me", headers=headers)
+    assert r.status_code == 401
+    assert r.get_json()["error"]["code"] == "TOKEN_REVOKED"
+
+
+def test_ttl_cache_caps_entries_at_expiry_and_size():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1, expires_at=time.time() - 1)
+    assert c.get("a") is None
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)  # evicts least recently used "b"
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+
+
+def test_invalid_token_is_not_cached():
+    security._token_cache.clear()
+    payload, err = security.decode_token_cached("not-a-jwt")
+    assert payload is None and err[0] == "TOKEN_INVALID"
+    assert len(security._token_cache) == 0
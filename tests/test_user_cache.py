@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import time
+
+import pytest
+from sqlalchemy import event
+
+from database import base as db_base
+from repositories import user_repository as repo
+from utils.cache import Cache
+from utils.entity_cache import EntityCache
+
+
+def _count_selects(fn):
+    statements = []
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(db_base._engine, "before_cursor_execute", _on_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db_base._engine, "before_cursor_execute", _on_execute)
+    return len(statements)
+
+
+def test_snapshot_read_through_and_write_invalidation(app):
+    user = repo.create_user(name="Ann", email="ann@example.com", password_hash="x")
+
+    assert repo.get_user_snapshot_by_id(user.id).name == "Ann"
+    assert _count_selects(lambda: repo.get_user_snapshot_by_id(user.id)) == 0
+    assert _count_selects(lambda: repo.get_user_snapshot_by_email("ann@example.com")) <= 1
+    assert _count_selects(lambda: repo.get_user_snapshot_by_email("ann@example.com")) == 0
+
+    repo.update_user(user.id, name="Ann B", email="annb@example.com")
+    assert repo.get_user_snapshot_by_id(user.id).name == "Ann B"
+    assert repo.get_user_snapshot_by_email("ann@example.com") is None
+    assert repo.get_user_snapshot_by_email("annb@example.com").id == user.id
+
+    repo.increment_token_version(user.id)
+    assert repo.get_user_snapshot_by_id(user.id).token_version == 1
+
+    repo.delete_user(user.id)
+    assert repo.get_user_snapshot_by_id(user.id) is None
+
+
+def test_negative_entries_are_cached_and_cleared_on_create(app):
+    assert repo.get_user_snapshot_by_email("new@example.com") is None
+    assert _count_selects(lambda: repo.get_user_snapshot_by_email("new@example.com")) == 0
+
+    repo.create_user(name="New", email="new@example.com", password_hash="x")
+    assert repo.get_user_snapshot_by_email("new@example.com").name == "New"
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_deletes_evict_other_workers_local_tier():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    a, b = (Cache(client=fakeredis.FakeRedis(server=server), near_ttl=60) for _ in range(2))
+    try:
+        assert _wait_for(lambda: a.watch() and b.watch())
+        ea, eb = EntityCache("user", cache_obj=a), EntityCache("user", cache_obj=b)
+        eb.set("id:1", {"ver": 1}, lease=eb.lease("id:1"))
+        assert ea.get("id:1") == (True, {"ver": 1})
+        # served from a's local tier until b's delete reaches it
+        fakeredis.FakeRedis(server=server).set("user:id:1", json.dumps({"ver": 2}))
+        assert ea.get("id:1") == (True, {"ver": 1})
+        eb.delete("id:1")
+        assert _wait_for(lambda: ea.get("id:1") == (False, None))
+    finally:
+        a.close()
+        b.close()
+
+
+def test_local_tier_needs_an_invalidation_channel():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    entities = EntityCache("user", cache_obj=Cache(client=client, near_ttl=0))
+    entities.set("id:1", {"ver": 1}, lease=entities.lease("id:1"))
+    client.set("user:id:1", json.dumps({"ver": 2}))
+    assert entities.get("id:1") == (True, {"ver": 2})
+
+    # without Redis, other workers never hear of deletes
+    store = Cache(client=None)
+    store._client = None
+    entities = EntityCache("user", cache_obj=store)
+    entities.set("id:1", {"ver": 1}, lease=entities.lease("id:1"))
+    assert entities.get("id:1") == (False, None)
+
+
+def test_fill_racing_a_delete_is_dropped():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    store = Cache(client=None)
+    store._client = None
+    for entities in (
+        EntityCache("user", cache_obj=Cache(client=client, near_ttl=0)),
+        EntityCache("user", cache_obj=store, local_only=True),
+    ):
+        lease = entities.lease("id:1")
+        # the snapshot was read, then a write invalidated it
+        entities.delete("id:1")
+        entities.set("id:1", {"ver": 1}, lease=lease)
+        assert entities.get("id:1") == (False, None)
+        entities.set("id:1", {"ver": 2}, lease=entities.lease("id:1"))
+        assert entities.get("id:1") == (True, {"ver": 2})
+    assert client.get("user:id:1") is not None
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import functools
+import hashlib
+import inspect
 import json
 import logging
+import math
+import os
+import threading
 import time
-from typing import Any, Optional
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 
 from config.settings import settings
+from utils import metrics as metrics_util
+from utils.codecs import Codec, default_codec
+from utils.lru import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -15,11 +25,76 @@ except Exception:  # pragma: no cover
     redis = None  # type: ignore
 
 
-class Cache:
+def _json_size(value: Any) -> int:
+    # Approximates what the same value would occupy in Redis
+    return len(json.dumps(value, default=str))
+
+
+# Delete the lock only if we still own it (it may have expired and been re-taken)
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# Bumped on every tag invalidation; lets @cached detect writes racing a compute
+_TAG_EPOCH = "tag-epoch"
+
+# Tag generations come from one never-expiring sequence, so a tag key that
+# expired and is bumped again can never repeat a generation an entry recorded
+_TAG_BUMP_LUA = """
+local gen = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], gen, 'EX', ARGV[1])
+return gen
+"""
+_TAG_SEQ_KEY = "gen-seq:tags"
+
+
+class _Flight:
+    """One in-process computation that concurrent callers of a key wait on."""
+
+    __slots__ = ("done", "value", "error")
+
     def __init__(self) -> None:
-        self._client = None
-        self._memory = {}
-        if settings.REDIS_URL and redis is not None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class Cache:
+    """Value cache over Redis, with an in-process fallback when Redis is absent.
+
+    Redis values are encoded by a `Codec` (see utils.codecs), so the
+    serializer and compression can change without flushing the cache.
+
+    With Redis, hot keys are also kept in a short-lived per-worker near cache
+    (L1). Writers publish the keys they change on CACHE_INVALIDATION_CHANNEL
+    and every worker evicts them from its L1; if pub/sub is unavailable the
+    L1 degrades to TTL-only coherence (CACHE_NEAR_TTL seconds of staleness).
+    """
+
+    def __init__(self, client=None, *, near_ttl: Optional[float] = None, codec: Optional[Codec] = None) -> None:
+        self._client = client
+        self._codec = codec or default_codec()
+        # Redis-less fallback: bounded by entries and bytes, expired entries swept
+        self._memory = TTLCache(
+            maxsize=settings.CACHE_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES,
+            sizeof=_json_size,
+        )
+        # namespace -> generation for the memory fallback (fixed set of names)
+        self._generations: dict = {}
+        # tag generations: one per tag (e.g. `user:{id}`), so bounded and expiring.
+        # A tag that was evicted or expired reads as `_tag_floor`; after an
+        # eviction the floor moves past every generation handed out so far.
+        self._tag_generations = TTLCache(maxsize=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TAG_TTL)
+        self._tag_seq = 0
+        self._tag_floor = 0
+        self._tag_evictions = 0
+        self._tag_lock = threading.Lock()
+        if client is None and settings.REDIS_URL and redis is not None:
             try:
                 self._client = redis.Redis.from_url(settings.REDIS_URL)
                 self._client.ping()
@@ -28,21 +103,142 @@ class Cache:
                 logger.warning("Redis connection failed: %s", exc)
                 self._client = None
 
+        near_ttl = settings.CACHE_NEAR_TTL if near_ttl is None else near_ttl
+        self._near = TTLCache(maxsize=settings.CACHE_NEAR_MAX_ENTRIES, ttl=near_ttl) if near_ttl > 0 else None
+        self._channel = settings.CACHE_INVALIDATION_CHANNEL
+        self._node_id = uuid.uuid4().hex
+        self._listener: Optional[threading.Thread] = None
+        self._listener_pid: Optional[int] = None
+        self._closed = threading.Event()
+        # True while the invalidation subscription is live
+        self.coherent = False
+        # key -> in-flight computation (single-flight within this process)
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self._release_script = None
+        self._tag_bump_script = None
+        # called with the keys other workers invalidate (None: drop everything)
+        self._subscribers: List[Callable[[Optional[List[str]]], None]] = []
+
+    @property
+    def client(self):
+        """Underlying Redis client, or None when running on the memory fallback."""
+        return self._client
+
+    # --- near cache (L1) coherence -------------------------------------------------
+
+    def _ensure_listener(self) -> None:
+        # one subscriber thread per process (threads do not survive fork)
+        if self._near is None or self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        self._listener = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def _listen(self) -> None:
+        backoff = 1.0
+        while not self._closed.is_set():
+            pubsub = None
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                # anything published while unsubscribed was missed
+                self._near.clear()
+                self._notify(None)
+                self.coherent = True
+                backoff = 1.0
+                while not self._closed.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._on_invalidation(message["data"])
+            except Exception as exc:
+                if self.coherent:
+                    logger.warning("Cache invalidation channel lost, L1 is TTL-only: %s", exc)
+                self.coherent = False
+                self._closed.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:  # pragma: no cover
+                        pass
+        self.coherent = False
+
+    def _on_invalidation(self, data) -> None:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        node, _, target = data.partition(" ")
+        if node == self._node_id or self._near is None:
+            return
+        kind, _, name = target.partition(":")
+        if kind == "k":
+            self._near.pop(name)
+            self._notify([name])
+        elif kind == "m":
+            keys = name.split("\n")
+            for k in keys:
+                self._near.pop(k)
+            self._notify(keys)
+        elif kind == "p":
+            for k in self._near.keys():
+                if str(k).startswith(name):
+                    self._near.pop(k)
+            self._notify(None)
+
+    def _notify(self, keys: Optional[List[str]]) -> None:
+        for fn in self._subscribers:
+            try:
+                fn(keys)
+            except Exception as exc:  # pragma: no cover
+                logger.warning("Cache invalidation subscriber failed: %s", exc)
+
+    def subscribe(self, fn: Callable[[Optional[List[str]]], None]) -> None:
+        """Call `fn(keys)` with the keys other workers invalidate; `fn(None)`
+        means anything may have changed (e.g. after a resubscribe)."""
+        self._subscribers.append(fn)
+
+    def watch(self) -> bool:
+        """Start the invalidation listener if needed; True while it is live."""
+        if self._client is None:
+            return False
+        self._ensure_listener()
+        return self.coherent
+
+    def publish_invalidation(self, *keys: str) -> None:
+        """Tell other workers' L1s and subscribers that `keys` changed."""
+        if keys and self._client is not None:
+            self._publish("m", "\n".join(keys))
+
+    def _publish(self, kind: str, name: str) -> None:
+        if self._near is None:
+            return
+        try:
+            self._client.publish(self._channel, f"{self._node_id} {kind}:{name}")
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Cache invalidation publish failed: %s", exc)
+
+    def close(self) -> None:
+        self._closed.set()
+
+    # --- public API ------------------------------------------------------------------
+
     def get(self, key: str) -> Optional[Any]:
         try:
             if self._client is not None:
+                if self._near is not None:
+                    self._ensure_listener()
+                    value = self._near.get(key)
+                    if value is not None:
+                        return value
                 data = self._client.get(key)
                 if data:
-                    return json.loads(data)
+                    value = self._codec.decode(data)
+                    if self._near is not None:
+                        self._near.set(key, value)
+                    return value
             else:
-                rec = self._memory.get(key)
-                if not rec:
-                    return None
-                value, exp = rec
-                if exp and exp < time.time():
-                    self._memory.pop(key, None)
-                    return None
-                return value
+                return self._memory.get(key)
         except Exception as exc:  # pragma: no cover
             logger.warning("Cache get failed: %s", exc)
             return None
@@ -50,25 +246,341 @@ class Cache:
     def set(self, key: str, value: Any, ttl: int = 60) -> None:
         try:
             if self._client is not None:
-                self._client.setex(key, ttl, json.dumps(value))
+                self._client.setex(key, ttl, self._codec.encode(value))
+                if self._near is not None:
+                    self._near.set(key, value, ttl=min(ttl, self._near.ttl))
+                    self._publish("k", key)
             else:
-                exp = int(time.time()) + ttl if ttl else 0
-                self._memory[key] = (value, exp)
+                # ttl=0 keeps the entry until evicted
+                self._memory.set(key, value, ttl=ttl or math.inf)
         except Exception as exc:  # pragma: no cover
             logger.warning("Cache set failed: %s", exc)
 
+    def set_many(self, mapping: Dict[str, Any], ttl: int = 60) -> None:
+        """Set several keys in one round trip (one pipeline, one invalidation message)."""
+        if not mapping:
+            return
+        try:
+            if self._client is not None:
+                pipe = self._client.pipeline(transaction=False)
+                for key, value in mapping.items():
+                    pipe.setex(key, ttl, self._codec.encode(value))
+                pipe.execute()
+                if self._near is not None:
+                    for key, value in mapping.items():
+                        self._near.set(key, value, ttl=min(ttl, self._near.ttl))
+                    self._publish("m", "\n".join(mapping))
+            else:
+                for key, value in mapping.items():
+                    self._memory.set(key, value, ttl=ttl or math.inf)
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Cache set_many failed: %s", exc)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        *,
+        soft_ttl: float,
+        hard_ttl: float,
+        lock_timeout: Optional[float] = None,
+        validate: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Cached value of `key`, computing it at most once per key at a time.
+
+        Values are stored as `{"v": value, "soft": <epoch>}` for `hard_ttl`
+        seconds. Before `soft` they are fresh; after it they are stale: the one
+        caller that wins the refresh lock recomputes while everyone else keeps
+        getting the stale value. On a full miss, callers in this process wait
+        for a single leader, and leaders in other processes wait on a Redis
+        lock (`lock:{key}`) and then re-read the cache, computing themselves
+        only if the lock holder does not deliver within `lock_timeout`.
+
+        `compute` must return a JSON-serialisable value (None is not cached).
+        `validate(value)` returning False makes a stored value count as a miss.
+        """
+        lock_timeout = settings.CACHE_LOCK_TIMEOUT if lock_timeout is None else lock_timeout
+        entry = self.get(key)
+        if isinstance(entry, dict) and "soft" in entry and (validate is None or validate(entry["v"])):
+            if time.time() < entry["soft"]:
+                return entry["v"]
+            # stale: a single refresher recomputes, everyone else is served stale
+            flight, leader = self._join_flight(key)
+            if not leader:
+                return entry["v"]
+            token = self._acquire_lock(key, lock_timeout)
+            if token is None:
+                self._finish_flight(key, flight, entry["v"], None)
+                return entry["v"]
+            return self._lead(key, flight, compute, soft_ttl, hard_ttl, token)
+
+        flight, leader = self._join_flight(key)
+        if not leader:
+            if not flight.done.wait(lock_timeout):
+                return compute()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        token = self._acquire_lock(key, lock_timeout)
+        if token is None:
+            # another process is computing it: wait for its result
+            entry = self._wait_for_entry(key, lock_timeout, validate)
+            if entry is not None:
+                self._finish_flight(key, flight, entry["v"], None)
+                return entry["v"]
+        return self._lead(key, flight, compute, soft_ttl, hard_ttl, token)
+
+    def _join_flight(self, key: str):
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _finish_flight(self, key: str, flight: _Flight, value: Any, error: Optional[BaseException]) -> None:
+        flight.value, flight.error = value, error
+        with self._flights_lock:
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def _lead(self, key, flight, compute, soft_ttl, hard_ttl, token) -> Any:
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, {"v": value, "soft": time.time() + soft_ttl}, ttl=max(int(math.ceil(hard_ttl)), 1))
+        except BaseException as exc:
+            self._finish_flight(key, flight, None, exc)
+            raise
+        finally:
+            self._release_lock(key, token)
+        self._finish_flight(key, flight, value, None)
+        return value
+
+    def _acquire_lock(self, key: str, timeout: float) -> Optional[str]:
+        """Redis refresh lock; "" means no cross-process lock is needed."""
+        if self._client is None:
+            return ""
+        token = uuid.uuid4().hex
+        try:
+            if self._client.set(f"lock:{key}", token, nx=True, px=max(int(timeout * 1000), 1)):
+                return token
+            return None
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Cache lock failed, computing without it: %s", exc)
+            return ""
+
+    def _release_lock(self, key: str, token: Optional[str]) -> None:
+        if not token or self._client is None:
+            return
+        try:
+            if self._release_script is None:
+                self._release_script = self._client.register_script(_RELEASE_LUA)
+            self._release_script(keys=[f"lock:{key}"], args=[token])
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Cache lock release failed: %s", exc)
+
+    def _wait_for_entry(
+        self, key: str, timeout: float, validate: Optional[Callable[[Any], bool]] = None
+    ) -> Optional[dict]:
+        """Poll for the lock holder's entry; one failing `validate` is the
+        invalidated value the holder is replacing, so keep waiting."""
+        deadline = time.time() + timeout
+        delay = 0.005
+        while time.time() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            if self._near is not None:
+                # the holder's publish may still be in flight; read Redis itself
+                self._near.pop(key)
+            entry = self.get(key)
+            if isinstance(entry, dict) and "soft" in entry and (validate is None or validate(entry["v"])):
+                return entry
+        return None
+
+    def generation(self, namespace: str) -> int:
+        """Current generation of `namespace` (0 until first invalidated)."""
+        return self.generations([namespace])[0]
+
+    def generations(self, namespaces: List[str]) -> List[int]:
+        """Generations of several namespaces (L1 first, then one MGET)."""
+        try:
+            if self._client is None:
+                with self._tag_lock:
+                    return [
+                        self._tag_generations.get(ns, self._tag_floor) if ns.startswith("tag:")
+                        else self._generations.get(ns, 0)
+                        for ns in namespaces
+                    ]
+            keys = [f"gen:{ns}" for ns in namespaces]
+            gens: List[Optional[int]] = [None] * len(keys)
+            if self._near is not None:
+                self._ensure_listener()
+                gens = [self._near.get(k) for k in keys]
+            missing = [i for i, gen in enumerate(gens) if gen is None]
+            if missing:
+                values = self._client.mget([keys[i] for i in missing])
+                for i, raw in zip(missing, values, strict=True):
+                    gens[i] = int(raw or 0)
+                    if self._near is not None:
+                        self._near.set(keys[i], gens[i])
+            return gens  # type: ignore[return-value]
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Cache generation read failed: %s", exc)
+            return [0] * len(namespaces)
+
+    def namespaced_key(self, namespace: str, suffix: str) -> str:
+        """Key embedding the namespace generation: `{namespace}:g{gen}:{suffix}`."""
+        return f"{namespace}:g{self.generation(namespace)}:{suffix}"
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        """O(1) invalidation: bump the generation so every old key becomes
+        unreachable; old entries then expire via their own TTL."""
+        try:
+            if self._client is not None:
+                key = f"gen:{namespace}"
+                if namespace.startswith("tag:"):
+                    if self._tag_bump_script is None:
+                        self._tag_bump_script = self._client.register_script(_TAG_BUMP_LUA)
+                    gen = int(self._tag_bump_script(keys=[key, _TAG_SEQ_KEY], args=[settings.CACHE_TAG_TTL]))
+                else:
+                    gen = int(self._client.incr(key))
+                if self._near is not None:
+                    self._near.set(key, gen)
+                    self._publish("k", key)
+            elif namespace.startswith("tag:"):
+                with self._tag_lock:
+                    self._tag_seq += 1
+                    self._tag_generations.set(namespace, self._tag_seq)
+                    if self._tag_generations.evictions != self._tag_evictions:
+                        self._tag_evictions = self._tag_generations.evictions
+                        self._tag_floor = self._tag_seq
+            else:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Cache namespace invalidate failed: %s", exc)
+
+    def tag_generation(self, tag: str) -> int:
+        """Generation of `tag`; changes whenever `invalidate_tags` names it."""
+        return self.generation(f"tag:{tag}")
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Invalidate every `@cached` entry that depends on any of `tags`."""
+        for tag in dict.fromkeys(tags):
+            self.invalidate_namespace(f"tag:{tag}")
+        self.invalidate_namespace(_TAG_EPOCH)
+
     def invalidate_prefix(self, prefix: str) -> None:
+        """Delete keys by prefix (SCAN + DELETE; cost grows with the keyspace).
+
+        Prefer `invalidate_namespace` for hot paths.
+        """
         try:
             if self._client is not None:
                 for k in self._client.scan_iter(match=f"{prefix}*"):
                     self._client.delete(k)
+                if self._near is not None:
+                    for k in self._near.keys():
+                        if str(k).startswith(prefix):
+                            self._near.pop(k)
+                    self._publish("p", prefix)
             else:
-                for k in list(self._memory.keys()):
+                for k in self._memory.keys():
                     if k.startswith(prefix):
-                        self._memory.pop(k, None)
+                        self._memory.pop(k)
         except Exception as exc:  # pragma: no cover
             logger.warning("Cache invalidate failed: %s", exc)
 
+    def stats(self) -> dict:
+        """Size and eviction statistics of the in-process tier (fallback store,
+        or the near cache when Redis is in use)."""
+        if self._client is not None and self._near is not None:
+            return self._near.stats()
+        return self._memory.stats()
+
+    def _render_stats(self) -> List[str]:
+        lines = [
+            "# HELP memory_cache In-process cache tier statistics",
+            "# TYPE memory_cache gauge",
+        ]
+        for name, value in self.stats().items():
+            lines.append(f'memory_cache{{stat="{name}"}} {value}')
+        lines.append("# HELP cache_coherent 1 while the L1 invalidation channel is subscribed")
+        lines.append("# TYPE cache_coherent gauge")
+        lines.append(f"cache_coherent {int(self.coherent)}")
+        return lines
+
 
 cache = Cache()
+metrics_util.register_collector("memory_cache", cache._render_stats)
+
+
+def cached(
+    *,
+    soft_ttl: float,
+    hard_ttl: float,
+    tags: Union[Iterable[str], Callable[..., Iterable[str]]] = (),
+    cache_obj: Optional[Cache] = None,
+):
+    """Memoize a function in the cache with tag-based invalidation.
+
+    The key is derived from the function name and its bound arguments
+    (defaults applied), so `f(1, x=2)` and `f(1, 2)` share an entry. `tags`
+    is a list of tags or a callable `tags(arguments, result)` returning them;
+    each stored entry records the generation of its tags and is a miss once
+    `Cache.invalidate_tags` bumps any of them. Reads and refreshes go through
+    `get_or_compute` (single-flight, stale-while-revalidate).
+
+    Results must be JSON-serialisable; tuples come back as lists.
+
+    hard_ttl is capped at CACHE_TAG_TTL: tag generations expire after that
+    long, and no entry may outlive the generations it recorded.
+    """
+    hard_ttl = min(hard_ttl, settings.CACHE_TAG_TTL)
+    soft_ttl = min(soft_ttl, hard_ttl)
+
+    def decorator(fn: Callable):
+        signature = inspect.signature(fn)
+        prefix = f"cached:{fn.__module__}.{fn.__qualname__}"
+
+        def _tags(arguments: dict, result: Any) -> List[str]:
+            found = tags(arguments, result) if callable(tags) else tags
+            return list(dict.fromkeys(found))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            store = cache_obj or cache
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            digest = hashlib.sha1(json.dumps(arguments, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+            def compute():
+                (epoch,) = store.generations([_TAG_EPOCH])
+                result = fn(*args, **kwargs)
+                names = _tags(arguments, result)
+                gens = store.generations([f"tag:{t}" for t in names] + [_TAG_EPOCH])
+                recorded = dict(zip(names, gens[:-1], strict=True))
+                if gens[-1] != epoch and names:
+                    # a write landed while computing: the result may predate it
+                    recorded[names[0]] = -1
+                return {"r": result, "t": recorded}
+
+            def validate(entry: Any) -> bool:
+                recorded = entry.get("t") or {}
+                current = store.generations([f"tag:{t}" for t in recorded])
+                return current == list(recorded.values())
+
+            entry = store.get_or_compute(
+                f"{prefix}:{digest}",
+                compute,
+                soft_ttl=soft_ttl,
+                hard_ttl=hard_ttl,
+                validate=validate,
+            )
+            return entry["r"]
+
+        wrapper.cache_key_prefix = prefix  # type: ignore[attr-defined]
+        return wrapper
 
+    return decorator
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+"""
+Self-describing serialisation for cached values.
+
+Every encoded value starts with one header byte `0b1SSSSCCC`: the high bit
+marks a header (JSON text never starts with a byte >= 0x80, so values
+written before codecs existed are still read as plain JSON), the next four
+bits name the serializer and the low three the compression. Changing
+CACHE_SERIALIZER / CACHE_COMPRESSION therefore needs no cache flush: old
+entries decode with whatever wrote them and age out through their TTL.
+
+Serializers: json (stdlib), orjson, msgpack. Compression: zlib (stdlib),
+zstd (`zstandard`), lz4 (`lz4`), applied only to payloads of at least
+`min_bytes`. Optional libraries are used when installed; asking for a
+missing one falls back to json / no compression with a warning.
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import msgpack  # type: ignore
+except Exception:  # pragma: no cover
+    msgpack = None  # type: ignore
+
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+try:
+    import lz4.frame as lz4_frame  # type: ignore
+except Exception:  # pragma: no cover
+    lz4_frame = None  # type: ignore
+
+
+_HEADER = 0x80
+
+SERIALIZERS = {"json": 0, "orjson": 1, "msgpack": 2}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _serializer(sid: int) -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    if sid == 0:
+        return _json_dumps, json.loads
+    if sid == 1 and orjson is not None:
+        return _orjson_dumps, orjson.loads
+    if sid == 2 and msgpack is not None:
+        return (lambda v: msgpack.packb(v, default=str, use_bin_type=True)), (lambda b: msgpack.unpackb(b, raw=False))
+    raise ValueError(f"Serializer {sid} is not available")
+
+
+def _compressor(cid: int, level: Optional[int]) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    if cid == 1:
+        return (lambda b: zlib.compress(b, 6 if level is None else level)), zlib.decompress
+    if cid == 2 and zstandard is not None:
+        cctx = zstandard.ZstdCompressor(level=3 if level is None else level)
+        dctx = zstandard.ZstdDecompressor()
+        return cctx.compress, dctx.decompress
+    if cid == 3 and lz4_frame is not None:
+        return lz4_frame.compress, lz4_frame.decompress
+    raise ValueError(f"Compression {cid} is not available")
+
+
+def _available_serializer(name: str) -> str:
+    if name == "auto":
+        return "orjson" if orjson is not None else "json"
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer: {name}")
+    try:
+        _serializer(SERIALIZERS[name])
+    except ValueError:
+        logger.warning("Cache serializer %s is not installed; using json", name)
+        return "json"
+    return name
+
+
+def _available_compression(name: str) -> str:
+    if name == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if name not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {name}")
+    if name != "none":
+        try:
+            _compressor(COMPRESSIONS[name], None)
+        except ValueError:
+            logger.warning("Cache compression %s is not installed; storing uncompressed", name)
+            return "none"
+    return name
+
+
+class Codec:
+    """Encodes with the configured serializer/compression, decodes any header."""
+
+    def __init__(
+        self,
+        serializer: str = "auto",
+        compression: str = "none",
+        *,
+        min_bytes: int = 1024,
+        level: Optional[int] = None,
+    ) -> None:
+        self.serializer = _available_serializer(serializer.lower())
+        self.compression = _available_compression(compression.lower())
+        self.min_bytes = max(int(min_bytes), 0)
+        self._sid = SERIALIZERS[self.serializer]
+        self._cid = COMPRESSIONS[self.compression]
+        self._dumps = _serializer(self._sid)[0]
+        self._compress = _compressor(self._cid, level)[0] if self._cid else None
+        # decoders are built on first use, per header byte
+        self._decoders: Dict[int, Callable[[bytes], Any]] = {}
+
+    def encode(self, value: Any) -> bytes:
+        body = self._dumps(value)
+        cid = 0
+        if self._compress is not None and len(body) >= self.min_bytes:
+            packed = self._compress(body)
+            if len(packed) < len(body):
+                body, cid = packed, self._cid
+        return bytes((_HEADER | (self._sid << 3) | cid,)) + body
+
+    def _decoder(self, header: int) -> Callable[[bytes], Any]:
+        decoder = self._decoders.get(header)
+        if decoder is None:
+            loads = _serializer((header >> 3) & 0x0F)[1]
+            cid = header & 0x07
+            if cid:
+                decompress = _compressor(cid, None)[1]
+                decoder = lambda b: loads(decompress(b))  # noqa: E731
+            else:
+                decoder = loads
+            self._decoders[header] = decoder
+        return decoder
+
+    def decode(self, data: bytes) -> Any:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not data or data[0] < _HEADER:
+            # written before codecs existed (plain JSON)
+            return json.loads(data)
+        return self._decoder(data[0])(data[1:])
+
+
+def default_codec() -> Codec:
+    return Codec(
+        settings.CACHE_SERIALIZER,
+        settings.CACHE_COMPRESSION,
+        min_bytes=settings.CACHE_COMPRESS_MIN_BYTES,
+    )
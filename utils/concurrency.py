@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+"""
+Adaptive concurrency limit (load shedding) per worker.
+
+Caps in-flight requests with an AIMD limit driven by observed latency: the
+limit grows by ~1 per `limit` fast completions while the worker is busy,
+and shrinks multiplicatively when requests exceed the latency target or
+fail with 5xx. Requests over the limit get an immediate 503 instead of
+queueing behind DB pool timeouts.
+
+Priorities:
+- critical (/health, /metrics): always admitted
+- admin (valid admin access token): may use `admin_headroom` above the limit
+- normal: everything else
+"""
+
+import logging
+import math
+import threading
+import time
+
+from flask import Flask, g, request
+
+from config.settings import settings
+from utils import metrics as metrics_util
+
+logger = logging.getLogger(__name__)
+
+CRITICAL_PATHS = frozenset({"/health", "/metrics"})
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        initial: int = 20,
+        *,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        target_latency_ms: float = 500.0,
+        backoff: float = 0.9,
+        admin_headroom: float = 0.2,
+    ) -> None:
+        self.min_limit = max(int(min_limit), 1)
+        self.max_limit = max(int(max_limit), self.min_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.target_latency_ms = target_latency_ms
+        self.backoff = backoff
+        self.admin_headroom = admin_headroom
+        self.inflight = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, priority: str = "normal") -> bool:
+        with self._lock:
+            if priority == "critical":
+                allowed = True
+            elif priority == "admin":
+                allowed = self.inflight < math.floor(self.limit * (1 + self.admin_headroom))
+            else:
+                allowed = self.inflight < math.floor(self.limit)
+            if allowed:
+                self.inflight += 1
+            metrics_util.set_concurrency_state(int(self.limit), self.inflight)
+            return allowed
+
+    def release(self, latency_ms: float, *, failed: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            busy = self.inflight >= self.limit / 2
+            self.inflight = max(self.inflight - 1, 0)
+            if failed or latency_ms > self.target_latency_ms:
+                # at most one decrease per target-latency period, so one slow burst
+                # does not collapse the limit
+                if now - self._last_decrease >= self.target_latency_ms / 1000:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+            elif busy:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            metrics_util.set_concurrency_state(int(self.limit), self.inflight)
+
+
+def _priority() -> str:
+    if request.path in CRITICAL_PATHS:
+        return "critical"
+    parts = request.headers.get("Authorization", "").split()
+    if len(parts) == 2 and parts[0].lower() == "bearer":
+        from utils.security import decode_token_cached
+
+        payload, err = decode_token_cached(parts[1])
+        if err is None and payload.get("type") == "access" and payload.get("role") == "admin":
+            return "admin"
+    return "normal"
+
+
+def init_concurrency_limiter(app: Flask, limiter: AdaptiveConcurrencyLimiter | None = None):
+    """Register shedding hooks on `app`; returns the limiter (None when disabled)."""
+    if limiter is None:
+        if not settings.CONCURRENCY_LIMIT_ENABLED:
+            return None
+        limiter = AdaptiveConcurrencyLimiter(
+            settings.CONCURRENCY_INITIAL_LIMIT,
+            min_limit=settings.CONCURRENCY_MIN_LIMIT,
+            max_limit=settings.CONCURRENCY_MAX_LIMIT,
+            target_latency_ms=settings.CONCURRENCY_TARGET_LATENCY_MS,
+            admin_headroom=settings.CONCURRENCY_ADMIN_HEADROOM,
+        )
+    app.extensions["concurrency_limiter"] = limiter
+
+    @app.before_request
+    def _admit():
+        priority = _priority()
+        if not limiter.try_acquire(priority):
+            from utils.response import error_response
+
+            metrics_util.inc_shed(priority)
+            body, status = error_response("OVERLOADED", "Server overloaded, retry later", status=503)
+            body.headers["Retry-After"] = "1"
+            return body, status
+        g._cc_started = time.perf_counter()
+        return None
+
+    @app.after_request
+    def _record_status(response):
+        g._cc_failed = response.status_code >= 500
+        return response
+
+    @app.teardown_request
+    def _release(_exc):
+        started = g.pop("_cc_started", None)
+        if started is not None:
+            latency_ms = (time.perf_counter() - started) * 1000
+            limiter.release(latency_ms, failed=_exc is not None or g.pop("_cc_failed", False))
+
+    return limiter
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+"""
+Opaque, signed pagination cursors.
+
+A cursor is `base64url(json).base64url(hmac-sha256)` keyed with SECRET_KEY,
+so clients cannot forge positions or change the query a cursor belongs to.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from config.settings import settings
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(body: str) -> str:
+    key = f"cursor:{settings.SECRET_KEY}".encode("utf-8")
+    return _b64(hmac.new(key, body.encode("ascii"), hashlib.sha256).digest()[:16])
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def _hook(obj: Dict[str, Any]) -> Any:
+    if set(obj) == {"$dt"}:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    body = _b64(json.dumps(data, separators=(",", ":"), default=_default).encode("utf-8"))
+    return f"{body}.{_sign(body)}"
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    body, _, signature = (token or "").partition(".")
+    try:
+        if not body or not hmac.compare_digest(signature, _sign(body)):
+            raise InvalidCursor("Invalid cursor")
+        data = json.loads(_unb64(body), object_hook=_hook)
+    except (ValueError, TypeError) as exc:
+        # UnicodeError and binascii.Error are ValueErrors too
+        raise InvalidCursor("Invalid cursor") from exc
+    if not isinstance(data, dict):
+        raise InvalidCursor("Invalid cursor")
+    return data
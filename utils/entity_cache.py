@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+"""
+Read-through entity cache: a short-lived process-local tier in front of an
+optional Redis tier. Values are JSON-serialisable dicts; a miss can be
+cached as well (negative caching) so repeated lookups of absent rows stay
+off the database.
+
+Entities carry auth state (token_version, role, is_active), so stale copies
+must not outlive a write:
+
+- the local tier is used only while the cache's invalidation channel is
+  live, so a delete in one worker evicts the entry everywhere; without
+  Redis it is used only when `local_only` says there is a single process
+- fills are guarded by a lease taken before the database read: a delete
+  that lands in between wins, and the older snapshot is not stored
+"""
+
+import json
+import logging
+import threading
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from utils.lru import TTLCache
+
+if TYPE_CHECKING:
+    from utils.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+
+_NEGATIVE = object()
+
+# Store the value only if the key's invalidation token is still the leased one
+_FILL_LUA = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+  return 1
+end
+return 0
+"""
+
+# KEYS: value, token, value, token, ...; every delete gets a fresh token
+_INVALIDATE_LUA = """
+for i = 1, #KEYS, 2 do
+  redis.call('DEL', KEYS[i])
+  redis.call('SET', KEYS[i + 1], ARGV[1], 'EX', ARGV[2])
+end
+return 1
+"""
+
+
+class Lease:
+    """State observed before loading entities; see `EntityCache.lease`."""
+
+    __slots__ = ("epoch", "tokens")
+
+    def __init__(self, epoch: int, tokens: Dict[str, str]) -> None:
+        self.epoch = epoch
+        self.tokens = tokens
+
+
+class EntityCache:
+    """Two-tier cache for entity snapshots.
+
+    namespace: key prefix in Redis (`{namespace}:{key}`)
+    ttl: Redis tier lifetime in seconds
+    local_ttl: process-local lifetime
+    negative_ttl: lifetime of cached misses
+    cache_obj: the `Cache` whose Redis client and invalidation channel are used
+    local_only: keep the local tier without Redis (safe only in one process)
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        ttl: int = 60,
+        local_ttl: float = 5.0,
+        negative_ttl: int = 5,
+        maxsize: int = 10000,
+        cache_obj: Optional["Cache"] = None,
+        local_only: bool = False,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = int(ttl)
+        self.negative_ttl = int(negative_ttl)
+        self.local_only = local_only
+        self._local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self._cache = cache_obj
+        # bumped whenever local entries are evicted; a local fill started
+        # before a bump may hold an older value and is dropped
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._fill_script: Any = None
+        self._invalidate_script: Any = None
+        if cache_obj is not None:
+            cache_obj.subscribe(self._on_invalidation)
+
+    @property
+    def enabled(self) -> bool:
+        return self._local.maxsize > 0 and self._local.ttl > 0
+
+    def _client(self):
+        return self._cache.client if self._cache is not None else None
+
+    def _rkey(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _tkey(self, key: str) -> str:
+        return f"{self.namespace}:inv:{key}"
+
+    def _use_local(self, client) -> bool:
+        if client is None:
+            return self.local_only
+        return self._cache is not None and self._cache.watch()
+
+    def _on_invalidation(self, keys: Optional[List[str]]) -> None:
+        prefix = f"{self.namespace}:"
+        with self._lock:
+            if keys is None:
+                self._epoch += 1
+                self._local.clear()
+                return
+            mine = [k[len(prefix):] for k in keys if k.startswith(prefix)]
+            if mine:
+                self._epoch += 1
+                for key in mine:
+                    self._local.pop(key)
+
+    def get(self, key: str) -> Tuple[bool, Optional[dict]]:
+        """Return (hit, value). A hit with value None is a cached miss."""
+        if not self.enabled:
+            return False, None
+        client = self._client()
+        local = self._use_local(client)
+        if local:
+            value = self._local.get(key)
+            if value is not None:
+                return True, None if value is _NEGATIVE else value
+        if client is None:
+            return False, None
+        epoch = self._epoch
+        try:
+            data = client.get(self._rkey(key))
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Entity cache get failed: %s", exc)
+            return False, None
+        if data is None:
+            return False, None
+        value = json.loads(data)
+        if local:
+            self._set_local(key, value, self.ttl, epoch)
+        return True, value
+
+    def lease(self, *keys: str) -> Lease:
+        """Take before loading `keys` from the database and pass to `set`."""
+        tokens: Dict[str, str] = {}
+        client = self._client()
+        if client is not None and self.enabled and keys:
+            try:
+                raw = client.mget([self._tkey(k) for k in keys])
+                for key, token in zip(keys, raw, strict=True):
+                    tokens[key] = token.decode("utf-8") if isinstance(token, bytes) else token or ""
+            except Exception as exc:  # pragma: no cover
+                logger.warning("Entity cache lease failed: %s", exc)
+        return Lease(self._epoch, tokens)
+
+    def _set_local(self, key: str, value: Optional[dict], ttl: int, epoch: int) -> None:
+        with self._lock:
+            if self._epoch == epoch:
+                self._local.set(key, _NEGATIVE if value is None else value, ttl=min(self._local.ttl, ttl))
+
+    def set(self, key: str, value: Optional[dict], *, lease: Lease) -> None:
+        """Store `value` unless `key` was deleted since `lease` was taken."""
+        if not self.enabled:
+            return
+        ttl = self.ttl if value is not None else self.negative_ttl
+        client = self._client()
+        if self._use_local(client):
+            # before the Redis write, so a delete racing it always evicts it
+            self._set_local(key, value, ttl, lease.epoch)
+        if client is None:
+            return
+        try:
+            if self._fill_script is None:
+                self._fill_script = client.register_script(_FILL_LUA)
+            stored = self._fill_script(
+                keys=[self._rkey(key), self._tkey(key)], args=[lease.tokens.get(key, ""), json.dumps(value), ttl]
+            )
+            if not stored:
+                self._local.pop(key)
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Entity cache set failed: %s", exc)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            self._epoch += 1
+            for key in keys:
+                self._local.pop(key)
+        client = self._client()
+        if client is None or not keys:
+            return
+        try:
+            if self._invalidate_script is None:
+                self._invalidate_script = client.register_script(_INVALIDATE_LUA)
+            pairs = [k for key in keys for k in (self._rkey(key), self._tkey(key))]
+            self._invalidate_script(keys=pairs, args=[uuid.uuid4().hex, max(self.ttl, 60)])
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Entity cache delete failed: %s", exc)
+        if self._cache is not None:
+            self._cache.publish_invalidation(*[self._rkey(k) for k in keys])
+
+    def clear(self) -> None:
+        """Drop the process-local tier (Redis entries expire via TTL)."""
+        with self._lock:
+            self._epoch += 1
+            self._local.clear()
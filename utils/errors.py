@@ -12,6 +12,7 @@ from flask import Flask
 from werkzeug.exceptions import HTTPException, NotFound
 from marshmallow import ValidationError
 
+from utils.hashing import HashPoolSaturated
 from utils.response import error_response
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,7 @@ def register_error_handlers(app: Flask) -> None:
     """Register global error handlers returning JSON envelopes.
 
     - ValidationError -> 400 VALIDATION_ERROR with field details
+    - HashPoolSaturated -> 503 SERVICE_BUSY with Retry-After
     - NotFound        -> 404 NOT_FOUND
     - HTTPException   -> status from exception, code HTTP_ERROR
     - Exception       -> 500 INTERNAL_ERROR (logged)
@@ -32,6 +34,12 @@ def register_error_handlers(app: Flask) -> None:
             "VALIDATION_ERROR", "Invalid input", status=400, details=err.messages
         )
 
+    @app.errorhandler(HashPoolSaturated)
+    def on_hash_pool_saturated(err: HashPoolSaturated):  # type: ignore[override]
+        body, status = error_response("SERVICE_BUSY", "Server is busy, retry later", status=503)
+        body.headers["Retry-After"] = str(err.retry_after)
+        return body, status
+
     @app.errorhandler(NotFound)
     def on_not_found(err: NotFound):  # type: ignore[override]
         return error_response("NOT_FOUND", "Resource not found", status=404)
@@ -2,10 +2,69 @@ from __future__ import annotations
 
 import hashlib
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Optional
+
+from flask import Response, make_response, request
+
+# Responses are per-user and must be revalidated, but may be kept by clients
+CACHE_CONTROL = "private, no-cache"
 
 
 def etag_from_timestamp(ts: datetime, extra: str = "") -> str:
     base = f"{ts.timestamp()}:{extra}".encode("utf-8")
     return hashlib.sha256(base).hexdigest()
 
+
+def etag_from_parts(parts: Iterable[Any]) -> str:
+    """Opaque tag for a representation derived from `parts` (e.g. a query and
+    a change marker), cheap enough to compute before doing any real work."""
+    base = "\x1f".join(str(p) for p in parts).encode("utf-8")
+    return hashlib.sha256(base).hexdigest()[:32]
+
+
+def quote_etag(tag: str, *, weak: bool = False) -> str:
+    return f'W/"{tag}"' if weak else f'"{tag}"'
+
+
+def _opaque(value: str, *, weak: bool = True) -> Optional[str]:
+    value = value.strip()
+    if value[:2] in ("W/", "w/"):
+        if not weak:
+            return None
+        value = value[2:]
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    return value
+
+
+def etag_matches(header: Optional[str], tag: str, *, weak: bool = True) -> bool:
+    """True if an If-Match / If-None-Match header names `tag`.
+
+    Comparison is weak (W/ prefixes ignored) by default, as If-None-Match
+    requires; pass `weak=False` for If-Match, where a weak validator never
+    matches (RFC 9110 strong comparison). Unquoted tags are accepted for
+    clients that echoed the pre-quoting header verbatim; `*` matches any.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque(candidate, weak=weak) == tag for candidate in header.split(","))
+
+
+def not_modified(tag: str, *, weak: bool = False) -> Optional[Response]:
+    """A bodyless 304 if the request's If-None-Match already names `tag`."""
+    if not etag_matches(request.headers.get("If-None-Match"), tag):
+        return None
+    resp = Response(status=304)
+    resp.headers["ETag"] = quote_etag(tag, weak=weak)
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    return resp
+
+
+def with_etag(result: Any, tag: str, *, weak: bool = False) -> Response:
+    """Attach a (quoted) ETag to a `json_response` result."""
+    resp = make_response(result)
+    resp.headers["ETag"] = quote_etag(tag, weak=weak)
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    return resp
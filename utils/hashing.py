@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+"""
+Bounded process pool for password hashing.
+
+bcrypt is pure CPU; running it on the request thread stalls every other
+request served by the same worker. Hashing and verification are shipped to
+a small dedicated process pool instead. Submissions are bounded: when all
+workers are busy and the wait queue is full, `HashPoolSaturated` is raised
+so the caller can fail fast (503) rather than pile up. A job that outlives
+`timeout` is reported the same way; it keeps its slot until it finishes.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Sequence
+
+from passlib.hash import bcrypt
+
+from config.settings import settings
+from utils import metrics as metrics_util
+
+logger = logging.getLogger(__name__)
+
+
+class HashPoolSaturated(Exception):
+    """All hashing slots are taken; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int = 1) -> None:
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def _bcrypt_hash(password: str, rounds: Optional[int] = None) -> str:
+    hasher = bcrypt.using(rounds=rounds) if rounds else bcrypt
+    return hasher.hash(password)
+
+
+def _bcrypt_hash_many(passwords: List[str], rounds: Optional[int] = None) -> List[str]:
+    return [_bcrypt_hash(p, rounds) for p in passwords]
+
+
+def _bcrypt_verify(password: str, password_hash: str) -> bool:
+    try:
+        return bcrypt.verify(password, password_hash)
+    except Exception:
+        return False
+
+
+def hash_rounds(password_hash: str) -> Optional[int]:
+    """Cost factor encoded in a bcrypt hash (`$2b$12$...` -> 12)."""
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def calibrate_rounds(target_ms: float, *, min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """Pick the highest bcrypt cost whose hash time stays within `target_ms`.
+
+    bcrypt doubles its work per round, so one timing at a cheap probe cost is
+    extrapolated and then confirmed with a single hash at the chosen cost.
+    """
+    probe = max(4, min(min_rounds, 8))
+    start = time.perf_counter()
+    _bcrypt_hash("calibration-probe", probe)
+    probe_ms = (time.perf_counter() - start) * 1000
+    rounds = probe
+    while rounds < max_rounds and probe_ms * 2 ** (rounds + 1 - probe) <= target_ms:
+        rounds += 1
+    rounds = max(min_rounds, min(rounds, max_rounds))
+    start = time.perf_counter()
+    _bcrypt_hash("calibration-probe", rounds)
+    if (time.perf_counter() - start) * 1000 > target_ms * 1.5 and rounds > min_rounds:
+        rounds -= 1
+    return rounds
+
+
+class HashPool:
+    """Run hashing callables in a process pool with a bounded backlog.
+
+    size: worker processes; 0 runs inline on the calling thread
+    queue_size: submissions allowed to wait while all workers are busy
+    rounds: bcrypt cost for new hashes; None keeps passlib's default
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        queue_size: int = 8,
+        *,
+        timeout: float = 30.0,
+        retry_after: int = 1,
+        start_method: Optional[str] = None,
+        rounds: Optional[int] = None,
+    ) -> None:
+        self.size = max(int(size), 0)
+        self.queue_size = max(int(queue_size), 0)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.start_method = start_method
+        self.rounds = rounds or None
+        self._slots = threading.BoundedSemaphore(max(self.size, 1) + self.queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so that each (forked) server worker owns its own pool
+        with self._lock:
+            if self._executor is None:
+                ctx = None
+                if self.start_method and self.start_method in multiprocessing.get_all_start_methods():
+                    ctx = multiprocessing.get_context(self.start_method)
+                self._executor = ProcessPoolExecutor(max_workers=self.size, mp_context=ctx)
+            return self._executor
+
+    def run(self, fn: Callable[..., Any], *args: Any, wait: float = 0) -> Any:
+        """Run `fn(*args)` on the pool; `wait` > 0 blocks that long for a slot."""
+        acquired = self._slots.acquire(timeout=wait) if wait > 0 else self._slots.acquire(blocking=False)
+        if not acquired:
+            metrics_util.inc_hash_rejected()
+            raise HashPoolSaturated(self.retry_after)
+        metrics_util.add_hash_queue_depth(1)
+        start = time.perf_counter()
+        future: Optional[Future] = None
+        try:
+            if self.size == 0:
+                return fn(*args)
+            try:
+                future = self._get_executor().submit(fn, *args)
+                return future.result(timeout=self.timeout)
+            except BrokenProcessPool:
+                logger.warning("Hash pool broken; recreating and hashing inline")
+                self.shutdown()
+                return fn(*args)
+            except FutureTimeout:
+                logger.warning("Hash job exceeded %.1fs; rejecting the request", self.timeout)
+                metrics_util.inc_hash_timeout()
+                future.cancel()
+                raise HashPoolSaturated(self.retry_after) from None
+        finally:
+            metrics_util.observe_hash_latency((time.perf_counter() - start) * 1000)
+            if future is None:
+                self._release()
+            else:
+                # a timed-out job still occupies a worker: free its slot only
+                # when it completes (runs at once if it already has)
+                future.add_done_callback(lambda _f: self._release())
+
+    def _release(self) -> None:
+        metrics_util.add_hash_queue_depth(-1)
+        self._slots.release()
+
+    @property
+    def target_rounds(self) -> int:
+        return self.rounds or bcrypt.default_rounds
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Only upgrades: a hash stronger than the target is left alone."""
+        rounds = hash_rounds(password_hash)
+        return rounds is not None and rounds < self.target_rounds
+
+    def hash(self, password: str) -> str:
+        return self.run(_bcrypt_hash, password, self.rounds)
+
+    def hash_many(self, passwords: Sequence[str], *, chunk: int = 8) -> List[str]:
+        """Hash a batch in parallel, returning hashes in input order.
+
+        Chunks of `chunk` passwords run one per worker, so interactive hashes
+        queue behind at most one chunk. Each chunk waits up to `self.timeout`
+        (HASH_TIMEOUT) for a free slot rather than raising at once (bulk work
+        is not latency sensitive).
+        """
+        chunks = [list(passwords[i:i + chunk]) for i in range(0, len(passwords), max(chunk, 1))]
+        if not chunks:
+            return []
+        with ThreadPoolExecutor(max_workers=max(min(self.size, len(chunks)), 1)) as submitters:
+            parts = submitters.map(
+                lambda c: self.run(_bcrypt_hash_many, c, self.rounds, wait=self.timeout), chunks
+            )
+            return [h for part in parts for h in part]
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self.run(_bcrypt_verify, password, password_hash)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+hash_pool = HashPool(
+    settings.HASH_POOL_SIZE,
+    settings.HASH_QUEUE_SIZE,
+    timeout=settings.HASH_TIMEOUT,
+    retry_after=settings.HASH_RETRY_AFTER,
+    start_method=settings.HASH_POOL_START_METHOD,
+    rounds=settings.BCRYPT_ROUNDS,
+)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+"""
+JWT key registry with `kid`-based rotation.
+
+Keys are parsed once at startup. Tokens are signed with the active key and
+carry its `kid` header; verification picks the key from that header with a
+dict lookup, so older keys keep verifying (no mass logout on rotation)
+until they are removed from the registry.
+
+Configuration (JWT_KEYS_FILE), JSON:
+
+    {
+      "active": "2024-06",
+      "legacy": "2024-01",
+      "keys": [
+        {"kid": "2024-01", "alg": "HS256", "secret": "..."},
+        {"kid": "2024-06", "alg": "EdDSA", "private_key_file": "keys/ed25519.pem"},
+        {"kid": "partner", "alg": "RS256", "public_key_file": "keys/partner.pub.pem"}
+      ]
+    }
+
+Without JWT_KEYS_FILE a single key is built from JWT_SECRET / JWT_ALG.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import jwt
+
+from config.settings import settings
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    alg: str
+    signing_key: Any  # prepared key object; None for verify-only keys
+    verify_key: Any
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def _material(entry: dict, name: str, base: str) -> Optional[bytes]:
+    """Inline PEM under `name`, or the contents of `name`_file relative to `base`."""
+    if entry.get(name):
+        return entry[name].encode("utf-8")
+    if entry.get(f"{name}_file"):
+        return _read(os.path.join(base, entry[f"{name}_file"]))
+    return None
+
+
+def _prepare(alg: str, *, secret: Optional[str] = None, private_key: Optional[bytes] = None,
+             public_key: Optional[bytes] = None):
+    algorithm = jwt.get_algorithm_by_name(alg)
+    if secret is not None:
+        key = algorithm.prepare_key(secret)
+        return key, key
+    signing = algorithm.prepare_key(private_key) if private_key is not None else None
+    if public_key is not None:
+        verify = algorithm.prepare_key(public_key)
+    elif signing is not None:
+        verify = signing.public_key()
+    else:
+        raise ValueError(f"No key material for {alg}")
+    return signing, verify
+
+
+class KeyRegistry:
+    """kid -> pre-parsed key; signs with `active`, verifies with any known kid."""
+
+    def __init__(self) -> None:
+        self._keys: Dict[str, SigningKey] = {}
+        self.active: Optional[str] = None
+        # kid assumed for tokens minted before kid headers existed
+        self.legacy: Optional[str] = None
+
+    def add(
+        self,
+        kid: str,
+        alg: str,
+        *,
+        secret: Optional[str] = None,
+        private_key: Optional[bytes] = None,
+        public_key: Optional[bytes] = None,
+        active: bool = False,
+    ) -> SigningKey:
+        signing, verify = _prepare(alg, secret=secret, private_key=private_key, public_key=public_key)
+        key = SigningKey(kid=kid, alg=alg, signing_key=signing, verify_key=verify)
+        self._keys[kid] = key
+        if active:
+            self.activate(kid)
+        if self.legacy is None:
+            self.legacy = kid
+        return key
+
+    def activate(self, kid: str) -> None:
+        if self._keys[kid].signing_key is None:
+            raise ValueError(f"Key {kid} has no private/secret part and cannot sign")
+        self.active = kid
+
+    def remove(self, kid: str) -> None:
+        self._keys.pop(kid, None)
+
+    def get(self, kid: str) -> Optional[SigningKey]:
+        return self._keys.get(kid)
+
+    def encode(self, payload: dict) -> str:
+        if self.active is None:
+            raise RuntimeError("No active JWT signing key configured")
+        key = self._keys[self.active]
+        return jwt.encode(payload, key.signing_key, algorithm=key.alg, headers={"kid": key.kid})
+
+    def decode(self, token: str, **kwargs: Any) -> dict:
+        header = jwt.get_unverified_header(token)
+        kid = header.get("kid") or self.legacy
+        key = self._keys.get(kid) if kid else None
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return jwt.decode(token, key.verify_key, algorithms=[key.alg], **kwargs)
+
+
+def load_key_registry(path: Optional[str] = None) -> KeyRegistry:
+    registry = KeyRegistry()
+    path = path or settings.JWT_KEYS_FILE
+    if not path:
+        registry.add(settings.JWT_KID, settings.JWT_ALG, secret=settings.JWT_SECRET, active=True)
+        return registry
+
+    with open(path, "r", encoding="utf-8") as fh:
+        config = json.load(fh)
+    base = os.path.dirname(os.path.abspath(path))
+    for entry in config.get("keys", []):
+        registry.add(
+            entry["kid"],
+            entry["alg"],
+            secret=entry.get("secret"),
+            private_key=_material(entry, "private_key", base),
+            public_key=_material(entry, "public_key", base),
+        )
+    registry.activate(config["active"])
+    registry.legacy = config.get("legacy", registry.legacy)
+    return registry
+
+
+key_registry = load_key_registry()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+"""
+Small thread-safe LRU cache with per-entry expiry.
+
+Used for process-local caches (verified tokens, entity snapshots, the
+Redis-less cache fallback) where a plain dict would grow without bound.
+Entries are bounded by count and, optionally, by approximate byte size;
+expired entries are swept actively (amortized over writes) instead of only
+when they happen to be read again.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire at an absolute timestamp.
+
+    maxsize: maximum number of entries; least recently used entries are evicted
+    ttl: default lifetime in seconds when `set` is called without `expires_at`
+    max_bytes: optional bound on the summed `sizeof(value)` of all entries
+    sizeof: size estimator used with `max_bytes`
+    sweep_every: run an expiry sweep every N writes
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        *,
+        max_bytes: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        sweep_every: int = 64,
+    ) -> None:
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self._sizeof = sizeof
+        self._sweep_every = max(int(sweep_every), 1)
+        # key -> (value, expires_at, size)
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._expiry: List[Tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def _sweep(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            exp, _, key = heapq.heappop(self._expiry)
+            rec = self._data.get(key)
+            if rec is not None and rec[1] == exp:
+                self._remove(key)
+                self.expirations += 1
+        # drop heap records of overwritten/evicted keys once they dominate
+        if len(self._expiry) > 2 * len(self._data) + 64:
+            self._expiry = [(exp, seq, k) for exp, seq, k in self._expiry if k in self._data and self._data[k][1] == exp]
+            heapq.heapify(self._expiry)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            rec = self._data.get(key, _MISSING)
+            if rec is _MISSING:
+                self.misses += 1
+                return default
+            value, exp, _ = rec  # type: ignore[misc]
+            if exp <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, *, ttl: Optional[float] = None, expires_at: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        exp = now + (self.ttl if ttl is None else float(ttl))
+        if expires_at is not None:
+            exp = min(exp, float(expires_at))
+        if exp <= now:
+            return
+        size = self._sizeof(value) if self._sizeof is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._data[key] = (value, exp, size)
+            self.bytes += size
+            if exp != float("inf"):
+                heapq.heappush(self._expiry, (exp, next(self._seq), key))
+            self._writes += 1
+            if self._writes % self._sweep_every == 0:
+                self._sweep(now)
+            while len(self._data) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._data.keys())
+
+    def sweep(self) -> None:
+        with self._lock:
+            self._sweep(time.time())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import threading
 from collections import defaultdict
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Tuple
 
 
 _lock = threading.Lock()
@@ -11,6 +11,24 @@ _latency_sum_ms: Dict[str, float] = defaultdict(float)
 _latency_count: Dict[str, int] = defaultdict(int)
 _error_count: Dict[str, int] = defaultdict(int)
 _rate_limit_hits: int = 0
+_token_cache_hits: int = 0
+_token_cache_misses: int = 0
+_hash_queue_depth: int = 0
+_hash_latency_sum_ms: float = 0.0
+_hash_latency_count: int = 0
+_hash_rejected: int = 0
+_hash_timeouts: int = 0
+_blacklist_overflow: int = 0
+_concurrency_limit: int = 0
+_concurrency_inflight: int = 0
+_shed_count: Dict[str, int] = defaultdict(int)
+# Extra exposition lines from other components (called at render time)
+_collectors: Dict[str, Callable[[], List[str]]] = {}
+
+
+def register_collector(name: str, fn: Callable[[], List[str]]) -> None:
+    """Register `fn` returning Prometheus text lines; re-registering replaces it."""
+    _collectors[name] = fn
 
 
 def inc_request_count(path: str, method: str, status: int) -> None:
@@ -32,6 +50,58 @@ def inc_rate_limit() -> None:
         _rate_limit_hits += 1
 
 
+def inc_token_cache(*, hit: bool) -> None:
+    global _token_cache_hits, _token_cache_misses
+    with _lock:
+        if hit:
+            _token_cache_hits += 1
+        else:
+            _token_cache_misses += 1
+
+
+def add_hash_queue_depth(delta: int) -> None:
+    global _hash_queue_depth
+    with _lock:
+        _hash_queue_depth += delta
+
+
+def observe_hash_latency(duration_ms: float) -> None:
+    global _hash_latency_sum_ms, _hash_latency_count
+    with _lock:
+        _hash_latency_sum_ms += float(duration_ms)
+        _hash_latency_count += 1
+
+
+def inc_hash_rejected() -> None:
+    global _hash_rejected
+    with _lock:
+        _hash_rejected += 1
+
+
+def inc_hash_timeout() -> None:
+    global _hash_timeouts
+    with _lock:
+        _hash_timeouts += 1
+
+
+def inc_blacklist_overflow() -> None:
+    global _blacklist_overflow
+    with _lock:
+        _blacklist_overflow += 1
+
+
+def set_concurrency_state(limit: int, inflight: int) -> None:
+    global _concurrency_limit, _concurrency_inflight
+    with _lock:
+        _concurrency_limit = limit
+        _concurrency_inflight = inflight
+
+
+def inc_shed(priority: str) -> None:
+    with _lock:
+        _shed_count[priority] += 1
+
+
 def render_prometheus() -> str:
     lines = []
     lines.append("# HELP request_count Total HTTP requests by path, method, status")
@@ -56,5 +126,45 @@ def render_prometheus() -> str:
         lines.append("# TYPE rate_limit_hits counter")
         lines.append(f'rate_limit_hits { _rate_limit_hits }')
 
+        lines.append("# HELP token_cache_hits Verified-token cache hits")
+        lines.append("# TYPE token_cache_hits counter")
+        lines.append(f"token_cache_hits {_token_cache_hits}")
+        lines.append("# HELP token_cache_misses Verified-token cache misses")
+        lines.append("# TYPE token_cache_misses counter")
+        lines.append(f"token_cache_misses {_token_cache_misses}")
+        lines.append("# HELP token_blacklist_overflow Revocations the full token blacklist could not store")
+        lines.append("# TYPE token_blacklist_overflow counter")
+        lines.append(f"token_blacklist_overflow {_blacklist_overflow}")
+
+        lines.append("# HELP hash_queue_depth Password hashing jobs running or waiting")
+        lines.append("# TYPE hash_queue_depth gauge")
+        lines.append(f"hash_queue_depth {_hash_queue_depth}")
+        lines.append("# HELP hash_latency_ms Average password hash/verify latency in ms")
+        lines.append("# TYPE hash_latency_ms gauge")
+        lines.append(f"hash_latency_ms {_hash_latency_sum_ms / max(_hash_latency_count, 1):.2f}")
+        lines.append("# HELP hash_rejected Hashing requests rejected because the pool was full")
+        lines.append("# TYPE hash_rejected counter")
+        lines.append(f"hash_rejected {_hash_rejected}")
+        lines.append("# HELP hash_timeouts Hashing requests that gave up waiting for a worker result")
+        lines.append("# TYPE hash_timeouts counter")
+        lines.append(f"hash_timeouts {_hash_timeouts}")
+
+        lines.append("# HELP concurrency_limit Current adaptive in-flight request limit")
+        lines.append("# TYPE concurrency_limit gauge")
+        lines.append(f"concurrency_limit {_concurrency_limit}")
+        lines.append("# HELP concurrency_inflight Requests currently in flight")
+        lines.append("# TYPE concurrency_inflight gauge")
+        lines.append(f"concurrency_inflight {_concurrency_inflight}")
+        lines.append("# HELP shed_count Requests rejected by the concurrency limiter by priority")
+        lines.append("# TYPE shed_count counter")
+        for priority, cnt in _shed_count.items():
+            lines.append(f'shed_count{{priority="{priority}"}} {cnt}')
+
+    for fn in list(_collectors.values()):
+        try:
+            lines.extend(fn())
+        except Exception:  # pragma: no cover
+            pass
+
     return "\n".join(lines) + "\n"
 
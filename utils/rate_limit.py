@@ -1,25 +1,234 @@
 from __future__ import annotations
 
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
 import time
-from typing import Callable, Dict, Tuple
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
 from functools import wraps
-from flask import request
+from flask import make_response, request
 import logging
+from config.settings import settings
 from utils import metrics as metrics_util
 
 logger = logging.getLogger(__name__)
 
 
-_buckets: Dict[Tuple[str, str], Tuple[int, int]] = {}
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the bucket is fully replenished
+    retry_after: float  # seconds until the next request would be allowed (0 if allowed)
+
+
+class GCRALimiter:
+    """Generic cell rate algorithm with bounded memory.
+
+    Each bucket is a single float, its theoretical arrival time (TAT). Buckets
+    live in an LRU capped at `max_keys`; expired TATs are swept every
+    `sweep_interval` seconds (an expired TAT is equivalent to no entry).
+    """
+
+    def __init__(self, max_keys: int = 100_000, sweep_interval: float = 10.0) -> None:
+        self.max_keys = max(int(max_keys), 1)
+        self.sweep_interval = sweep_interval
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def _sweep(self, now: float, budget: int = 1000) -> None:
+        # oldest-used first; stop at the first live bucket or when out of budget
+        while self._tat and budget > 0:
+            key, tat = next(iter(self._tat.items()))
+            if tat > now:
+                break
+            del self._tat[key]
+            budget -= 1
+
+    def hit(self, key: str, limit: int, window_sec: float, now: Optional[float] = None) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        interval = window_sec / limit
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+                self._next_sweep = now + self.sweep_interval
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + interval
+            allow_at = new_tat - window_sec
+            if now < allow_at:
+                return RateLimitDecision(False, limit, 0, tat - now, allow_at - now)
+            self._tat[key] = new_tat
+            self._tat.move_to_end(key)
+            if len(self._tat) > self.max_keys:
+                self._tat.popitem(last=False)
+        remaining = int((now - allow_at) / interval + 1e-9)
+        return RateLimitDecision(True, limit, min(remaining, limit - 1), new_tat - now, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class MmapGCRALimiter:
+    """GCRA state in a shared, mmap-backed table for single-host deployments.
+
+    All workers map the same file; a decision is one flock-protected probe of
+    a fixed-size open-addressing table of (key hash, TAT) slots, so memory is
+    bounded by `slots` and no network round trip is needed. A full probe
+    window reuses the slot with the oldest TAT.
+    """
+
+    _SLOT = struct.Struct("<Qd")
+    _PROBE = 8
+
+    def __init__(self, path: str, slots: int = 262_144) -> None:
+        self.path = path
+        self.slots = max(int(slots), self._PROBE)
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _open(self) -> mmap.mmap:
+        # (Re)open per process: an fd inherited over fork shares its flock
+        if self._pid != os.getpid() or self._map is None:
+            size = self.slots * self._SLOT.size
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._fd, self._map, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+        return self._map
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+    def hit(self, key: str, limit: int, window_sec: float, now: Optional[float] = None) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        interval = window_sec / limit
+        h = self._hash(key)
+        slot_size = self._SLOT.size
+        with self._lock:
+            buf = self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                start = h % self.slots
+                target, victim_tat, tat = None, None, now
+                for i in range(self._PROBE):
+                    offset = ((start + i) % self.slots) * slot_size
+                    slot_hash, slot_tat = self._SLOT.unpack_from(buf, offset)
+                    if slot_hash == h:
+                        target, tat = offset, slot_tat
+                        break
+                    if victim_tat is None or slot_tat < victim_tat:
+                        target, victim_tat = offset, slot_tat
+                tat = max(tat, now)
+                new_tat = tat + interval
+                allow_at = new_tat - window_sec
+                if now < allow_at:
+                    return RateLimitDecision(False, limit, 0, tat - now, allow_at - now)
+                self._SLOT.pack_into(buf, target, h, new_tat)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        remaining = int((now - allow_at) / interval + 1e-9)
+        return RateLimitDecision(True, limit, min(remaining, limit - 1), new_tat - now, 0.0)
+
+
+_GCRA_LUA = """
+local now = tonumber(ARGV[1])
+if not now then
+  local t = redis.call('TIME')
+  now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+end
+local interval = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if now < allow_at then
+  return {0, tostring(tat - now), tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat - now), tostring(now - allow_at)}
+"""
+
+
+class RedisGCRALimiter:
+    """GCRA shared across hosts: one atomic Lua script (EVALSHA) per decision.
+
+    Uses the Redis server clock unless `now` is given, so hosts need not agree
+    on time. Fails open (allows) if Redis is unreachable.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:") -> None:
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_LUA)
+
+    def hit(self, key: str, limit: int, window_sec: float, now: Optional[float] = None) -> RateLimitDecision:
+        interval = window_sec / limit
+        try:
+            allowed, reset_after, slack = self._script(
+                keys=[self.prefix + key],
+                args=["" if now is None else repr(now), repr(interval), repr(window_sec)],
+            )
+        except Exception as exc:
+            logger.warning("Redis rate limit failed, allowing request: %s", exc)
+            return RateLimitDecision(True, limit, limit - 1, 0.0, 0.0)
+        reset_after, slack = float(reset_after), float(slack)
+        if not int(allowed):
+            return RateLimitDecision(False, limit, 0, reset_after, slack)
+        remaining = int(slack / interval + 1e-9)
+        return RateLimitDecision(True, limit, min(remaining, limit - 1), reset_after, 0.0)
+
+
+def create_limiter(backend: Optional[str] = None, client=None):
+    """memory (per worker) | mmap (shared by workers on one host) | redis (shared by hosts)."""
+    backend = (backend or settings.RATE_LIMIT_BACKEND).lower()
+    if backend == "redis":
+        if client is None:
+            from utils.cache import cache
+
+            client = cache.client
+        if client is not None:
+            return RedisGCRALimiter(client)
+        logger.warning("RATE_LIMIT_BACKEND=redis but Redis is unavailable; using memory")
+    elif backend == "mmap":
+        path = settings.RATE_LIMIT_MMAP_PATH
+        if not path:
+            base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            path = os.path.join(base, "flask-api-ratelimit")
+        return MmapGCRALimiter(path, settings.RATE_LIMIT_MMAP_SLOTS)
+    return GCRALimiter(settings.RATE_LIMIT_MAX_KEYS, settings.RATE_LIMIT_SWEEP_SEC)
+
+
+_limiter = create_limiter()
+
+
+def _apply_headers(response, decision: RateLimitDecision):
+    response.headers["RateLimit-Limit"] = str(decision.limit)
+    response.headers["RateLimit-Remaining"] = str(decision.remaining)
+    response.headers["RateLimit-Reset"] = str(math.ceil(decision.reset_after))
+    if not decision.allowed:
+        response.headers["Retry-After"] = str(max(math.ceil(decision.retry_after), 1))
+    return response
 
 
 def ratelimit(key: str, limit: int, window_sec: int = 60, identity_fn=None):
-    """Simple in-memory rate limiter.
+    """GCRA rate limiter (allows bursts of up to `limit`, then 1 per window/limit).
 
     key: name of the bucket category
     limit: max requests per window
-    window_sec: sliding window seconds
+    window_sec: window seconds
     Identity is based on remote IP; for login, combine with email.
+    Responses carry RateLimit-* headers, plus Retry-After when limited.
     """
 
     def decorator(fn: Callable):
@@ -33,19 +242,14 @@ def ratelimit(key: str, limit: int, window_sec: int = 60, identity_fn=None):
                 except Exception:
                     identity = None
             bucket_id = f"{ip}:{identity}" if identity else ip
-            bucket_key = (key, bucket_id)
-            now = int(time.time())
-            window_start, count = _buckets.get(bucket_key, (now, 0))
-            if now - window_start >= window_sec:
-                window_start, count = now, 0
-            count += 1
-            _buckets[bucket_key] = (window_start, count)
-            if count > limit:
+            decision = _limiter.hit(f"{key}:{bucket_id}", limit, window_sec)
+            if not decision.allowed:
                 from utils.response import error_response
-                logger.warning("Rate limit exceeded: key=%s ip=%s count=%s", key, ip, count)
+                logger.warning("Rate limit exceeded: key=%s ip=%s", key, ip)
                 metrics_util.inc_rate_limit()
-                return error_response("RATE_LIMITED", "Too many requests", status=429, details={"retry_in": window_sec - (now - window_start)})
-            return fn(*args, **kwargs)
+                resp = make_response(error_response("RATE_LIMITED", "Too many requests", status=429, details={"retry_in": math.ceil(decision.retry_after)}))
+                return _apply_headers(resp, decision)
+            return _apply_headers(make_response(fn(*args, **kwargs)), decision)
 
         return wrapper
 
@@ -2,43 +2,54 @@ from __future__ import annotations
 
 import datetime as dt
 import hashlib
+import time
 import uuid
 from functools import wraps
 from typing import Callable, Iterable, Optional, Tuple
 
 import jwt
 from flask import request, g
-from passlib.hash import bcrypt
 
 from config.settings import settings
-from repositories.user_repository import get_user_by_id
+from repositories.user_repository import get_user_snapshot_by_id, increment_token_version
+from utils.hashing import hash_pool
+from utils.jwt_keys import key_registry
+from utils.lru import TTLCache
 from utils.response import error_response
+from utils.token_blacklist import create_blacklist
+from utils import metrics as metrics_util
 
 
 def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
+    """Hash on the bounded hashing pool; raises HashPoolSaturated when full."""
+    return hash_pool.hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    try:
-        return bcrypt.verify(password, password_hash)
-    except Exception:
-        return False
+    return hash_pool.verify(password, password_hash)
 
 
-# In-memory token blacklist (fallback). For production, use persistent store.
-_blacklisted_jtis: set[str] = set()
+# Revoked jtis, kept until the token's own expiry (see utils.token_blacklist)
+token_blacklist = create_blacklist()
 
 
-def blacklist_token(jti: str) -> None:
+def blacklist_token(jti: str, exp: Optional[float] = None, user_id: Optional[int] = None) -> None:
+    """Revoke one token. If the blacklist is full, fail closed: bump the
+    owner's token_version, which revokes all of their tokens via the `ver` check."""
     import logging
 
     logging.getLogger(__name__).info("Token blacklisted jti=%s", jti)
-    _blacklisted_jtis.add(jti)
+    if exp is None:
+        exp = time.time() + settings.REFRESH_TOKEN_EXPIRES
+    if token_blacklist.add(jti, float(exp)):
+        return
+    if user_id is None:
+        raise RuntimeError("Token blacklist is full and the token has no owner to revoke")
+    increment_token_version(user_id)
 
 
 def is_token_blacklisted(jti: str) -> bool:
-    return jti in _blacklisted_jtis
+    return token_blacklist.contains(jti)
 
 
 def _fingerprint_from_request() -> str:
@@ -63,7 +74,7 @@ def _encode_token(user, *, refresh: bool = False) -> str:
         "jti": str(uuid.uuid4()),
         "fp": _fingerprint_from_request(),
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
+    return key_registry.encode(payload)
 
 
 def create_access_token(user) -> str:
@@ -76,7 +87,7 @@ def create_refresh_token(user) -> str:
 
 def decode_token_raw(token: str):
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+        payload = key_registry.decode(token)
         return payload, None
     except jwt.ExpiredSignatureError:
         return None, ("TOKEN_EXPIRED", "Token expired")
@@ -88,6 +99,25 @@ def decode_token_raw(token: str):
         return None, ("TOKEN_INVALID", "Invalid token")
 
 
+# Verified payloads keyed by token digest. Entries never outlive the token's
+# own `exp`; revocation (blacklist, `ver`) is still checked on every request.
+_token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+
+def decode_token_cached(token: str):
+    """Like `decode_token_raw`, but skips re-verification of recently seen tokens."""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        metrics_util.inc_token_cache(hit=True)
+        return payload, None
+    metrics_util.inc_token_cache(hit=False)
+    payload, err = decode_token_raw(token)
+    if err is None:
+        _token_cache.set(key, payload, expires_at=float(payload.get("exp", 0)))
+    return payload, err
+
+
 def decode_token(token: str, *, refresh: bool = False):
     payload, err = decode_token_raw(token)
     if err is not None:
@@ -122,7 +152,7 @@ def require_auth(roles: Optional[Iterable[str] | str] = None):
             if len(parts) != 2 or parts[0].lower() != "bearer":
                 return error_response("MISSING_AUTH_HEADER", "Missing or invalid Authorization header", status=401)
 
-            payload, err = decode_token_raw(parts[1])
+            payload, err = decode_token_cached(parts[1])
             if err is not None:
                 code, msg = err
                 return error_response(code, msg, status=401)
@@ -134,7 +164,7 @@ def require_auth(roles: Optional[Iterable[str] | str] = None):
             if is_token_blacklisted(str(payload.get("jti", ""))):
                 return error_response("TOKEN_REVOKED", "Token has been revoked", status=401)
 
-            user = get_user_by_id(int(payload.get("sub", 0)))
+            user = get_user_snapshot_by_id(int(payload.get("sub", 0)))
             if not user:
                 return error_response("USER_NOT_FOUND", "User not found", status=404)
 
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+"""
+Revoked-token (jti) stores.
+
+Entries live only until the token's own `exp`: after that the signature
+check rejects the token anyway, so keeping the jti would just leak memory.
+
+- MemoryBlacklist: per-process dict + expiry heap.
+- RedisBlacklist: shared by all workers/hosts via a sorted set scored by
+  `exp`. A local Bloom filter, topped up with new revocations every
+  `sync_interval` seconds, answers the common "not revoked" case without a
+  network round trip.
+
+Only expired entries are ever dropped, so the size is bounded by the
+revocations made within one token lifetime. Past `max_entries` / `capacity`
+`add` refuses the jti and returns False instead of un-revoking another one;
+the caller must then revoke some other way (see utils.security).
+"""
+
+import hashlib
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import settings
+from utils import metrics as metrics_util
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter (no false negatives, tunable false positives)."""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001) -> None:
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+# Drop expired entries, then add unless that would exceed the capacity
+_ADD_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) and redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[5]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], 'GT', ARGV[2], ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+return 1
+"""
+
+
+def _overflow(capacity: int) -> None:
+    metrics_util.inc_blacklist_overflow()
+    logger.error("Token blacklist is full (%d live entries); revocation not stored", capacity)
+
+
+class MemoryBlacklist:
+    """In-process store; only suitable for a single worker."""
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max(int(max_entries), 1)
+        self._entries: Dict[str, float] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            exp, jti = heapq.heappop(self._expiry)
+            if self._entries.get(jti) == exp:
+                del self._entries[jti]
+
+    def add(self, jti: str, exp: float) -> bool:
+        """Revoke `jti` until `exp`; False if the store is full of live entries."""
+        now = time.time()
+        if exp <= now:
+            return True
+        with self._lock:
+            self._purge(now)
+            if jti not in self._entries and len(self._entries) >= self.max_entries:
+                _overflow(self.max_entries)
+                return False
+            self._entries[jti] = max(exp, self._entries.get(jti, 0.0))
+            heapq.heappush(self._expiry, (self._entries[jti], jti))
+        return True
+
+    def contains(self, jti: str) -> bool:
+        exp = self._entries.get(jti)
+        return exp is not None and exp > time.time()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBlacklist:
+    """Shared store in a Redis sorted set with a local Bloom-filter fast path.
+
+    `key` maps jti -> exp; `{key}:added` maps jti -> insertion time so each
+    sync fetches only what was revoked since the previous one. `key` holds at
+    most `capacity` live entries; `{key}:added` keeps `rebuild_interval` of
+    history. The Bloom filter cannot forget, so every `rebuild_interval`
+    seconds it is rebuilt from the live set, which also drops bits of expired
+    jtis.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        key: str = "token_blacklist",
+        sync_interval: float = 1.0,
+        rebuild_interval: float = 300.0,
+        capacity: int = 100_000,
+        skew: float = 5.0,
+    ) -> None:
+        self.client = client
+        self.key = key
+        self.added_key = f"{key}:added"
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity = max(int(capacity), 1)
+        # tolerated clock difference between the workers that add and sync
+        self.skew = skew
+        self._bloom = BloomFilter(self.capacity)
+        self._synced_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = threading.Lock()
+        self._add_script = None
+
+    @staticmethod
+    def _decode(member) -> str:
+        return member.decode("utf-8") if isinstance(member, bytes) else str(member)
+
+    def _rebuild(self, now: float) -> None:
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self.key, "-inf", now)
+        pipe.zrangebyscore(self.key, now, "+inf")
+        _, members = pipe.execute()
+        bloom = BloomFilter(max(self.capacity, len(members) * 2))
+        for m in members:
+            bloom.add(self._decode(m))
+        self._bloom = bloom
+        self._rebuilt_at = now
+
+    def _catch_up(self, now: float) -> None:
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self.key, "-inf", now)
+        pipe.zrangebyscore(self.added_key, self._synced_at - self.skew, "+inf")
+        _, members = pipe.execute()
+        for m in members:
+            self._bloom.add(self._decode(m))
+
+    def _sync(self, now: float) -> None:
+        with self._lock:
+            if now - self._synced_at < self.sync_interval:
+                return
+            # `{key}:added` only keeps rebuild_interval of history
+            if now - self._rebuilt_at >= self.rebuild_interval or now - self._synced_at >= self.rebuild_interval:
+                self._rebuild(now)
+            else:
+                self._catch_up(now)
+            self._synced_at = now
+
+    def add(self, jti: str, exp: float) -> bool:
+        """Revoke `jti` until `exp`; False if the set is full of live entries."""
+        now = time.time()
+        if exp <= now:
+            return True
+        if self._add_script is None:
+            self._add_script = self.client.register_script(_ADD_LUA)
+        stored = self._add_script(
+            keys=[self.key, self.added_key],
+            args=[jti, exp, now, now - self.rebuild_interval - self.skew, self.capacity],
+        )
+        if not stored:
+            _overflow(self.capacity)
+            return False
+        self._bloom.add(jti)
+        return True
+
+    def contains(self, jti: str) -> bool:
+        now = time.time()
+        try:
+            if now - self._synced_at >= self.sync_interval:
+                self._sync(now)
+            if jti not in self._bloom:
+                return False
+            score = self.client.zscore(self.key, jti)
+        except Exception as exc:
+            logger.warning("Token blacklist lookup failed: %s", exc)
+            return False
+        return score is not None and float(score) > now
+
+
+def create_blacklist(backend: Optional[str] = None, client=None):
+    backend = (backend or settings.TOKEN_BLACKLIST_BACKEND).lower()
+    if backend in {"auto", "redis"}:
+        if client is None:
+            from utils.cache import cache
+
+            client = cache.client
+        if client is not None:
+            return RedisBlacklist(
+                client,
+                sync_interval=settings.TOKEN_BLACKLIST_SYNC_SEC,
+                rebuild_interval=settings.TOKEN_BLACKLIST_REBUILD_SEC,
+                capacity=settings.TOKEN_BLACKLIST_MAX_ENTRIES,
+            )
+        if backend == "redis":
+            logger.warning("TOKEN_BLACKLIST_BACKEND=redis but Redis is unavailable; using memory")
+    return MemoryBlacklist(settings.TOKEN_BLACKLIST_MAX_ENTRIES)